@@ -1,19 +1,47 @@
-from fastapi import APIRouter, HTTPException, Response
-from pydantic import BaseModel
-from typing import List, Dict, Any
-from app.services.rag_service import RAGService
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Dict, Any, AsyncIterator, Literal, Optional
+import asyncio
+import json
+from app.core.limits import QUERY_BATCH_MAX_QUESTIONS, QUERY_MAX_K
 from app.core.logging_config import get_logger, log_event, log_error
-from app.core.metrics import get_metrics_content
+from app.core.metrics import current_stage_timings, get_metrics_content
+from app.services.ingestion_jobs import IngestionJobConflict
+from app.services.lazy_service import LazyService
 
-# Initialize RAG service and logger
-rag_service = RAGService()
+
+def _build_rag_service():
+    # Imported here: the RAG service pulls in langchain, langfuse and the vector store backends
+    from app.services.rag_service import RAGService
+    return RAGService()
+
+
+# The RAG service is built by the app's lifespan (or the first request needing it), not at import
+rag_services = LazyService("rag_service", _build_rag_service)
 logger = get_logger("api")
 
+
+async def get_rag_service():
+    """The RAG service, waiting off the event loop while it is still being built"""
+    rag_service = rag_services.instance
+    if rag_service is None:
+        rag_service = await asyncio.to_thread(rag_services.get)
+    return rag_service
+
+
 router = APIRouter()
 
 
 # Request/Response Models
-class QueryRequest(BaseModel):
+class RetrievalOptions(BaseModel):
+    k: int = Field(5, ge=1, le=QUERY_MAX_K)
+    sources: Optional[List[str]] = Field(None, min_length=1)
+    max_distance: Optional[float] = Field(None, gt=0)
+    retrieval_mode: Optional[Literal["vector", "hybrid"]] = None
+
+
+class QueryRequest(RetrievalOptions):
     question: str
 
 
@@ -25,6 +53,28 @@ class SourceResponse(BaseModel):
 class QueryResponse(BaseModel):
     answer: str
     sources: List[Dict[str, Any]]
+    cached: bool = False
+
+
+class BatchQueryRequest(RetrievalOptions):
+    questions: List[str] = Field(..., min_length=1, max_length=QUERY_BATCH_MAX_QUESTIONS)
+
+
+class BatchQueryResponse(BaseModel):
+    results: List[QueryResponse]
+
+
+class StatsResponse(BaseModel):
+    total_documents: int
+    sources: Dict[str, int]
+    backend: str
+    index_version: str
+
+
+class IndexVersionsResponse(BaseModel):
+    active: str
+    previous: Optional[str] = None
+    retired: Dict[str, float]
 
 
 class IngestResponse(BaseModel):
@@ -32,6 +82,30 @@ class IngestResponse(BaseModel):
     message: str
     total_documents: int
     sources: Dict[str, int]
+    added: int
+    updated: int
+    removed: int
+    skipped: int
+    resumed: int
+    incomplete_sources: List[str] = []
+    index_version: str
+
+
+class IngestJobResponse(BaseModel):
+    job_id: str
+    mode: str
+    status: str
+    phase: str
+    chunks_fetched: int
+    chunks_to_embed: int
+    chunks_embedded: int
+    chunks_stored: int
+    eta_seconds: Optional[float] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[IngestResponse] = None
+    error: Optional[str] = None
 
 
 @router.get("/health")
@@ -40,6 +114,16 @@ async def health_check():
     return {"status": "ok"}
 
 
+@router.get("/ready")
+async def readiness_check():
+    """Readiness endpoint: 503 until the services behind the API are built"""
+    if rag_services.ready:
+        return {"status": "ready"}
+    if rag_services.error is not None:
+        return JSONResponse(status_code=503, content={"status": "failed", "detail": rag_services.error})
+    return JSONResponse(status_code=503, content={"status": "starting"})
+
+
 @router.get("/metrics")
 async def metrics():
     """Prometheus metrics endpoint"""
@@ -47,35 +131,72 @@ async def metrics():
     return Response(content=content, media_type=content_type)
 
 
-@router.post("/ingest", response_model=IngestResponse)
-async def ingest_documents():
-    """Trigger document ingestion"""
+@router.get("/stats", response_model=StatsResponse)
+async def collection_stats(rag_service=Depends(get_rag_service)):
+    """Chunk counts of the vector store, in total and per source"""
+    stats = rag_service.vector_store.get_collection_stats()
+    return StatsResponse(
+        total_documents=stats["total_documents"],
+        sources=stats["sources"],
+        backend=rag_service.vector_store.backend.name,
+        index_version=rag_service.vector_store.active_version
+    )
+
+
+@router.get("/index/versions", response_model=IndexVersionsResponse)
+async def index_versions(rag_service=Depends(get_rag_service)):
+    """The index version serving queries, the one rollback returns to, and those awaiting deletion"""
+    return IndexVersionsResponse(**await asyncio.to_thread(rag_service.vector_store.versions))
+
+
+@router.post("/index/rollback", response_model=IndexVersionsResponse)
+async def rollback_index(rag_service=Depends(get_rag_service)):
+    """Switch queries back to the index version that was active before the last ingestion"""
     try:
-        log_event(logger, "document_ingestion_started", "Starting document ingestion")
-        
-        result = rag_service.ingest_documents()
-        
-        log_event(
-            logger, 
-            "document_ingestion_completed", 
-            "Document ingestion completed successfully",
-            total_documents=result["total_documents"],
-            sources=result["sources"]
-        )
-        
-        return IngestResponse(
-            status=result["status"],
-            message=result["message"],
-            total_documents=result["total_documents"],
-            sources=result["sources"]
-        )
+        # Takes the manifest lock and warms the previous version up, so keep it off the event loop
+        versions = await asyncio.to_thread(rag_service.vector_store.rollback)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    log_event(logger, "index_rolled_back", "Index rolled back", index_version=versions["active"])
+    return IndexVersionsResponse(**versions)
+
+
+@router.post("/ingest", response_model=IngestJobResponse, status_code=202)
+async def ingest_documents(response: Response, mode: Literal["incremental", "full"] = "incremental",
+                           rag_service=Depends(get_rag_service)):
+    """Start document ingestion as a background job, or return the job already running in the same mode"""
+    try:
+        job, created = rag_service.start_ingestion(mode=mode)
+    except IngestionJobConflict as e:
+        headers = {"Location": f"/ingest/{e.job.id}"} if e.job is not None else None
+        raise HTTPException(status_code=409, detail=str(e), headers=headers)
     except Exception as e:
         log_error(logger, e, {"operation": "document_ingestion"})
         raise HTTPException(status_code=500, detail=f"Ingestion failed: {str(e)}")
 
+    log_event(
+        logger,
+        "document_ingestion_started" if created else "document_ingestion_joined",
+        "Document ingestion job started" if created else "Document ingestion already running",
+        job_id=job.id,
+        mode=job.mode
+    )
+    response.headers["Location"] = f"/ingest/{job.id}"
+    return IngestJobResponse(**job.snapshot())
+
+
+@router.get("/ingest/{job_id}", response_model=IngestJobResponse)
+async def ingestion_status(job_id: str, rag_service=Depends(get_rag_service)):
+    """Phase, progress and ETA of an ingestion job (and its result once finished)"""
+    job = rag_service.ingestion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown ingestion job: {job_id}")
+    return IngestJobResponse(**job.snapshot())
+
 
 @router.post("/query", response_model=QueryResponse)
-async def query_documents(request: QueryRequest):
+async def query_documents(request: QueryRequest, rag_service=Depends(get_rag_service)):
     """Query documents using RAG"""
     try:
         log_event(
@@ -86,7 +207,13 @@ async def query_documents(request: QueryRequest):
             question_length=len(request.question)
         )
         
-        result = rag_service.query(request.question)
+        result = await rag_service.aquery(
+            request.question,
+            k=request.k,
+            source_filter=request.sources,
+            max_distance=request.max_distance,
+            retrieval_mode=request.retrieval_mode
+        )
         
         log_event(
             logger, 
@@ -94,12 +221,14 @@ async def query_documents(request: QueryRequest):
             "RAG query completed successfully",
             question=request.question,
             answer_length=len(result["answer"]),
-            sources_found=len(result["sources"])
+            sources_found=len(result["sources"]),
+            cached=result["cached"]
         )
         
         return QueryResponse(
             answer=result["answer"],
-            sources=result["sources"]
+            sources=result["sources"],
+            cached=result["cached"]
         )
     except Exception as e:
         log_error(logger, e, {
@@ -107,3 +236,93 @@ async def query_documents(request: QueryRequest):
             "question": request.question
         })
         raise HTTPException(status_code=500, detail=f"Query failed: {str(e)}")
+
+
+@router.post("/query/batch", response_model=BatchQueryResponse)
+async def query_documents_batch(request: BatchQueryRequest, rag_service=Depends(get_rag_service)):
+    """Answer a list of questions with shared embedding and search batches"""
+    try:
+        log_event(
+            logger, 
+            "batch_query_started", 
+            "Processing batched RAG query",
+            question_count=len(request.questions)
+        )
+        
+        results = await rag_service.aquery_batch(
+            request.questions,
+            k=request.k,
+            source_filter=request.sources,
+            max_distance=request.max_distance,
+            retrieval_mode=request.retrieval_mode
+        )
+        
+        log_event(
+            logger, 
+            "batch_query_completed", 
+            "Batched RAG query completed successfully",
+            question_count=len(request.questions),
+            cached=sum(1 for result in results if result["cached"])
+        )
+        
+        return BatchQueryResponse(results=[
+            QueryResponse(
+                answer=result["answer"],
+                sources=result["sources"],
+                cached=result["cached"]
+            )
+            for result in results
+        ])
+    except Exception as e:
+        log_error(logger, e, {
+            "operation": "rag_query_batch",
+            "question_count": len(request.questions)
+        })
+        raise HTTPException(status_code=500, detail=f"Batch query failed: {str(e)}")
+
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/query/stream")
+async def query_documents_stream(request: QueryRequest, rag_service=Depends(get_rag_service)):
+    """Query documents using RAG, streaming sources and then answer tokens as Server-Sent Events"""
+    log_event(
+        logger, 
+        "query_started", 
+        "Processing streaming RAG query",
+        question=request.question,
+        question_length=len(request.question)
+    )
+
+    async def event_stream() -> AsyncIterator[str]:
+        try:
+            events = rag_service.astream_query(
+                request.question,
+                k=request.k,
+                source_filter=request.sources,
+                max_distance=request.max_distance,
+                retrieval_mode=request.retrieval_mode
+            )
+            async for event in events:
+                data = event["data"]
+                timings = current_stage_timings()
+                if event["event"] == "done" and timings is not None:
+                    # The Server-Timing header went out before the stages ran
+                    data = {**data, "server_timing": timings.server_timing()}
+                yield _sse_event(event["event"], data)
+        except Exception as e:
+            # Headers are already sent, so the failure is reported in-band
+            log_error(logger, e, {
+                "operation": "rag_query_stream",
+                "question": request.question
+            })
+            yield _sse_event("error", {"detail": f"Query failed: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
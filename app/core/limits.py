@@ -0,0 +1,18 @@
+"""
+Request limits shared by the API models and the RAG service.
+
+Kept free of heavy imports so the API layer can validate requests without loading
+the services behind it.
+"""
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+INGEST_MODES = ("incremental", "full")
+
+# Largest k a client may request per question
+QUERY_MAX_K = int(os.getenv("QUERY_MAX_K", "20"))
+
+# Questions accepted per batched query request
+QUERY_BATCH_MAX_QUESTIONS = int(os.getenv("QUERY_BATCH_MAX_QUESTIONS", "256"))
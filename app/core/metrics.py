@@ -1,10 +1,24 @@
 """
 Prometheus metrics configuration and collectors for RSM RAG microservice
 """
-from prometheus_client import Counter, Histogram, Gauge, Info, generate_latest, CONTENT_TYPE_LATEST
-from typing import Dict
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, Gauge, Info, generate_latest, multiprocess, CONTENT_TYPE_LATEST
+)
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+import os
+import re
+import tempfile
 import time
 
+# Set (by app.main or the deployment) when several worker processes serve the app: every
+# collector then writes its samples to per-process files there, and /metrics aggregates them.
+# prometheus_client reads it when it is imported, so it must be set before the workers start.
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+if PROMETHEUS_MULTIPROC_DIR:
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
 
 # Application info
 app_info = Info('rsm_rag_info', 'RSM RAG microservice information')
@@ -30,7 +44,8 @@ http_request_duration_seconds = Histogram(
 http_requests_in_progress = Gauge(
     'http_requests_in_progress',
     'HTTP requests currently being processed',
-    ['method', 'endpoint']
+    ['method', 'endpoint'],
+    multiprocess_mode='livesum'  # summed over the running workers
 )
 
 # RAG-specific business metrics
@@ -52,6 +67,58 @@ rag_sources_found = Histogram(
     buckets=(0, 1, 2, 3, 5, 10, 15, 20)
 )
 
+rag_time_to_first_token_seconds = Histogram(
+    'rag_time_to_first_token_seconds',
+    'Time from the start of a streaming RAG query to its first answer token',
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0)
+)
+
+# One histogram, so every stage has the same buckets and stages can be compared directly
+RAG_STAGES = ("query_embedding", "vector_search", "context_build", "llm_first_token", "llm_total")
+
+rag_stage_duration_seconds = Histogram(
+    'rag_stage_duration_seconds',
+    'Duration of one stage of RAG query processing in seconds',
+    # stage: query_embedding, vector_search, context_build, llm_first_token, llm_total
+    # mode: single (one question), batch (one call for all questions of a batch)
+    ['stage', 'mode'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+rag_llm_tokens_total = Counter(
+    'rag_llm_tokens_total',
+    'Tokens of LLM prompts and completions, as reported by the API',
+    ['type']  # prompt, completion
+)
+
+rag_context_tokens = Histogram(
+    'rag_context_tokens',
+    'Tokens of retrieved context sent to the LLM per question',
+    buckets=(100, 250, 500, 1000, 2000, 3000, 4000, 8000)
+)
+
+rag_context_tokens_saved_total = Counter(
+    'rag_context_tokens_saved_total',
+    'Context tokens saved by merging overlapping chunks and enforcing the token budget'
+)
+
+rag_answer_cache_requests_total = Counter(
+    'rag_answer_cache_requests_total',
+    'Semantic answer cache lookups',
+    ['result']  # hit, miss
+)
+
+rag_answer_cache_saved_seconds_total = Counter(
+    'rag_answer_cache_saved_seconds_total',
+    'Query processing time saved by answering from the semantic cache'
+)
+
+rag_coalesced_requests_total = Counter(
+    'rag_coalesced_requests_total',
+    'Requests that joined an identical in-flight computation instead of starting their own',
+    ['operation']
+)
+
 # Document ingestion metrics
 document_ingestion_total = Counter(
     'document_ingestion_total',
@@ -70,6 +137,12 @@ documents_processed_total = Counter(
     'Total number of documents processed'
 )
 
+document_page_fetches_total = Counter(
+    'document_page_fetches_total',
+    'Source page fetches by page and cache outcome',
+    ['page', 'result']  # result: miss, not_modified, modified
+)
+
 # Vector store metrics
 vector_store_operations_total = Counter(
     'vector_store_operations_total',
@@ -79,7 +152,9 @@ vector_store_operations_total = Counter(
 
 vector_store_collection_size = Gauge(
     'vector_store_collection_size',
-    'Current number of documents in vector store collection'
+    'Current number of documents in vector store collection',
+    ['source'],
+    multiprocess_mode='livemostrecent'  # every worker publishes the same counts; the latest wins
 )
 
 # Embedding metrics
@@ -96,6 +171,24 @@ embedding_generation_duration_seconds = Histogram(
     buckets=(0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0)
 )
 
+query_embedding_batch_size = Histogram(
+    'query_embedding_batch_size',
+    'Number of query embeddings sent per micro-batched embedding request',
+    buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+
+# Embedding cache metrics
+embedding_cache_requests_total = Counter(
+    'embedding_cache_requests_total',
+    'Embedding cache lookups',
+    ['result']  # hit, miss
+)
+
+embedding_cache_evictions_total = Counter(
+    'embedding_cache_evictions_total',
+    'Embeddings evicted from the cache to stay within its size limit'
+)
+
 # Error metrics
 errors_total = Counter(
     'errors_total',
@@ -104,29 +197,68 @@ errors_total = Counter(
 )
 
 
+class StageTimings:
+    """Durations of the RAG stages run for one request, for its Server-Timing header"""
+
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+
+    def add(self, stage: str, duration_seconds: float):
+        # A stage run more than once for the request (e.g. per question of a batch) is summed
+        self.durations[stage] = self.durations.get(stage, 0.0) + duration_seconds
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, durations in milliseconds"""
+        return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.durations.items())
+
+
+# The stage timings of the request being handled, if they are being collected
+_stage_timings: ContextVar[Optional[StageTimings]] = ContextVar("rag_stage_timings", default=None)
+
+
+def collect_stage_timings() -> StageTimings:
+    """Start collecting the stage durations recorded in the current context (the current request)"""
+    timings = StageTimings()
+    _stage_timings.set(timings)
+    return timings
+
+
+def current_stage_timings() -> Optional[StageTimings]:
+    return _stage_timings.get()
+
+
+class HttpRequestTiming:
+    """Timing of one HTTP request, carried by the request itself from start to end"""
+
+    def __init__(self, method: str, endpoint: str):
+        self.method = method
+        self.endpoint = endpoint
+        self.start = time.perf_counter()
+        self.finished = False
+        self.in_progress = http_requests_in_progress.labels(method=method, endpoint=endpoint)
+
+
 class MetricsRecorder:
     """Helper class to record metrics with timing context"""
     
-    def __init__(self):
-        self._active_requests: Dict[str, float] = {}
-    
-    def record_http_request_start(self, method: str, endpoint: str) -> str:
-        """Record start of HTTP request and return tracking key"""
-        key = f"{method}:{endpoint}:{time.time()}"
-        self._active_requests[key] = time.time()
-        http_requests_in_progress.labels(method=method, endpoint=endpoint).inc()
-        return key
-    
-    def record_http_request_end(self, key: str, method: str, endpoint: str, status_code: int):
-        """Record end of HTTP request"""
-        if key in self._active_requests:
-            duration = time.time() - self._active_requests[key]
-            del self._active_requests[key]
-            
-            # Record metrics
-            http_requests_total.labels(method=method, endpoint=endpoint, status_code=status_code).inc()
-            http_request_duration_seconds.labels(method=method, endpoint=endpoint).observe(duration)
-            http_requests_in_progress.labels(method=method, endpoint=endpoint).dec()
+    def record_http_request_start(self, method: str, endpoint: str) -> HttpRequestTiming:
+        """Record start of HTTP request and return its timing, to be passed to record_http_request_end"""
+        timing = HttpRequestTiming(method, endpoint)
+        timing.in_progress.inc()
+        return timing
+    
+    def record_http_request_end(self, timing: HttpRequestTiming, status_code: int):
+        """Record end of HTTP request (once; later calls for the same request are ignored)"""
+        if timing.finished:
+            return
+        timing.finished = True
+        duration = time.perf_counter() - timing.start
+        
+        # Record metrics
+        method, endpoint = timing.method, timing.endpoint
+        http_requests_total.labels(method=method, endpoint=endpoint, status_code=status_code).inc()
+        http_request_duration_seconds.labels(method=method, endpoint=endpoint).observe(duration)
+        timing.in_progress.dec()
     
     def record_rag_query(self, duration_seconds: float, sources_count: int, success: bool = True):
         """Record RAG query metrics"""
@@ -137,6 +269,50 @@ class MetricsRecorder:
             rag_query_duration_seconds.observe(duration_seconds)
             rag_sources_found.observe(sources_count)
     
+    def record_time_to_first_token(self, duration_seconds: float):
+        """Record the time to the first streamed answer token"""
+        rag_time_to_first_token_seconds.observe(duration_seconds)
+    
+    def record_rag_stage(self, stage: str, duration_seconds: float, mode: str = "single"):
+        """Record the duration of a RAG stage, also in the current request's stage timings"""
+        rag_stage_duration_seconds.labels(stage=stage, mode=mode).observe(duration_seconds)
+        timings = _stage_timings.get()
+        if timings is not None:
+            timings.add(stage, duration_seconds)
+    
+    @contextmanager
+    def time_rag_stage(self, stage: str, mode: str = "single") -> Iterator[None]:
+        """Record the duration of the enclosed block as a RAG stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_rag_stage(stage, time.perf_counter() - start, mode)
+    
+    def record_llm_tokens(self, prompt_tokens: int, completion_tokens: int):
+        """Record the prompt and completion tokens of an LLM call"""
+        if prompt_tokens:
+            rag_llm_tokens_total.labels(type="prompt").inc(prompt_tokens)
+        if completion_tokens:
+            rag_llm_tokens_total.labels(type="completion").inc(completion_tokens)
+    
+    def record_context_assembly(self, tokens: int, tokens_saved: int):
+        """Record the size of an assembled LLM context and the tokens assembly saved"""
+        rag_context_tokens.observe(tokens)
+        if tokens_saved:
+            rag_context_tokens_saved_total.inc(tokens_saved)
+    
+    def record_answer_cache_lookup(self, hit: bool, saved_seconds: float = 0.0):
+        """Record a semantic answer cache lookup and the latency a hit saved"""
+        result = "hit" if hit else "miss"
+        rag_answer_cache_requests_total.labels(result=result).inc()
+        if hit and saved_seconds > 0:
+            rag_answer_cache_saved_seconds_total.inc(saved_seconds)
+    
+    def record_coalesced_request(self, operation: str):
+        """Record a request served by an identical in-flight computation"""
+        rag_coalesced_requests_total.labels(operation=operation).inc()
+    
     def record_document_ingestion(self, duration_seconds: float, documents_count: int, success: bool = True):
         """Record document ingestion metrics"""
         status = "success" if success else "error"
@@ -146,20 +322,39 @@ class MetricsRecorder:
             document_ingestion_duration_seconds.observe(duration_seconds)
             documents_processed_total.inc(documents_count)
     
+    def record_document_page_fetch(self, page: str, result: str):
+        """Record a source page fetch and whether the page cache could be reused"""
+        document_page_fetches_total.labels(page=page, result=result).inc()
+    
     def record_vector_store_operation(self, operation: str, success: bool = True):
         """Record vector store operation"""
         status = "success" if success else "error"
         vector_store_operations_total.labels(operation=operation, status=status).inc()
     
-    def update_vector_store_size(self, size: int):
-        """Update vector store collection size"""
-        vector_store_collection_size.set(size)
+    def update_vector_store_size(self, source: str, size: int):
+        """Update vector store collection size of one source"""
+        vector_store_collection_size.labels(source=source).set(size)
     
     def record_embeddings_generated(self, count: int, embedding_type: str, duration_seconds: float):
         """Record embedding generation metrics"""
         embeddings_generated_total.labels(type=embedding_type).inc(count)
         embedding_generation_duration_seconds.labels(type=embedding_type).observe(duration_seconds)
     
+    def record_query_embedding_batch(self, size: int):
+        """Record the size of a micro-batch of query embeddings"""
+        query_embedding_batch_size.observe(size)
+    
+    def record_embedding_cache_lookup(self, hits: int, misses: int):
+        """Record embedding cache hits and misses"""
+        if hits:
+            embedding_cache_requests_total.labels(result="hit").inc(hits)
+        if misses:
+            embedding_cache_requests_total.labels(result="miss").inc(misses)
+    
+    def record_embedding_cache_evictions(self, count: int):
+        """Record embeddings evicted from the cache"""
+        embedding_cache_evictions_total.inc(count)
+    
     def record_error(self, error_type: str, operation: str):
         """Record error occurrence"""
         errors_total.labels(error_type=error_type, operation=operation).inc()
@@ -169,6 +364,65 @@ class MetricsRecorder:
 metrics_recorder = MetricsRecorder()
 
 
+_multiprocess_registry: Optional[CollectorRegistry] = None
+
+# Per-process files of the live gauges, e.g. gauge_livesum_1234.db
+_LIVE_GAUGE_FILE = re.compile(r"gauge_live\w*_(\d+)\.db$")
+
+
+def _aggregated_registry() -> CollectorRegistry:
+    """Registry collecting the samples of all worker processes"""
+    global _multiprocess_registry
+    if _multiprocess_registry is None:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=PROMETHEUS_MULTIPROC_DIR)
+        # Info metrics are not written to the shared files; every worker holds the same value
+        registry.register(app_info)
+        _multiprocess_registry = registry
+    return _multiprocess_registry
+
+
 def get_metrics_content() -> tuple[str, str]:
-    """Get Prometheus metrics content and content type"""
-    return generate_latest(), CONTENT_TYPE_LATEST
\ No newline at end of file
+    """Get Prometheus metrics content and content type (aggregated over all workers in multi-process mode)"""
+    if PROMETHEUS_MULTIPROC_DIR:
+        return generate_latest(_aggregated_registry()), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def prepare_multiprocess_directory() -> str:
+    """Point PROMETHEUS_MULTIPROC_DIR at an empty directory for the workers about to be started.
+
+    Uses the configured directory (or a new temporary one) and removes the files of a previous run,
+    whose counters would otherwise be added to this run's.
+    """
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR") or tempfile.mkdtemp(prefix="prometheus_multiproc_")
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith(".db"):
+            os.remove(os.path.join(directory, name))
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = directory
+    return directory
+
+
+def mark_worker_exited(pid: int = None):
+    """Drop the live gauge values of a worker that is exiting (this process by default)"""
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid or os.getpid(), path=PROMETHEUS_MULTIPROC_DIR)
+
+
+def remove_dead_workers():
+    """Drop the live gauge values of workers that died without mark_worker_exited, e.g. killed ones"""
+    if not PROMETHEUS_MULTIPROC_DIR:
+        return
+    pids = set()
+    for name in os.listdir(PROMETHEUS_MULTIPROC_DIR):
+        match = _LIVE_GAUGE_FILE.match(name)
+        if match:
+            pids.add(int(match.group(1)))
+    for pid in pids:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            mark_worker_exited(pid)
+        except PermissionError:
+            pass
\ No newline at end of file
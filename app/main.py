@@ -1,18 +1,40 @@
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.api.endpoints import router
+from app.api.endpoints import router, rag_services
 from app.middleware.logging_middleware import LoggingMiddleware
 from app.middleware.metrics_middleware import MetricsMiddleware
+from app.middleware.server_timing_middleware import ServerTimingMiddleware, SERVER_TIMING_ENABLED
 from app.core.logging_config import setup_logging
+from app.core.metrics import mark_worker_exited, prepare_multiprocess_directory, remove_dead_workers
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Worker processes for `python -m app.main` (uvicorn reads the same variable for --workers)
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
 # Initialize structured logging
 setup_logging()
 
-app = FastAPI(title="RSM RAG Test Microservice", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the services in the background: the port is bound and /health answers at once,
+    # /ready turns 200 once queries can be served
+    rag_services.start()
+    # With several workers: forget the in-progress requests of workers that were killed
+    remove_dead_workers()
+    yield
+    rag_services.close()
+    mark_worker_exited()
+
+
+app = FastAPI(title="RSM RAG Test Microservice", version="1.0.0", lifespan=lifespan)
 
 # Add middleware (order matters - metrics first, then logging)
+if SERVER_TIMING_ENABLED:
+    app.add_middleware(ServerTimingMiddleware)
 app.add_middleware(MetricsMiddleware)
 app.add_middleware(LoggingMiddleware)
 
@@ -20,4 +42,9 @@ app.include_router(router)
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    if WEB_CONCURRENCY > 1:
+        # Workers are separate processes; their metrics are aggregated through shared files
+        prepare_multiprocess_directory()
+        uvicorn.run("app.main:app", host="0.0.0.0", port=8000, workers=WEB_CONCURRENCY)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
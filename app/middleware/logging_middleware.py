@@ -1,52 +1,53 @@
 import time
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from app.core.logging_config import get_logger, log_request, log_response
 
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware to log all incoming requests and responses"""
+class LoggingMiddleware:
+    """Middleware to log all incoming requests and responses.
+
+    Plain ASGI middleware: it wraps send to read the status from the http.response.start
+    message instead of running the endpoint in a separate task with a proxied body stream,
+    as BaseHTTPMiddleware does.
+    """
     
-    def __init__(self, app):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp):
+        self.app = app
         self.logger = get_logger("middleware")
     
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
         # Record start time
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         # Extract request details
-        method = request.method
-        path = request.url.path
-        query_params = str(request.query_params) if request.query_params else None
+        method = scope["method"]
+        path = scope["path"]
+        query_params = scope.get("query_string", b"").decode("latin-1")
         
         # Log request
         if query_params:
             log_request(self.logger, method, path, query_params=query_params)
         else:
             log_request(self.logger, method, path)
+
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
         
         # Process request
         try:
-            response = await call_next(request)
-            
-            # Calculate duration
-            duration_ms = (time.time() - start_time) * 1000
-            
-            # Log successful response
-            log_response(
-                self.logger, 
-                method, 
-                path, 
-                response.status_code, 
-                duration_ms
-            )
-            
-            return response
-            
+            await self.app(scope, receive, send_wrapper)
         except Exception as e:
             # Calculate duration for failed requests
-            duration_ms = (time.time() - start_time) * 1000
+            duration_ms = (time.perf_counter() - start_time) * 1000
             
             # Log error response
             self.logger.error(
@@ -63,4 +64,16 @@ class LoggingMiddleware(BaseHTTPMiddleware):
             )
             
             # Re-raise the exception
-            raise
\ No newline at end of file
+            raise
+
+        # Calculate duration (until the last body chunk was sent, also for streamed responses)
+        duration_ms = (time.perf_counter() - start_time) * 1000
+
+        # Log successful response
+        log_response(
+            self.logger, 
+            method, 
+            path, 
+            status_code, 
+            duration_ms
+        )
@@ -1,11 +1,14 @@
 """
 Middleware to collect Prometheus metrics for HTTP requests
 """
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
+import asyncio
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from app.core.metrics import metrics_recorder
 from app.core.logging_config import get_logger
 
+# nginx's status for requests the client abandoned before a response was started
+CLIENT_CLOSED_REQUEST = 499
+
 
 def _get_endpoint_name(path: str) -> str:
     """Normalize endpoint path for metrics (remove dynamic parts)"""
@@ -16,45 +19,55 @@ def _get_endpoint_name(path: str) -> str:
         return "/ingest"
     elif path.startswith("/health"):
         return "/health"
+    elif path.startswith("/ready"):
+        return "/ready"
     elif path.startswith("/metrics"):
         return "/metrics"
     else:
         return path
 
 
-class MetricsMiddleware(BaseHTTPMiddleware):
-    """Middleware to collect HTTP request metrics"""
+class MetricsMiddleware:
+    """Middleware to collect HTTP request metrics.
+
+    Plain ASGI middleware: the status code is taken from the http.response.start message
+    and the duration runs until the response body has been sent.
+    """
     
-    def __init__(self, app):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp):
+        self.app = app
         self.logger = get_logger("metrics_middleware")
 
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
         # Extract request info
-        method = request.method
-        path = request.url.path
-        endpoint = _get_endpoint_name(path)
+        method = scope["method"]
+        endpoint = _get_endpoint_name(scope["path"])
         
         # Start tracking request
-        tracking_key = metrics_recorder.record_http_request_start(method, endpoint)
+        timing = metrics_recorder.record_http_request_start(method, endpoint)
+        status_code = None
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
         
         try:
             # Process request
-            response = await call_next(request)
-            
-            # Record successful response
-            metrics_recorder.record_http_request_end(
-                tracking_key, method, endpoint, response.status_code
-            )
-            
-            return response
+            await self.app(scope, receive, send_wrapper)
             
+        except asyncio.CancelledError:
+            # The client went away before a response was started
+            if status_code is None:
+                status_code = CLIENT_CLOSED_REQUEST
+            raise
+
         except Exception as e:
-            # Record error response (assume 500 for exceptions)
-            metrics_recorder.record_http_request_end(
-                tracking_key, method, endpoint, 500
-            )
-            
             # Record error metrics
             metrics_recorder.record_error(
                 error_type=type(e).__name__,
@@ -62,4 +75,9 @@ class MetricsMiddleware(BaseHTTPMiddleware):
             )
             
             # Re-raise the exception
-            raise
\ No newline at end of file
+            raise
+
+        finally:
+            # Every started request ends here, so the in-progress gauge cannot drift
+            # (500 if the request failed before a response was started)
+            metrics_recorder.record_http_request_end(timing, status_code or 500)
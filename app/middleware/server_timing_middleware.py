@@ -0,0 +1,42 @@
+"""
+Middleware adding a Server-Timing header with the RAG stage durations of each request
+"""
+import os
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.metrics import collect_stage_timings
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Off by default: the header exposes the service's internal latency breakdown to every client
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+
+
+class ServerTimingMiddleware:
+    """Collect the stage durations recorded while handling a request (query embedding, vector search,
+    context build, LLM) and send them in a Server-Timing header, e.g.
+    `query_embedding;dur=212.4, vector_search;dur=3.1, context_build;dur=0.8, llm_total;dur=911.0`.
+
+    Requests that ran no stage (health checks, cached answers before retrieval) get no header.
+    Streamed responses send their headers before the stages run; /query/stream reports the
+    breakdown in its final "done" event instead.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = collect_stage_timings()
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start" and timings.durations:
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
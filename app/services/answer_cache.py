@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_SIMILARITY_THRESHOLD = float(os.getenv("ANSWER_CACHE_SIMILARITY_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+
+
+class AnswerCache:
+    """In-memory semantic cache of RAG answers keyed on the query embedding.
+
+    A lookup returns the answer of the most similar cached question if its cosine
+    similarity reaches the threshold. Entries expire after a TTL, the least recently
+    used ones are evicted beyond max_entries, and every entry is tied to the vector
+    store version it was computed against so ingestion invalidates it. An entry only
+    answers lookups with the same k and scope (any other retrieval parameters).
+    """
+
+    def __init__(self, similarity_threshold: float = None, ttl_seconds: float = None, max_entries: int = None):
+        self.similarity_threshold = (
+            similarity_threshold if similarity_threshold is not None else ANSWER_CACHE_SIMILARITY_THRESHOLD
+        )
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else ANSWER_CACHE_TTL_SECONDS
+        self.max_entries = max_entries if max_entries is not None else ANSWER_CACHE_MAX_ENTRIES
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._next_key = 0
+        # Stacked normalized embeddings of all entries, rebuilt lazily after inserts/evictions
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[int] = []
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def lookup(self, query_embedding: List[float], k: int, version: int,
+               scope: Hashable = None) -> Optional[Dict[str, Any]]:
+        """Return the cached entry for the most similar question, or None"""
+        query = _normalize(query_embedding)
+        now = time.time()
+
+        with self._lock:
+            self._drop_stale_locked(now, version)
+            if not self._entries:
+                return None
+
+            if self._matrix is None:
+                self._matrix_keys = list(self._entries)
+                self._matrix = np.stack([self._entries[key]["embedding"] for key in self._matrix_keys])
+
+            similarities = self._matrix @ query
+            for index in np.argsort(similarities)[::-1]:
+                if similarities[index] < self.similarity_threshold:
+                    return None
+                key = self._matrix_keys[index]
+                entry = self._entries[key]
+                if entry["k"] == k and entry["scope"] == scope:
+                    self._entries.move_to_end(key)
+                    return {**entry, "similarity": float(similarities[index])}
+            return None
+
+    def store(self, query_embedding: List[float], k: int, version: int, result: Dict[str, Any],
+              duration_seconds: float, scope: Hashable = None):
+        """Cache an answer together with how long it took to compute"""
+        with self._lock:
+            self._entries[self._next_key] = {
+                "embedding": _normalize(query_embedding),
+                "k": k,
+                "scope": scope,
+                "version": version,
+                "result": result,
+                "duration_seconds": duration_seconds,
+                "created_at": time.time(),
+            }
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def _drop_stale_locked(self, now: float, version: int):
+        stale = [
+            key for key, entry in self._entries.items()
+            if entry["version"] != version or now - entry["created_at"] > self.ttl_seconds
+        ]
+        for key in stale:
+            del self._entries[key]
+        if stale:
+            self._matrix = None
+
+
+def _normalize(embedding: List[float]) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
@@ -0,0 +1,141 @@
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens; identifiers with underscores also yield their parts.
+
+    "__init__" gives ["__init__", "init"] and "snake_case" gives ["snake_case", "snake", "case"],
+    so both the exact identifier and its words match.
+    """
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        if "_" in token:
+            tokens.extend(part for part in token.split("_") if part)
+    return tokens
+
+
+class BM25Index:
+    """In-memory BM25 inverted index over chunk texts, persisted as JSON.
+
+    Only term frequencies are stored per chunk; the postings lists are rebuilt on load.
+    Chunks are added, replaced and removed incrementally alongside the vector store.
+    """
+
+    FILE_NAME = "bm25_index.json"
+
+    def __init__(self, path: str, k1: float = BM25_K1, b: float = BM25_B):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._doc_terms: Dict[str, Dict[str, int]] = {}
+        self._doc_sources: Dict[str, str] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._doc_terms)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["BM25Index"]:
+        """Load a persisted index, or return None if there is none or it is unreadable"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                docs = json.load(f)["docs"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+        index = cls(path)
+        for doc_id, doc in docs.items():
+            index._add_locked(doc_id, doc["terms"], doc["source"])
+        return index
+
+    def add(self, ids: List[str], texts: List[str], sources: List[str]):
+        """Index chunks, replacing any already indexed under the same ID"""
+        with self._lock:
+            for doc_id, text, source in zip(ids, texts, sources):
+                self._remove_locked(doc_id)
+                terms = {}
+                for token in tokenize(text):
+                    terms[token] = terms.get(token, 0) + 1
+                self._add_locked(doc_id, terms, source)
+
+    def update_sources(self, ids: List[str], sources: List[str]):
+        with self._lock:
+            for doc_id, source in zip(ids, sources):
+                if doc_id in self._doc_sources:
+                    self._doc_sources[doc_id] = source
+
+    def remove(self, ids: List[str]):
+        with self._lock:
+            for doc_id in ids:
+                self._remove_locked(doc_id)
+
+    def search(self, query: str, k: int, sources: Optional[List[str]] = None) -> List[Tuple[str, float]]:
+        """Return up to k (id, score) pairs, best first; only chunks of the given sources if set"""
+        allowed = set(sources) if sources is not None else None
+        with self._lock:
+            count = len(self._doc_terms)
+            if count == 0 or k <= 0:
+                return []
+            average_length = self._total_length / count
+
+            scores: Dict[str, float] = {}
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    if allowed is not None and self._doc_sources[doc_id] not in allowed:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / average_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def save(self):
+        with self._lock:
+            docs = {
+                doc_id: {"source": self._doc_sources[doc_id], "terms": terms}
+                for doc_id, terms in self._doc_terms.items()
+            }
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"docs": docs}, f)
+            os.replace(tmp_path, self.path)
+
+    def _add_locked(self, doc_id: str, terms: Dict[str, int], source: str):
+        self._doc_terms[doc_id] = terms
+        self._doc_sources[doc_id] = source
+        length = sum(terms.values())
+        self._doc_lengths[doc_id] = length
+        self._total_length += length
+        for term, frequency in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = frequency
+
+    def _remove_locked(self, doc_id: str):
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        del self._doc_sources[doc_id]
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        for term in terms:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
@@ -0,0 +1,99 @@
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Tuple
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain.schema import Document
+from app.services.token_counter import get_token_counter
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# "characters" or "tokens" (of TOKEN_ENCODING, the chat model's tokenizer)
+CHUNK_LENGTH_UNIT = os.getenv("CHUNK_LENGTH_UNIT", "characters")
+DEFAULT_CHUNK_SIZES = {"characters": (1000, 200), "tokens": (256, 50)}
+
+# Processes splitting large sources in parallel; 0 (the default) splits in the calling thread.
+# Spawned workers only pay off with spare cores and sources large enough to outweigh the pickling
+CHUNKING_PROCESSES = int(os.getenv("CHUNKING_PROCESSES", "0"))
+# Smaller texts are split in-process, where the pickling round trip costs more than it saves
+CHUNKING_POOL_MIN_CHARS = int(os.getenv("CHUNKING_POOL_MIN_CHARS", "100000"))
+
+# Length cache entries per splitter (the splitter measures most pieces more than once)
+_LENGTH_CACHE_SIZE = 8192
+
+_pool = None
+_pool_lock = threading.Lock()
+_worker_chunkers: Dict[Tuple[str, int, int], "Chunker"] = {}
+
+
+class Chunker:
+    """Splits text into overlapping chunks measured in characters or model tokens"""
+
+    def __init__(self, unit: str = CHUNK_LENGTH_UNIT, chunk_size: int = None, chunk_overlap: int = None):
+        if unit not in DEFAULT_CHUNK_SIZES:
+            raise ValueError(f"Unknown chunk length unit: {unit}")
+        default_size, default_overlap = DEFAULT_CHUNK_SIZES[unit]
+        self.unit = unit
+        self.chunk_size = chunk_size or default_size
+        self.chunk_overlap = chunk_overlap if chunk_overlap is not None else default_overlap
+
+        if unit == "tokens":
+            token_counter = get_token_counter()
+            length_function = functools.lru_cache(maxsize=_LENGTH_CACHE_SIZE)(token_counter.count)
+            # Estimated counts give different chunks than exact ones, so they are a different setting
+            unit_name = f"tokens:{token_counter.encoding_name if token_counter.exact else 'estimate'}"
+        else:
+            length_function = len
+            unit_name = "characters"
+
+        self.splitter = RecursiveCharacterTextSplitter(
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
+            length_function=length_function,
+        )
+        self.settings = f"{unit_name}:{self.chunk_size}:{self.chunk_overlap}"
+
+    def split(self, text: str) -> List[str]:
+        """Split text, on the chunking process pool when it is large enough to be worth it"""
+        if CHUNKING_PROCESSES <= 0 or len(text) < CHUNKING_POOL_MIN_CHARS:
+            return self.splitter.split_text(text)
+        return _get_pool().submit(
+            _split_in_worker, text, self.unit, self.chunk_size, self.chunk_overlap
+        ).result()
+
+
+def iter_chunk_documents(chunks: List[str], source: str) -> Iterator[Document]:
+    """Wrap split chunks in Documents one at a time"""
+    for i, chunk in enumerate(chunks):
+        yield Document(
+            page_content=chunk,
+            metadata={"source": source, "chunk_id": i, "total_chunks": len(chunks)}
+        )
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Shared chunking process pool, started on first use.
+
+    Workers are spawned rather than forked, since a fork taken while another thread holds
+    a lock (logging, the token counter) could deadlock the child.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=CHUNKING_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def _split_in_worker(text: str, unit: str, chunk_size: int, chunk_overlap: int) -> List[str]:
+    """Runs in a pool process; each process keeps one Chunker (and encoder) per setting"""
+    key = (unit, chunk_size, chunk_overlap)
+    chunker = _worker_chunkers.get(key)
+    if chunker is None:
+        chunker = _worker_chunkers[key] = Chunker(unit, chunk_size, chunk_overlap)
+    return chunker.splitter.split_text(text)
@@ -0,0 +1,89 @@
+import os
+from typing import Any, Dict, List, Tuple
+from app.services.token_counter import TokenCounter, get_token_counter
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Most tokens of retrieved text sent to the LLM per question
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+
+# Shorter common spans between neighbouring chunks are treated as coincidence, not overlap
+MIN_OVERLAP_CHARS = 20
+
+
+def _overlap(previous: str, following: str) -> int:
+    """Length of the longest suffix of previous that is also a prefix of following"""
+    if len(following) < MIN_OVERLAP_CHARS:
+        return 0
+    head = following[:MIN_OVERLAP_CHARS]
+    start = max(0, len(previous) - len(following))
+    position = previous.find(head, start)
+    while position != -1:
+        # The earliest match leaves the longest overlap
+        if following.startswith(previous[position:]):
+            return len(previous) - position
+        position = previous.find(head, position + 1)
+    return 0
+
+
+def _merge_run(texts: List[str]) -> str:
+    """Join the texts of consecutive chunks, dropping the overlap the splitter repeated"""
+    merged = texts[0]
+    for text in texts[1:]:
+        overlap = _overlap(merged, text)
+        merged += text[overlap:] if overlap else "\n" + text
+    return merged
+
+
+def assemble_context(search_results: List[Dict[str, Any]], token_budget: int = CONTEXT_TOKEN_BUDGET,
+                     token_counter: TokenCounter = None) -> Tuple[List[str], int, int]:
+    """Turn search results into the passages sent to the LLM.
+
+    Chunks of the same source with consecutive chunk_ids are merged into one passage without
+    their overlapping text, and duplicates are dropped. Passages keep the rank of their best
+    chunk and are added in that order until token_budget is used up; the passage that crosses
+    the budget is truncated. Returns the passages, their token count and the tokens saved
+    compared to sending every chunk verbatim.
+    """
+    if not search_results:
+        return [], 0, 0
+    token_counter = token_counter or get_token_counter()
+
+    # Results without a chunk_id are passages of their own, the others are grouped by position
+    runs = []
+    chunks = {}
+    for rank, result in enumerate(search_results):
+        chunk_id = result['metadata'].get('chunk_id')
+        if chunk_id is None:
+            runs.append([rank, [result['text']]])
+        else:
+            chunks.setdefault((result['metadata'].get('source', 'unknown'), chunk_id), (rank, result['text']))
+
+    previous_key = None
+    for key in sorted(chunks):
+        rank, text = chunks[key]
+        if previous_key is not None and key == (previous_key[0], previous_key[1] + 1):
+            runs[-1][0] = min(runs[-1][0], rank)
+            runs[-1][1].append(text)
+        else:
+            runs.append([rank, [text]])
+        previous_key = key
+    runs.sort(key=lambda run: run[0])
+
+    passages = []
+    used = 0
+    for _, texts in runs:
+        passage = _merge_run(texts)
+        tokens = token_counter.count(passage)
+        if used + tokens > token_budget:
+            passage = token_counter.truncate(passage, token_budget - used)
+            if passage:
+                passages.append(passage)
+                used += token_counter.count(passage)
+            break
+        passages.append(passage)
+        used += tokens
+
+    verbatim = sum(token_counter.count(result['text']) for result in search_results)
+    return passages, used, max(verbatim - used, 0)
@@ -1,108 +1,205 @@
+import contextvars
+import os
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
-from typing import List
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from typing import Callable, Collection, Iterator, List, Optional, Tuple
 from langchain.schema import Document
 from app.core.logging_config import get_logger, log_event, log_error
+from app.core.metrics import metrics_recorder
+from app.services.source_cache import SourceCache
+from app.services.chunking import Chunker, iter_chunk_documents
 from langfuse import observe
 from dotenv import load_dotenv
 
 load_dotenv()
 
+THINK_PYTHON_BASE_URL = "https://allendowney.github.io/ThinkPython/"
+PEP8_URL = "https://peps.python.org/pep-0008/"
 
-@observe(name="document_loading_think_python")
-def load_think_python() -> str:
-    """Load the Think Python book content"""
+# Maximum number of source pages fetched at the same time
+DOCUMENT_FETCH_CONCURRENCY = int(os.getenv("DOCUMENT_FETCH_CONCURRENCY", "8"))
+DOCUMENT_FETCH_TIMEOUT = float(os.getenv("DOCUMENT_FETCH_TIMEOUT", "30"))
+
+SOURCE_CACHE_ENABLED = os.getenv("SOURCE_CACHE_ENABLED", "true").lower() == "true"
+
+_session = None
+_source_cache = None
+_session_lock = threading.Lock()
+
+
+def _get_session() -> requests.Session:
+    """Shared keep-alive session whose connection pool matches the fetch concurrency"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=DOCUMENT_FETCH_CONCURRENCY)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def _get_source_cache() -> Optional[SourceCache]:
+    global _source_cache
+    with _session_lock:
+        if _source_cache is None and SOURCE_CACHE_ENABLED:
+            _source_cache = SourceCache()
+        return _source_cache
+
+
+def _fetch_page(url: str, page: str, extract: Callable[[bytes], Optional[str]]) -> Optional[str]:
+    """Fetch a page and extract its text, revalidating the on-disk copy with a conditional GET.
+
+    On 304 Not Modified the cached text is returned without parsing the HTML again.
+    """
+    cache = _get_source_cache()
+    cached = cache.get_page(url) if cache else None
+
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    response = _get_session().get(url, headers=headers, timeout=DOCUMENT_FETCH_TIMEOUT)
+    if response.status_code == 304 and cached:
+        metrics_recorder.record_document_page_fetch(page, "not_modified")
+        return cached["text"]
+    response.raise_for_status()
+
+    text = extract(response.content)
+    metrics_recorder.record_document_page_fetch(page, "modified" if cached else "miss")
+    if cache and text:
+        cache.put_page(
+            url,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+            response.content,
+            text
+        )
+    return text
+
+
+def _extract_think_python_chapter(content: bytes) -> Optional[str]:
+    soup = BeautifulSoup(content, 'html.parser')
+
+    # Extract main content (remove navigation, headers, etc.)
+    main_content = soup.find('main') or soup.find('div', class_='content') or soup.body
+    if main_content:
+        return main_content.get_text(strip=True, separator=' ')
+    return None
+
+
+def _extract_pep8(content: bytes) -> Optional[str]:
+    soup = BeautifulSoup(content, 'html.parser')
+
+    # PEP 8 content is in the main section
+    main_content = soup.find('section', id='pep-content') or soup.find('div', class_='section')
+    if main_content:
+        return main_content.get_text(strip=True, separator=' ')
+    return None
+
+
+def _run_concurrently(fn, items: list, max_workers: int) -> list:
+    """Map fn over items on a bounded thread pool, keeping order and the tracing context"""
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items) or 1))) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, fn, item) for item in items]
+        return [future.result() for future in futures]
+
+
+def _load_think_python_chapter(chapter: str) -> Optional[str]:
+    """Fetch and extract a single chapter; failures are logged and isolated to the chapter"""
     logger = get_logger("document_service")
-    log_event(logger, "think_python_load_started", "Loading Think Python book")
+    try:
+        text = _fetch_page(THINK_PYTHON_BASE_URL + chapter, chapter, _extract_think_python_chapter)
+        if text:
+            log_event(logger, "chapter_loaded", f"Loaded chapter", chapter=chapter)
+            return f"Chapter: {chapter}\n\n{text}"
 
-    # Think Python has multiple chapters, let's get the main chapters
-    base_url = "https://allendowney.github.io/ThinkPython/"
-    chapters = [f"chap{i:02d}.html" for i in range(1, 20)]
+    except Exception as e:
+        log_error(logger, e, {"operation": "load_think_python_chapter", "chapter": chapter})
 
-    all_content = []
+    return None
 
-    for chapter in chapters:
-        try:
-            url = base_url + chapter
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
 
-            soup = BeautifulSoup(response.content, 'html.parser')
+@observe(name="document_loading_think_python")
+def load_think_python() -> Tuple[str, bool]:
+    """Load the Think Python book content and whether every chapter of it was loaded"""
+    logger = get_logger("document_service")
+    log_event(logger, "think_python_load_started", "Loading Think Python book")
 
-            # Extract main content (remove navigation, headers, etc.)
-            main_content = soup.find('main') or soup.find('div', class_='content') or soup.body
-            if main_content:
-                text = main_content.get_text(strip=True, separator=' ')
-                all_content.append(f"Chapter: {chapter}\n\n{text}")
-                log_event(logger, "chapter_loaded", f"Loaded chapter", chapter=chapter)
+    # Think Python has multiple chapters, let's get the main chapters
+    chapters = [f"chap{i:02d}.html" for i in range(1, 20)]
 
-        except Exception as e:
-            log_error(logger, e, {"operation": "load_think_python_chapter", "chapter": chapter})
-            continue
+    # Chapters are fetched concurrently but joined in book order
+    all_content = _run_concurrently(_load_think_python_chapter, chapters, DOCUMENT_FETCH_CONCURRENCY)
 
-    return "\n\n".join(all_content)
+    missing = [chapter for chapter, content in zip(chapters, all_content) if not content]
+    if missing:
+        logger.warning(
+            "Think Python loaded without some chapters",
+            extra={"event_type": "think_python_incomplete", "missing_chapters": missing}
+        )
+    return "\n\n".join(content for content in all_content if content), not missing
 
 
 @observe(name="document_loading_pep8")
-def load_pep8() -> str:
-    """Load PEP 8 content"""
+def load_pep8() -> Tuple[str, bool]:
+    """Load PEP 8 content and whether it was loaded completely"""
     logger = get_logger("document_service")
     log_event(logger, "pep8_load_started", "Loading PEP 8")
 
     try:
-        url = "https://peps.python.org/pep-0008/"
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        # PEP 8 content is in the main section
-        main_content = soup.find('section', id='pep-content') or soup.find('div', class_='section')
-        if main_content:
-            text = main_content.get_text(strip=True, separator=' ')
+        text = _fetch_page(PEP8_URL, "pep-0008", _extract_pep8)
+        if text:
             log_event(logger, "pep8_loaded", "PEP 8 loaded successfully")
-            return text
+            return text, True
         else:
             logger.warning(
                 "PEP 8 content not found",
                 extra={"event_type": "pep8_content_missing"}
             )
-            return ""
+            return "", False
 
     except Exception as e:
         log_error(logger, e, {"operation": "load_pep8"})
-        return ""
+        return "", False
+
+
+def _source_loaders() -> List[Tuple[str, Callable[[], Tuple[str, bool]]]]:
+    """Every ingested source with its loader, in ingestion order.
+
+    A loader returns the source text and whether all of it was loaded; the text of a source
+    with pages that failed to load is partial.
+    """
+    return [("Think Python", load_think_python), ("PEP 8", load_pep8)]
 
 
 class DocumentService:
     def __init__(self):
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len,
-        )
+        self.chunker = Chunker()
+        self.splitter_settings = self.chunker.settings
         self.logger = get_logger("document_service")
 
-    @observe(name="document_chunking")
-    def chunk_text(self, text: str, source: str) -> List[Document]:
-        """Split text into chunks"""
+    def iter_chunks(self, text: str, source: str) -> Iterator[Document]:
+        """Split text into chunks and yield them as Documents.
+
+        The whole text is split before the first chunk is yielded; only the Documents are built one at a time.
+        """
         log_event(
             self.logger, 
             "text_chunking_started", 
             "Starting text chunking",
             source=source,
-            text_length=len(text)
+            text_length=len(text),
+            unit=self.chunker.unit
         )
-        chunks = self.text_splitter.split_text(text)
-        documents = []
-
-        for i, chunk in enumerate(chunks):
-            doc = Document(
-                page_content=chunk,
-                metadata={"source": source, "chunk_id": i, "total_chunks": len(chunks)}
-            )
-            documents.append(doc)
+        chunks = self.chunker.split(text)
 
         log_event(
             self.logger, 
@@ -111,23 +208,70 @@ class DocumentService:
             source=source,
             chunks_created=len(chunks)
         )
+        yield from iter_chunk_documents(chunks, source)
+
+    @observe(name="document_chunking")
+    def chunk_text(self, text: str, source: str) -> List[Document]:
+        """Split text into chunks"""
+        return list(self.iter_chunks(text, source))
+
+    def _chunk_source(self, text: str, source: str) -> List[Document]:
+        """All chunks of a source, reusing the cached chunks when its text has not changed"""
+        cache = _get_source_cache()
+        if cache is None:
+            return self.chunk_text(text, source)
+
+        key = SourceCache.chunks_key(source, text, self.splitter_settings)
+        documents = cache.get_chunks(key)
+        if documents is not None:
+            log_event(
+                self.logger,
+                "text_chunking_skipped",
+                "Source unchanged, reusing cached chunks",
+                source=source,
+                chunks_reused=len(documents)
+            )
+            return documents
+
+        documents = self.chunk_text(text, source)
+        cache.put_chunks(key, source, documents)
         return documents
 
+    def iter_source_documents(self, skip_sources: Collection[str] = ()
+                              ) -> Iterator[Tuple[str, List[Document], bool]]:
+        """Yield (source, chunks, complete) per source as soon as that source has been fetched and chunked.
+
+        Each source is chunked right after its fetch and yielded with all of its chunks, so with
+        CHUNKING_PROCESSES set large sources are split in parallel on the chunking process pool.
+        Sources in skip_sources are not fetched. complete is
+        False when part of the source failed to load, so its chunks are not all of it.
+        """
+        loaders = [(source, load) for source, load in _source_loaders() if source not in skip_sources]
+        if not loaders:
+            return
+
+        with ThreadPoolExecutor(max_workers=len(loaders)) as executor:
+            futures = {
+                executor.submit(contextvars.copy_context().run, self._load_and_chunk, source, load): source
+                for source, load in loaders
+            }
+            for future in as_completed(futures):
+                documents, complete = future.result()
+                if documents:
+                    yield futures[future], documents, complete
+
+    def _load_and_chunk(self, source: str, load: Callable[[], Tuple[str, bool]]) -> Tuple[List[Document], bool]:
+        text, complete = load()
+        return (self._chunk_source(text, source) if text else []), complete
+
     def load_all_documents(self) -> List[Document]:
         """Load and chunk all documents"""
-        all_documents = []
+        documents_by_source = {source: documents for source, documents, _ in self.iter_source_documents()}
 
-        # Load Think Python
-        think_python_text = load_think_python()
-        if think_python_text:
-            think_python_docs = self.chunk_text(think_python_text, "Think Python")
-            all_documents.extend(think_python_docs)
-
-        # Load PEP 8
-        pep8_text = load_pep8()
-        if pep8_text:
-            pep8_docs = self.chunk_text(pep8_text, "PEP 8")
-            all_documents.extend(pep8_docs)
+        # Keep a stable source order regardless of which fetch finished first
+        all_documents = []
+        for source, _ in _source_loaders():
+            all_documents.extend(documents_by_source.get(source, []))
 
         log_event(
             self.logger, 
@@ -0,0 +1,128 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional
+from app.core.logging_config import get_logger, log_event
+from app.core.metrics import metrics_recorder
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "../data/embedding_cache.sqlite3")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "50000"))
+
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_BATCH_SIZE = 500
+
+
+def cache_key(model: str, dimensions: Optional[int], text: str) -> str:
+    """Content address of an embedding: hash of model, dimensions and text"""
+    digest = hashlib.sha256()
+    digest.update(f"{model}\x00{dimensions or ''}\x00".encode("utf-8"))
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """Disk-backed, content-addressed embedding cache with LRU eviction"""
+
+    def __init__(self, path: str = None, max_entries: int = None):
+        self.logger = get_logger("embedding_cache")
+        self.path = os.path.abspath(path or EMBEDDING_CACHE_PATH)
+        self.max_entries = max_entries if max_entries is not None else EMBEDDING_CACHE_MAX_ENTRIES
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+
+        log_event(
+            self.logger,
+            "embedding_cache_initialized",
+            "Embedding cache initialized",
+            path=self.path,
+            entries=len(self),
+            max_entries=self.max_entries
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Return the cached embeddings for the given keys, skipping misses"""
+        found = {}
+        now = time.time()
+        with self._lock:
+            unique_keys = list(dict.fromkeys(keys))
+            for start in range(0, len(unique_keys), _LOOKUP_BATCH_SIZE):
+                batch = unique_keys[start:start + _LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+                if rows:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                        [(now, key) for key, _ in rows]
+                    )
+            self._conn.commit()
+
+        hits = sum(1 for key in keys if key in found)
+        metrics_recorder.record_embedding_cache_lookup(hits=hits, misses=len(keys) - hits)
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        """Store embeddings and evict the least recently used entries over the limit"""
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, array("f", vector).tobytes(), now) for key, vector in items.items()]
+            )
+            evicted = self._evict_locked()
+            self._conn.commit()
+
+        if evicted:
+            metrics_recorder.record_embedding_cache_evictions(evicted)
+            log_event(
+                self.logger,
+                "embedding_cache_evicted",
+                "Evicted least recently used embeddings",
+                evicted=evicted,
+                max_entries=self.max_entries
+            )
+
+    def _evict_locked(self) -> int:
+        count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow <= 0:
+            return 0
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN ("
+            " SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+            (overflow,)
+        )
+        return overflow
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
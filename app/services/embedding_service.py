@@ -1,8 +1,10 @@
 from langchain_openai import OpenAIEmbeddings
 from langchain.schema import Document
-from typing import List
+from typing import List, Tuple
 from app.core.logging_config import get_logger, log_event, log_error
 from app.core.metrics import metrics_recorder
+from app.services.embedding_cache import EmbeddingCache, cache_key
+from app.services.micro_batcher import MicroBatcher
 from langfuse import observe
 import os
 import time
@@ -10,15 +12,35 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+
+# Async query embeddings arriving within the window are sent as one request
+QUERY_EMBEDDING_BATCHING_ENABLED = os.getenv("QUERY_EMBEDDING_BATCHING_ENABLED", "true").lower() == "true"
+QUERY_EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("QUERY_EMBEDDING_BATCH_WINDOW_MS", "5"))
+QUERY_EMBEDDING_MAX_BATCH_SIZE = int(os.getenv("QUERY_EMBEDDING_MAX_BATCH_SIZE", "32"))
+
 
 class EmbeddingService:
-    def __init__(self):
+    def __init__(self, cache: EmbeddingCache = None):
         self.embeddings = OpenAIEmbeddings(
             model="text-embedding-3-small",  # Cost-effective and good quality
             openai_api_key=os.getenv("OPENAI_API_KEY")
         )
         self.logger = get_logger("embedding_service")
 
+        # Document embeddings are content-addressed, so unchanged chunks are never re-embedded
+        if cache is None and EMBEDDING_CACHE_ENABLED:
+            cache = EmbeddingCache()
+        self.cache = cache
+
+        self.query_batcher = None
+        if QUERY_EMBEDDING_BATCHING_ENABLED:
+            self.query_batcher = MicroBatcher(
+                self._embed_query_batch,
+                max_batch_size=QUERY_EMBEDDING_MAX_BATCH_SIZE,
+                max_wait_seconds=QUERY_EMBEDDING_BATCH_WINDOW_MS / 1000
+            )
+
     @observe(name="embedding_computation_documents")
     def generate_embeddings(self, documents: List[Document]) -> List[List[float]]:
         """Generate embeddings for a list of documents"""
@@ -34,23 +56,28 @@ class EmbeddingService:
         texts = [doc.page_content for doc in documents]
 
         try:
-            # Generate embeddings in batches to avoid rate limits
-            embeddings = self.embeddings.embed_documents(texts)
-            
+            if self.cache is None:
+                embeddings = self.embeddings.embed_documents(texts)
+                computed = len(embeddings)
+            else:
+                embeddings, computed = self._embed_with_cache(texts)
+
             duration = time.time() - start_time
-            
+
             # Record metrics
-            metrics_recorder.record_embeddings_generated(
-                count=len(embeddings),
-                embedding_type="document",
-                duration_seconds=duration
-            )
-            
+            if computed:
+                metrics_recorder.record_embeddings_generated(
+                    count=computed,
+                    embedding_type="document",
+                    duration_seconds=duration
+                )
+
             log_event(
                 self.logger, 
                 "embedding_generation_completed", 
                 "Embedding generation completed",
-                embeddings_generated=len(embeddings)
+                embeddings_generated=computed,
+                embeddings_from_cache=len(embeddings) - computed
             )
             return embeddings
 
@@ -66,6 +93,26 @@ class EmbeddingService:
             })
             raise
 
+    def _embed_with_cache(self, texts: List[str]) -> Tuple[List[List[float]], int]:
+        """Embed only the texts missing from the cache; returns embeddings and how many were computed"""
+        keys = [cache_key(self.embeddings.model, self.embeddings.dimensions, text) for text in texts]
+        cached = self.cache.get_many(keys)
+
+        # Identical chunks share a key, so each missing text is embedded once
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        if missing:
+            # Generate embeddings in batches to avoid rate limits
+            new_embeddings = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), new_embeddings))
+            self.cache.put_many(computed)
+            cached.update(computed)
+
+        return [cached[key] for key in keys], len(missing)
+
     @observe(name="embedding_computation_query")
     def generate_query_embedding(self, query: str) -> List[float]:
         """Generate embedding for a single query"""
@@ -93,4 +140,68 @@ class EmbeddingService:
                 "operation": "query_embedding_generation",
                 "query": query
             })
-            raise
\ No newline at end of file
+            raise
+
+    @observe(name="embedding_computation_query")
+    async def agenerate_query_embedding(self, query: str) -> List[float]:
+        """Generate embedding for a single query without blocking the event loop"""
+        start_time = time.time()
+        try:
+            if self.query_batcher is not None:
+                embedding = await self.query_batcher.submit(query)
+            else:
+                embedding = await self.embeddings.aembed_query(query)
+
+            duration = time.time() - start_time
+
+            # Record metrics
+            metrics_recorder.record_embeddings_generated(
+                count=1,
+                embedding_type="query",
+                duration_seconds=duration
+            )
+
+            return embedding
+        except Exception as e:
+            metrics_recorder.record_error(
+                error_type=type(e).__name__,
+                operation="query_embedding_generation"
+            )
+            log_error(self.logger, e, {
+                "operation": "query_embedding_generation",
+                "query": query
+            })
+            raise
+
+    @observe(name="embedding_computation_queries")
+    async def agenerate_query_embeddings(self, queries: List[str]) -> List[List[float]]:
+        """Generate embeddings for many queries in one request, bypassing the micro-batcher"""
+        start_time = time.time()
+        try:
+            # Repeated questions are embedded once
+            unique_queries = list(dict.fromkeys(queries))
+            embeddings = await self.embeddings.aembed_documents(unique_queries)
+            by_query = dict(zip(unique_queries, embeddings))
+
+            metrics_recorder.record_embeddings_generated(
+                count=len(unique_queries),
+                embedding_type="query",
+                duration_seconds=time.time() - start_time
+            )
+
+            return [by_query[query] for query in queries]
+        except Exception as e:
+            metrics_recorder.record_error(
+                error_type=type(e).__name__,
+                operation="query_embedding_generation"
+            )
+            log_error(self.logger, e, {
+                "operation": "query_embedding_generation",
+                "query_count": len(queries)
+            })
+            raise
+
+    async def _embed_query_batch(self, queries: List[str]) -> List[List[float]]:
+        """Embed a micro-batch of queries in a single request"""
+        metrics_recorder.record_query_embedding_batch(len(queries))
+        return await self.embeddings.aembed_documents(queries)
\ No newline at end of file
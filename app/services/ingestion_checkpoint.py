@@ -0,0 +1,73 @@
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Set
+
+
+class IngestionCheckpoint:
+    """Progress of one ingestion into an index version, persisted after every stored batch.
+
+    Records the sources whose chunks were completely stored (with their chunk count) and,
+    per source, the IDs of the chunks stored so far. An ingestion that fails leaves the
+    checkpoint next to its unfinished index version; the retry skips the completed sources
+    and the stored chunks instead of starting over.
+    """
+
+    FILE_NAME = "ingest_checkpoint.json"
+
+    def __init__(self, directory: str, mode: str):
+        self.path = os.path.join(directory, self.FILE_NAME)
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._completed: Dict[str, int] = {}
+        self._stored: Dict[str, List[str]] = {}
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["IngestionCheckpoint"]:
+        """Read the checkpoint left in directory, or None if there is none (or it is unreadable)"""
+        checkpoint = cls(directory, mode="")
+        try:
+            with open(checkpoint.path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            checkpoint.mode = stored["mode"]
+            checkpoint._completed = stored["completed"]
+            checkpoint._stored = stored["stored"]
+        except (OSError, ValueError, KeyError):
+            return None
+        return checkpoint
+
+    def completed_sources(self) -> Dict[str, int]:
+        """{source: chunk count} of the sources that were completely stored"""
+        with self._lock:
+            return dict(self._completed)
+
+    def stored_ids(self, source: str) -> Set[str]:
+        with self._lock:
+            return set(self._stored.get(source, ()))
+
+    def record_batch(self, source: str, ids: List[str]):
+        """Record a batch of chunks of source as stored"""
+        with self._lock:
+            self._stored.setdefault(source, []).extend(ids)
+            self._save_locked()
+
+    def complete_source(self, source: str, chunks: int):
+        """Record every change to source as stored; its batch IDs are no longer needed"""
+        with self._lock:
+            self._completed[source] = chunks
+            self._stored.pop(source, None)
+            self._save_locked()
+
+    def save(self):
+        with self._lock:
+            self._save_locked()
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _save_locked(self):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"mode": self.mode, "completed": self._completed, "stored": self._stored}, f)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,313 @@
+import contextvars
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+from app.core.logging_config import get_logger, log_event, log_error
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Finished jobs kept for status lookups
+INGEST_JOBS_RETAINED = int(os.getenv("INGEST_JOBS_RETAINED", "20"))
+# Seconds between writes of a running job's state file, which other worker processes read
+INGEST_JOB_STATE_INTERVAL_SECONDS = float(os.getenv("INGEST_JOB_STATE_INTERVAL_SECONDS", "1"))
+
+
+class IngestionJob:
+    """One background ingestion run and its progress"""
+
+    def __init__(self, mode: str):
+        self.id = uuid.uuid4().hex
+        self.mode = mode
+        self.status = "queued"  # queued, running, succeeded, failed
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        # Set by the ingestion once its pipeline exists, read for progress
+        self.pipeline = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current state, phase and progress of the job"""
+        pipeline = self.pipeline
+        progress = dict(pipeline.progress) if pipeline is not None else {}
+        if self.finished:
+            phase = "completed" if self.status == "succeeded" else "failed"
+        elif pipeline is not None:
+            phase = pipeline.phase
+        else:
+            phase = "starting" if self.status == "running" else "queued"
+
+        return {
+            "job_id": self.id,
+            "mode": self.mode,
+            "status": self.status,
+            "phase": phase,
+            "chunks_fetched": progress.get("chunks_loaded", 0),
+            "chunks_to_embed": progress.get("chunks_to_embed", 0),
+            "chunks_embedded": progress.get("chunks_embedded", 0),
+            "chunks_stored": progress.get("chunks_stored", 0),
+            "eta_seconds": pipeline.eta_seconds() if pipeline is not None and not self.finished else None,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error
+        }
+
+
+def _modified_at(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except FileNotFoundError:
+        return 0.0
+
+
+class IngestionJobRecord:
+    """A job of another worker process, as last written to its state file"""
+
+    def __init__(self, state: Dict[str, Any]):
+        self.id = state["job_id"]
+        self.mode = state["mode"]
+        self.status = state["status"]
+        self._state = state
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return dict(self._state)
+
+
+class IngestionJobConflict(Exception):
+    """Raised when an ingestion is requested in another mode than the job already running.
+
+    job is None if the job runs in another worker process whose state file was not readable yet.
+    """
+
+    def __init__(self, job: Optional[Any], mode: str):
+        if job is None:
+            message = "An ingestion is already running in another worker process"
+        else:
+            message = f"Ingestion job {job.id} is already running in {job.mode} mode; cannot start one in {mode} mode"
+        super().__init__(message)
+        self.job = job
+        self.mode = mode
+
+
+class IngestionJobs:
+    """Runs ingestions as background jobs, at most one at a time.
+
+    Starting an ingestion while one is queued or running returns the running job instead
+    of starting another if it runs in the same mode, and raises IngestionJobConflict if not.
+    Finished jobs are kept (up to retained) for status lookups.
+
+    With a state_directory shared by several worker processes, the "one at a time" holds across
+    them: a running job holds an exclusive lock on ingestion.lock there, and every job's state is
+    written to <job_id>.json (every INGEST_JOB_STATE_INTERVAL_SECONDS while it runs), so any
+    worker can report it and join it.
+    """
+
+    LOCK_FILE_NAME = "ingestion.lock"
+    ACTIVE_FILE_NAME = "active_job"
+
+    def __init__(self, ingest: Callable[[str, IngestionJob], Dict[str, Any]], retained: int = None,
+                 state_directory: Optional[str] = None):
+        self._ingest = ingest
+        self._retained = retained or INGEST_JOBS_RETAINED
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._active: Optional[IngestionJob] = None
+        self.logger = get_logger("ingestion_jobs")
+
+        self._state_directory = state_directory
+        self._lock_file = None
+
+    def start(self, mode: str) -> Tuple[Any, bool]:
+        """Start an ingestion job, or join the active one; returns (job, created)"""
+        with self._lock:
+            active = self._active
+            if active is None and not self._acquire_process_lock_locked():
+                active = self._job_of_other_process()
+                if active is None:
+                    raise IngestionJobConflict(None, mode)
+            if active is not None:
+                # A full ingestion requested during an incremental one (or the other way round)
+                # would not get what it asked for by joining it
+                if active.mode != mode:
+                    raise IngestionJobConflict(active, mode)
+                log_event(
+                    self.logger,
+                    "ingestion_job_joined",
+                    "Ingestion already running, joined the active job",
+                    job_id=active.id,
+                    mode=mode
+                )
+                return active, False
+
+            job = IngestionJob(mode)
+            self._active = job
+            self._jobs[job.id] = job
+            self._evict_locked()
+            if self._state_directory is not None:
+                self._save_state(job)
+                self._write_file(os.path.join(self._state_directory, self.ACTIVE_FILE_NAME), job.id)
+
+        threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(self._run, job),
+            name=f"ingest-job-{job.id[:8]}",
+            daemon=True
+        ).start()
+        log_event(self.logger, "ingestion_job_started", "Ingestion job started", job_id=job.id, mode=mode)
+        return job, True
+
+    def get(self, job_id: str) -> Optional[Any]:
+        """The job, or the last recorded state of a job run by another worker process"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        state = self._load_state(job_id)
+        return IngestionJobRecord(state) if state is not None else None
+
+    def _run(self, job: IngestionJob):
+        job.status = "running"
+        job.started_at = time.time()
+        finished = threading.Event()
+        recorder = None
+        if self._state_directory is not None:
+            self._save_state(job)
+            recorder = threading.Thread(
+                target=self._record_progress, args=(job, finished), name=f"ingest-state-{job.id[:8]}", daemon=True
+            )
+            recorder.start()
+
+        result, error = None, None
+        try:
+            result = self._ingest(job.mode, job)
+        except Exception as e:
+            error = e
+            log_error(self.logger, e, {"operation": "ingestion_job", "job_id": job.id})
+        finally:
+            # Stopped before the final state is written, so it cannot overwrite it with a running one
+            finished.set()
+            if recorder is not None:
+                recorder.join()
+
+        # Finish and free the slot together, so a finished job is never still the active one
+        with self._lock:
+            job.result = result
+            job.error = str(error) if error is not None else None
+            job.finished_at = time.time()
+            job.status = "failed" if error is not None else "succeeded"
+            self._active = None
+            self._evict_locked()
+            if self._state_directory is not None:
+                self._save_state(job)
+                self._remove_file(os.path.join(self._state_directory, self.ACTIVE_FILE_NAME))
+                self._release_process_lock_locked()
+        log_event(
+            self.logger,
+            "ingestion_job_finished",
+            "Ingestion job finished",
+            job_id=job.id,
+            status=job.status,
+            duration_seconds=job.finished_at - job.started_at
+        )
+
+    def _evict_locked(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(len(finished) - self._retained, 0)]:
+            del self._jobs[job_id]
+
+        if self._state_directory is not None:
+            # State files of every worker's jobs; the running job's is the most recently written
+            paths = [
+                os.path.join(self._state_directory, name)
+                for name in os.listdir(self._state_directory) if name.endswith(".json")
+            ]
+            paths.sort(key=_modified_at)
+            for path in paths[:max(len(paths) - self._retained - 1, 0)]:
+                self._remove_file(path)
+
+    def _acquire_process_lock_locked(self) -> bool:
+        """Take the lock that makes this process the only one running a job; False if another holds it"""
+        if self._state_directory is None:
+            return True
+        # Created with the first job, so a service that never ingests leaves nothing behind
+        os.makedirs(self._state_directory, exist_ok=True)
+        lock_file = open(os.path.join(self._state_directory, self.LOCK_FILE_NAME), "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+
+        # A job recorded as running without the lock held belonged to a worker that exited
+        orphan = self._job_of_other_process()
+        if orphan is not None and not orphan.finished:
+            state = orphan.snapshot()
+            state.update(status="failed", phase="failed", finished_at=time.time(),
+                         error="The worker process running the job exited")
+            self._write_file(self._state_path(orphan.id), json.dumps(state))
+        return True
+
+    def _release_process_lock_locked(self):
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _job_of_other_process(self) -> Optional[IngestionJobRecord]:
+        """The job recorded as active in the state directory"""
+        try:
+            with open(os.path.join(self._state_directory, self.ACTIVE_FILE_NAME), "r", encoding="utf-8") as f:
+                job_id = f.read().strip()
+        except FileNotFoundError:
+            return None
+        state = self._load_state(job_id)
+        return IngestionJobRecord(state) if state is not None else None
+
+    def _record_progress(self, job: IngestionJob, finished: threading.Event):
+        while not finished.wait(INGEST_JOB_STATE_INTERVAL_SECONDS):
+            self._save_state(job)
+
+    def _state_path(self, job_id: str) -> str:
+        return os.path.join(self._state_directory, f"{job_id}.json")
+
+    def _save_state(self, job: IngestionJob):
+        self._write_file(self._state_path(job.id), json.dumps(job.snapshot()))
+
+    def _load_state(self, job_id: str) -> Optional[Dict[str, Any]]:
+        # Job IDs are hex; anything else is not looked up on disk
+        if self._state_directory is None or not job_id.isalnum():
+            return None
+        try:
+            with open(self._state_path(job_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_file(self, path: str, content: str):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def _remove_file(self, path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
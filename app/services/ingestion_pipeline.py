@@ -0,0 +1,259 @@
+import contextvars
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from app.core.logging_config import get_logger, log_event
+from app.services.vector_store import document_ids
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Chunks embedded (and written to the vector store) per batch
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
+# Batches buffered between two stages; bounds peak memory of the pipeline
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "4"))
+
+_DONE = object()
+
+
+class _Cancelled(Exception):
+    """Raised inside a stage when another stage failed"""
+
+
+class IngestionPipeline:
+    """Streaming ingestion: load (fetch + chunk) -> embed -> store, connected by bounded queues.
+
+    Sources are chunked and diffed as soon as they are fetched, new chunks are embedded
+    in batches and every batch is written to the vector store as soon as it is embedded,
+    so the stages overlap and at most a few batches are held in memory at any time.
+
+    With a checkpoint, every stored batch and every completely stored source is recorded in
+    it, and a run resuming from a checkpoint skips what is recorded there.
+    """
+
+    def __init__(self, document_service, embedding_service, vector_store,
+                 batch_size: int = None, queue_size: int = None, checkpoint=None):
+        self.document_service = document_service
+        self.embedding_service = embedding_service
+        self.vector_store = vector_store
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size or EMBEDDING_BATCH_SIZE
+        self.queue_size = queue_size or PIPELINE_QUEUE_SIZE
+        self.logger = get_logger("ingestion_pipeline")
+
+        self.progress = {
+            "chunks_loaded": 0,
+            "chunks_to_embed": 0,
+            "chunks_embedded": 0,
+            "chunks_stored": 0,
+        }
+        self.counts = {"added": 0, "updated": 0, "removed": 0, "skipped": 0, "resumed": 0}
+        self.stage_seconds = {"load": 0.0, "embed": 0.0, "store": 0.0}
+        self._waited = {"load": 0.0, "embed": 0.0, "store": 0.0}
+        self.sources: List[str] = []
+        # Sources with pages that failed to load; their stored chunks are not removed
+        self.incomplete_sources: List[str] = []
+
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+        self._started: Optional[float] = None
+        self._finished_stages = set()
+
+    @property
+    def phase(self) -> str:
+        """The earliest stage still running: "loading", "embedding", "storing" (or "done")"""
+        for stage, phase in (("load", "loading"), ("embed", "embedding"), ("store", "storing")):
+            if stage not in self._finished_stages:
+                return phase
+        return "done"
+
+    def eta_seconds(self) -> Optional[float]:
+        """Estimated time left at the store rate so far; unknown until every source is loaded"""
+        if self._started is None or "load" not in self._finished_stages:
+            return None
+        remaining = self.progress["chunks_to_embed"] - self.progress["chunks_stored"]
+        if remaining <= 0:
+            return 0.0
+        if not self.progress["chunks_stored"]:
+            return None
+        return remaining * (time.time() - self._started) / self.progress["chunks_stored"]
+
+    def run(self, full: bool = False) -> Dict[str, Any]:
+        """Run all stages to completion and return the ingestion counts"""
+        embed_queue = queue.Queue(maxsize=self.queue_size)
+        store_queue = queue.Queue(maxsize=self.queue_size)
+
+        stages = [
+            ("load", self._load_stage, (embed_queue, full)),
+            ("embed", self._embed_stage, (embed_queue, store_queue)),
+            ("store", self._store_stage, (store_queue,)),
+        ]
+        threads = [
+            threading.Thread(
+                target=contextvars.copy_context().run,
+                args=(self._run_stage, name, fn) + args,
+                name=f"ingest-{name}",
+                daemon=True
+            )
+            for name, fn, args in stages
+        ]
+
+        start_time = self._started = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if self._errors:
+            raise self._errors[0]
+
+        log_event(
+            self.logger,
+            "ingestion_pipeline_completed",
+            "Ingestion pipeline completed",
+            wall_seconds=time.time() - start_time,
+            stage_seconds=self.stage_seconds,
+            **self.counts
+        )
+        return {
+            "total_documents": self.progress["chunks_loaded"],
+            "sources": self.sources,
+            "incomplete_sources": self.incomplete_sources,
+            "stage_seconds": dict(self.stage_seconds),
+            **self.counts
+        }
+
+    def _run_stage(self, name: str, fn, *args):
+        started = time.time()
+        try:
+            fn(*args)
+        except _Cancelled:
+            pass
+        except BaseException as e:
+            self._errors.append(e)
+            self._stop.set()
+        finally:
+            # Busy time excludes time spent waiting on the neighbouring queues
+            self.stage_seconds[name] += time.time() - started - self._waited[name]
+            self._finished_stages.add(name)
+
+    def _put(self, stage: str, q: queue.Queue, item):
+        waiting_since = time.time()
+        try:
+            while True:
+                try:
+                    q.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    if self._stop.is_set():
+                        raise _Cancelled()
+        finally:
+            self._waited[stage] += time.time() - waiting_since
+
+    def _get(self, stage: str, q: queue.Queue):
+        waiting_since = time.time()
+        try:
+            while True:
+                try:
+                    return q.get(timeout=0.1)
+                except queue.Empty:
+                    if self._stop.is_set():
+                        raise _Cancelled()
+        finally:
+            self._waited[stage] += time.time() - waiting_since
+
+    def _load_stage(self, out: queue.Queue, full: bool):
+        """Fetch and chunk each source, diff it against the store and emit work batches"""
+        completed = self.checkpoint.completed_sources() if self.checkpoint is not None else {}
+        for source, chunks in completed.items():
+            # Stored completely by the run this one resumes, so not even fetched again
+            self.sources.append(source)
+            self.progress["chunks_loaded"] += chunks
+            self.counts["resumed"] += chunks
+
+        for source, documents, complete in self.document_service.iter_source_documents(skip_sources=list(completed)):
+            diff = self.vector_store.diff_documents(documents, full=full, complete=complete)
+            if not complete:
+                self.incomplete_sources.append(source)
+            if self.checkpoint is not None:
+                self._skip_stored(source, documents, diff, full)
+            self.sources.append(source)
+            self.progress["chunks_loaded"] += len(documents)
+            self.progress["chunks_to_embed"] += len(diff["added"])
+            self.counts["skipped"] += diff["skipped"]
+
+            if diff["removed"]:
+                self._put("load", out, ("delete", source, diff["removed"]))
+            if diff["updated"]:
+                self._put("load", out, ("update", source, diff["updated"]))
+            for start in range(0, len(diff["added"]), self.batch_size):
+                self._put("load", out, ("add", source, diff["added"][start:start + self.batch_size]))
+            if complete:
+                # A partly loaded source is fetched again by a run resuming this one
+                self._put("load", out, ("complete", source, len(documents)))
+        self._put("load", out, _DONE)
+
+    def _skip_stored(self, source: str, documents: List[Any], diff: Dict[str, Any], full: bool):
+        """Leave out the chunks of source the resumed run already stored.
+
+        An incremental diff finds them stored and unchanged, so they only move from skipped to
+        resumed; a full diff would add them again.
+        """
+        stored = self.checkpoint.stored_ids(source)
+        if not stored:
+            return
+        resumed = len(stored.intersection(document_ids(documents)))
+        if full:
+            diff["added"] = [(doc_id, doc) for doc_id, doc in diff["added"] if doc_id not in stored]
+        else:
+            diff["skipped"] = max(diff["skipped"] - resumed, 0)
+        self.counts["resumed"] += resumed
+
+    def _embed_stage(self, inbox: queue.Queue, out: queue.Queue):
+        """Embed "add" batches and forward everything to the store stage"""
+        while True:
+            item = self._get("embed", inbox)
+            if item is _DONE:
+                break
+            operation, source, payload = item
+            if operation == "add":
+                documents = [doc for _, doc in payload]
+                embeddings = self.embedding_service.generate_embeddings(documents)
+                self.progress["chunks_embedded"] += len(documents)
+                item = ("add", source, (payload, embeddings))
+            self._put("embed", out, item)
+        self._put("embed", out, _DONE)
+
+    def _store_stage(self, inbox: queue.Queue):
+        """Apply deletes, metadata updates and embedded batches to the vector store"""
+        while True:
+            item = self._get("store", inbox)
+            if item is _DONE:
+                return
+            operation, source, payload = item
+            if operation == "complete":
+                # Everything of the source before this marker has been applied
+                if self.checkpoint is not None:
+                    self.checkpoint.complete_source(source, payload)
+            elif operation == "delete":
+                self.vector_store.delete_documents(payload)
+                self.counts["removed"] += len(payload)
+            elif operation == "update":
+                self.vector_store.update_metadata(
+                    [doc_id for doc_id, _ in payload],
+                    [doc for _, doc in payload]
+                )
+                self.counts["updated"] += len(payload)
+            else:
+                batch, embeddings = payload
+                self.vector_store.add_documents(
+                    [doc for _, doc in batch],
+                    embeddings,
+                    ids=[doc_id for doc_id, _ in batch]
+                )
+                self.counts["added"] += len(batch)
+                self.progress["chunks_stored"] += len(batch)
+                if self.checkpoint is not None:
+                    self.checkpoint.record_batch(source, [doc_id for doc_id, _ in batch])
@@ -0,0 +1,80 @@
+import threading
+import time
+from typing import Any, Callable, Optional
+from app.core.logging_config import get_logger, log_event, log_error
+
+
+class LazyService:
+    """A service built on first use instead of at import, at most once across threads.
+
+    The factory does the expensive work (heavy imports, opening the vector store, creating
+    API clients). start() runs it on a background thread so the server can bind its port
+    and answer health checks meanwhile; get() returns the service, waiting for (or doing)
+    the build. A failed build is reported by error and retried by the next get().
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self.name = name
+        self.factory = factory
+        self.logger = get_logger("lazy_service")
+        self.error: Optional[str] = None
+        self._instance: Optional[Any] = None
+        self._lock = threading.Lock()
+
+    @property
+    def instance(self) -> Optional[Any]:
+        """The service if it is built, without waiting"""
+        return self._instance
+
+    @property
+    def ready(self) -> bool:
+        return self._instance is not None
+
+    def get(self) -> Any:
+        """The service, built on this thread if no other thread is building it"""
+        instance = self._instance
+        if instance is not None:
+            return instance
+        with self._lock:
+            if self._instance is None:
+                self._build_locked()
+            return self._instance
+
+    def start(self) -> threading.Thread:
+        """Build the service on a background thread"""
+        def build():
+            try:
+                self.get()
+            except Exception:
+                # Logged and kept in self.error; the next get() tries again
+                pass
+
+        thread = threading.Thread(target=build, name=f"{self.name}-build", daemon=True)
+        thread.start()
+        return thread
+
+    def close(self):
+        """Release the service if it was built"""
+        with self._lock:
+            instance, self._instance = self._instance, None
+        close = getattr(instance, "close", None)
+        if close is not None:
+            close()
+
+    def _build_locked(self):
+        start = time.perf_counter()
+        try:
+            instance = self.factory()
+        except Exception as e:
+            self.error = str(e) or type(e).__name__
+            log_error(self.logger, e, {"operation": "service_build", "service": self.name})
+            raise
+        self._instance = instance
+        self.error = None
+        log_event(
+            self.logger,
+            "service_ready",
+            "Service built",
+            service=self.name,
+            build_seconds=round(time.perf_counter() - start, 3)
+        )
@@ -0,0 +1,64 @@
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional, Set, Tuple
+
+
+class MicroBatcher:
+    """Collects items submitted within a short window and processes them as one batch.
+
+    A batch is flushed when max_batch_size items are pending or max_wait_seconds after
+    the first pending item arrived, whichever comes first. Each caller receives the
+    result at its own position, or the exception raised for the whole batch; if the
+    batch is cancelled, so are the callers still waiting for it.
+    """
+
+    def __init__(self, process_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+                 max_batch_size: int, max_wait_seconds: float):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # The loop only keeps weak references to tasks, so in-flight batches are held here
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait_seconds, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(lambda done: self._finish(batch, done))
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]):
+        try:
+            results = await self.process_batch([item for item, _ in batch])
+            for (_, future), result in zip(batch, results):
+                # Callers may have been cancelled while the batch was in flight
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    def _finish(self, batch: List[Tuple[Any, asyncio.Future]], task: asyncio.Task):
+        self._tasks.discard(task)
+        # Callers are still waiting if the batch was cancelled (possibly before it started)
+        # or returned too few results; they must not wait forever
+        for _, future in batch:
+            if not future.done():
+                future.cancel()
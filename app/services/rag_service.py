@@ -1,10 +1,18 @@
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator, Hashable, List, Optional, Tuple
 from langchain_openai import ChatOpenAI
 from app.services.document_service import DocumentService
 from app.services.embedding_service import EmbeddingService
-from app.services.vector_store import VectorStore
+from app.services.vector_store import IndexVersion, VectorStore
+from app.services.ingestion_pipeline import IngestionPipeline
+from app.services.ingestion_checkpoint import IngestionCheckpoint
+from app.services.ingestion_jobs import IngestionJob, IngestionJobs
+from app.services.context_assembly import assemble_context
+from app.services.token_counter import get_token_counter
+from app.services.answer_cache import AnswerCache, ANSWER_CACHE_ENABLED
+from app.services.single_flight import SingleFlight, normalize_question
 from app.core.logging_config import get_logger, log_event, log_error
 from app.core.metrics import metrics_recorder
+from app.core.limits import INGEST_MODES
 from langfuse import Langfuse
 from langfuse import observe
 import os
@@ -13,6 +21,15 @@ import time
 
 load_dotenv()
 
+# "vector" (embedding similarity only) or "hybrid" (vector fused with BM25 keyword matches)
+RETRIEVAL_MODES = ("vector", "hybrid")
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "vector")
+
+QUERY_COALESCING_ENABLED = os.getenv("QUERY_COALESCING_ENABLED", "true").lower() == "true"
+
+# LLM calls in flight per batched query
+QUERY_BATCH_LLM_CONCURRENCY = int(os.getenv("QUERY_BATCH_LLM_CONCURRENCY", "8"))
+
 
 def _create_rag_prompt(question: str, context: str) -> str:
     """Create a prompt for the LLM with context"""
@@ -33,18 +50,95 @@ Instructions:
 Answer:"""
 
 
+def _no_results_response() -> Dict[str, Any]:
+    """Response returned when the vector search finds nothing"""
+    return {
+        "answer": "I couldn't find any relevant information to answer your question.",
+        "sources": [],
+        "cached": False
+    }
+
+
+def _prepare_context(search_results: List[Dict[str, Any]]) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """Split search results into LLM context passages (merged, deduplicated, within the token budget)
+    and response sources"""
+    context_chunks, context_tokens, tokens_saved = assemble_context(search_results)
+    metrics_recorder.record_context_assembly(context_tokens, tokens_saved)
+
+    sources = []
+    for i, result in enumerate(search_results):
+        sources.append({
+            "page": result['metadata'].get('chunk_id', i),
+            "text": result['text'][:200] + "..." if len(result['text']) > 200 else result['text'],
+            "source": result['metadata'].get('source', 'unknown'),
+            "distance": result['distance']
+        })
+
+    return context_chunks, sources
+
+
+def _record_token_usage(message):
+    """Record the prompt and completion tokens the API reported for an LLM response (or stream chunk)"""
+    usage = getattr(message, "usage_metadata", None)
+    if isinstance(usage, dict):
+        metrics_recorder.record_llm_tokens(usage.get("input_tokens", 0), usage.get("output_tokens", 0))
+
+
+def _retrieval_mode(retrieval_mode: Optional[str]) -> str:
+    """Resolve the requested retrieval mode, defaulting to RETRIEVAL_MODE"""
+    retrieval_mode = retrieval_mode or RETRIEVAL_MODE
+    if retrieval_mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown retrieval mode: {retrieval_mode}")
+    return retrieval_mode
+
+
+def _retrieval_scope(source_filter: Optional[List[str]], max_distance: Optional[float],
+                     retrieval_mode: str = "vector") -> Hashable:
+    """Hashable form of the retrieval filters and mode, for answer caching and coalescing"""
+    if source_filter is None and max_distance is None and retrieval_mode == "vector":
+        return None
+    return (
+        tuple(sorted(set(source_filter))) if source_filter is not None else None,
+        max_distance,
+        retrieval_mode
+    )
+
+
 class RAGService:
+    answer_cache: Optional[AnswerCache] = None
+    query_single_flight: Optional[SingleFlight] = None
+
     def __init__(self):
         self.document_service = DocumentService()
         self.embedding_service = EmbeddingService()
         self.vector_store = VectorStore()
         self.logger = get_logger("rag_service")
 
+        # Load the token encoding now, off the event loop (the service is built on a thread):
+        # it may be downloaded, and the first query would otherwise block every request on it
+        get_token_counter()
+
+        # Semantic cache for repeated and near-duplicate questions
+        if ANSWER_CACHE_ENABLED:
+            self.answer_cache = AnswerCache()
+
+        # Concurrent identical questions share one embedding + LLM computation
+        if QUERY_COALESCING_ENABLED:
+            self.query_single_flight = SingleFlight("rag_query")
+
+        # Ingestion runs as background jobs, one at a time across the worker processes
+        self.ingestion_jobs = IngestionJobs(
+            self.ingest_documents,
+            state_directory=os.path.join(self.vector_store.persist_directory, "ingestion_jobs")
+        )
+
         # Initialize LLM
         self.llm = ChatOpenAI(
             model="gpt-3.5-turbo",
             temperature=0.1,
-            openai_api_key=os.getenv("OPENAI_API_KEY")
+            openai_api_key=os.getenv("OPENAI_API_KEY"),
+            # Streamed answers end with a usage chunk, so their tokens are counted too
+            stream_usage=True
         )
 
         # Initialize Langfuse
@@ -54,41 +148,76 @@ class RAGService:
             host=os.getenv("LANGFUSE_HOST")
         )
 
+    def close(self):
+        """Stop following index versions and send the traces still buffered by the Langfuse client"""
+        self.vector_store.close()
+        self.langfuse.flush()
+
+    def start_ingestion(self, mode: str = "incremental") -> Tuple[IngestionJob, bool]:
+        """Start ingest_documents as a background job, or join the one already running.
+
+        Returns the job and whether it was newly created. Raises IngestionJobConflict if the
+        running job has another mode.
+        """
+        if mode not in INGEST_MODES:
+            raise ValueError(f"Unknown ingest mode: {mode}")
+        return self.ingestion_jobs.start(mode)
+
     @observe()
-    def ingest_documents(self) -> Dict[str, Any]:
-        """Load, embed, and store all documents with tracing"""
+    def ingest_documents(self, mode: str = "incremental", job: Optional[IngestionJob] = None) -> Dict[str, Any]:
+        """Load, embed, and store all documents with tracing.
+
+        Sources stream through the ingestion pipeline as they are fetched, into a new index
+        version seeded from the active one; queries keep using the active version until the new
+        one is complete and activated. In "incremental" mode only new or changed chunks are
+        embedded and written; "full" mode rewrites every loaded chunk. Both delete chunks that
+        disappeared from a loaded source. With a job, the job reports the pipeline's progress.
+
+        Progress is checkpointed per source and per stored batch. If the ingestion fails, the
+        unfinished version and its checkpoint are kept, and the next ingestion in the same mode
+        resumes them: completed sources are not fetched again and stored batches not re-embedded.
+        """
+        if mode not in INGEST_MODES:
+            raise ValueError(f"Unknown ingest mode: {mode}")
+
         start_time = time.time()
-        log_event(self.logger, "ingestion_started", "Starting document ingestion")
+        log_event(self.logger, "ingestion_started", "Starting document ingestion", mode=mode)
 
         try:
-            # Load documents
-            documents = self.document_service.load_all_documents()
-
-            # Generate embeddings
-            embedding_start = time.time()
-            embeddings = self.embedding_service.generate_embeddings(documents)
-            embedding_duration = time.time() - embedding_start
-
-            # Store in vector database
-            self.vector_store.add_documents(documents, embeddings)
+            index, checkpoint = self._ingestion_target(mode)
+
+            # Fetch, chunk, embed and store as overlapping pipeline stages
+            pipeline = IngestionPipeline(self.document_service, self.embedding_service, index,
+                                         checkpoint=checkpoint)
+            if job is not None:
+                job.pipeline = pipeline
+            counts = pipeline.run(full=(mode == "full"))
+            checkpoint.remove()
+            self.vector_store.activate(index)
             stats = self.vector_store.get_collection_stats()
 
             total_duration = time.time() - start_time
 
             result = {
                 "status": "success",
-                "total_documents": len(documents),
+                "total_documents": counts["total_documents"],
                 "sources": stats['sources'],
-                "message": f"Successfully ingested {len(documents)} documents"
+                "added": counts["added"],
+                "updated": counts["updated"],
+                "removed": counts["removed"],
+                "skipped": counts["skipped"],
+                "resumed": counts["resumed"],
+                "incomplete_sources": counts["incomplete_sources"],
+                "index_version": index.name,
+                "message": f"Successfully ingested {counts['total_documents']} documents"
             }
 
             # Record metrics
             metrics_recorder.record_document_ingestion(
                 duration_seconds=total_duration,
-                documents_count=len(documents),
+                documents_count=result['total_documents'],
                 success=True
             )
-            metrics_recorder.update_vector_store_size(stats['total_documents'])
 
             log_event(
                 self.logger, 
@@ -96,7 +225,14 @@ class RAGService:
                 "Document ingestion completed",
                 total_documents=result['total_documents'],
                 sources=result['sources'],
-                embedding_duration_seconds=embedding_duration
+                added=result['added'],
+                updated=result['updated'],
+                removed=result['removed'],
+                skipped=result['skipped'],
+                resumed=result['resumed'],
+                incomplete_sources=result['incomplete_sources'],
+                index_version=result['index_version'],
+                stage_seconds=counts['stage_seconds']
             )
             return result
 
@@ -114,101 +250,408 @@ class RAGService:
             log_error(self.logger, e, {"operation": "document_ingestion"})
             raise
 
+    def _ingestion_target(self, mode: str) -> Tuple[IndexVersion, IngestionCheckpoint]:
+        """The unfinished index version of a failed ingestion in the same mode with its checkpoint,
+        or a new version with an empty checkpoint"""
+        index = self.vector_store.resume_version()
+        if index is not None:
+            checkpoint = IngestionCheckpoint.load(index.directory)
+            if checkpoint is not None and checkpoint.mode == mode:
+                log_event(
+                    self.logger,
+                    "ingestion_resumed",
+                    "Resuming an interrupted ingestion",
+                    index_version=index.name,
+                    completed_sources=list(checkpoint.completed_sources())
+                )
+                return index, checkpoint
+
+        index = self.vector_store.create_version()
+        checkpoint = IngestionCheckpoint(index.directory, mode)
+        checkpoint.save()
+        return index, checkpoint
+
     @observe()
-    def query(self, question: str, k: int = 5) -> Dict[str, Any]:
-        """Answer a question using RAG with full tracing"""
-        start_time = time.time()
-        log_event(
-            self.logger, 
-            "query_started", 
-            "Processing RAG query",
-            question=question,
-            k=k
-        )
+    def query(self, question: str, k: int = 5, source_filter: Optional[List[str]] = None,
+              max_distance: Optional[float] = None, retrieval_mode: Optional[str] = None) -> Dict[str, Any]:
+        """Answer a question using RAG with full tracing.
+
+        source_filter restricts retrieval to chunks of those sources; results farther than
+        max_distance are not used as context. retrieval_mode "hybrid" fuses the vector results
+        with BM25 keyword matches of the question (reciprocal rank fusion).
+        """
+        retrieval_mode = _retrieval_mode(retrieval_mode)
+        scope = _retrieval_scope(source_filter, max_distance, retrieval_mode)
+        start_time = self._start_query(question, k, "Processing RAG query")
 
         try:
             # Generate query embedding
-            query_embedding = self.embedding_service.generate_query_embedding(question)
+            with metrics_recorder.time_rag_stage("query_embedding"):
+                query_embedding = self.embedding_service.generate_query_embedding(question)
+
+            # Serve repeated and near-duplicate questions from the answer cache
+            index_version = self.vector_store.version
+            cached = self._lookup_cached_answer(question, query_embedding, k, index_version, start_time, scope)
+            if cached is not None:
+                return cached
+
+            # Search for relevant documents, filtered inside the vector store
+            with metrics_recorder.time_rag_stage("vector_search"):
+                search_results = self.vector_store.similarity_search(
+                    query_embedding, k=k, sources=source_filter, max_distance=max_distance,
+                    query_text=question if retrieval_mode == "hybrid" else None
+                )
+            if not search_results:
+                return self._no_results(start_time)
 
-            # Search for relevant documents
-            search_results = self.vector_store.similarity_search(query_embedding, k=k)
+            context_chunks, sources, prompt = self._build_prompt(question, search_results)
 
-            if not search_results:
-                duration = time.time() - start_time
-                metrics_recorder.record_rag_query(
-                    duration_seconds=duration,
-                    sources_count=0,
-                    success=True
+            # Generate answer
+            answer = self._generate_llm_response(prompt)
+
+            result = self._store_answer(query_embedding, k, index_version, scope, start_time, answer, sources)
+            self._log_query_completed(question, answer, sources, context_chunks, "RAG query processing completed")
+            return result
+
+        except Exception as e:
+            self._record_query_failure(e, start_time, "rag_query", {"question": question, "k": k})
+            raise
+
+    async def aquery(self, question: str, k: int = 5, source_filter: Optional[List[str]] = None,
+                     max_distance: Optional[float] = None, retrieval_mode: Optional[str] = None) -> Dict[str, Any]:
+        """Answer a question using RAG without blocking the event loop.
+
+        Concurrent calls with the same normalized question and retrieval parameters are coalesced into one.
+        """
+        retrieval_mode = _retrieval_mode(retrieval_mode)
+        if self.query_single_flight is None:
+            return await self._aquery(question, k, source_filter, max_distance, retrieval_mode)
+        return await self.query_single_flight.run(
+            (normalize_question(question), k, _retrieval_scope(source_filter, max_distance, retrieval_mode)),
+            lambda: self._aquery(question, k, source_filter, max_distance, retrieval_mode)
+        )
+
+    @observe(name="aquery")
+    async def _aquery(self, question: str, k: int, source_filter: Optional[List[str]] = None,
+                      max_distance: Optional[float] = None, retrieval_mode: str = "vector") -> Dict[str, Any]:
+        """Answer a question using RAG without blocking the event loop"""
+        scope = _retrieval_scope(source_filter, max_distance, retrieval_mode)
+        start_time = self._start_query(question, k, "Processing RAG query")
+
+        try:
+            # Generate query embedding
+            with metrics_recorder.time_rag_stage("query_embedding"):
+                query_embedding = await self.embedding_service.agenerate_query_embedding(question)
+
+            # Serve repeated and near-duplicate questions from the answer cache
+            index_version = self.vector_store.version
+            cached = self._lookup_cached_answer(question, query_embedding, k, index_version, start_time, scope)
+            if cached is not None:
+                return cached
+
+            # Search for relevant documents (the backend is sync, runs on the search executor)
+            with metrics_recorder.time_rag_stage("vector_search"):
+                search_results = await self.vector_store.asimilarity_search(
+                    query_embedding, k=k, sources=source_filter, max_distance=max_distance,
+                    query_text=question if retrieval_mode == "hybrid" else None
                 )
-                return {
-                    "answer": "I couldn't find any relevant information to answer your question.",
-                    "sources": []
-                }
-
-            # Prepare context from search results
-            context_chunks = []
-            sources = []
-
-            for i, result in enumerate(search_results):
-                context_chunks.append(result['text'])
-                sources.append({
-                    "page": result['metadata'].get('chunk_id', i),
-                    "text": result['text'][:200] + "..." if len(result['text']) > 200 else result['text'],
-                    "source": result['metadata'].get('source', 'unknown'),
-                    "distance": result['distance']
-                })
-
-            # Create prompt for LLM
-            context = "\n\n".join(context_chunks)
-            prompt = _create_rag_prompt(question, context)
+            if not search_results:
+                return self._no_results(start_time)
+
+            context_chunks, sources, prompt = self._build_prompt(question, search_results)
 
             # Generate answer
-            answer = self._generate_llm_response(prompt)
+            answer = await self._agenerate_llm_response(prompt)
 
-            duration = time.time() - start_time
-            result = {
-                "answer": answer,
-                "sources": sources
-            }
+            result = self._store_answer(query_embedding, k, index_version, scope, start_time, answer, sources)
+            self._log_query_completed(question, answer, sources, context_chunks, "RAG query processing completed")
+            return result
 
-            # Record metrics
-            metrics_recorder.record_rag_query(
-                duration_seconds=duration,
-                sources_count=len(sources),
-                success=True
-            )
+        except Exception as e:
+            self._record_query_failure(e, start_time, "rag_query", {"question": question, "k": k})
+            raise
+
+    @observe(name="aquery_batch")
+    async def aquery_batch(self, questions: List[str], k: int = 5, source_filter: Optional[List[str]] = None,
+                           max_distance: Optional[float] = None,
+                           retrieval_mode: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Answer many questions with one embedding request, one vector search and concurrent LLM calls.
+
+        Results are returned in the order of the questions. Batches are not coalesced.
+        """
+        retrieval_mode = _retrieval_mode(retrieval_mode)
+        scope = _retrieval_scope(source_filter, max_distance, retrieval_mode)
+        start_time = time.time()
+        log_event(
+            self.logger,
+            "batch_query_started",
+            "Processing batched RAG query",
+            question_count=len(questions),
+            k=k
+        )
+
+        try:
+            # Generate all query embeddings in one request
+            with metrics_recorder.time_rag_stage("query_embedding", mode="batch"):
+                query_embeddings = await self.embedding_service.agenerate_query_embeddings(questions)
+
+            # Serve repeated and near-duplicate questions from the answer cache
+            index_version = self.vector_store.version
+            results = [
+                self._lookup_cached_answer(question, query_embedding, k, index_version, start_time, scope)
+                for question, query_embedding in zip(questions, query_embeddings)
+            ]
+            pending = [i for i, result in enumerate(results) if result is None]
+
+            # Search for the remaining questions in one vectorized call
+            search_results = []
+            if pending:
+                with metrics_recorder.time_rag_stage("vector_search", mode="batch"):
+                    search_results = await self.vector_store.asimilarity_search_batch(
+                        [query_embeddings[i] for i in pending], k=k, sources=source_filter,
+                        max_distance=max_distance,
+                        query_texts=[questions[i] for i in pending] if retrieval_mode == "hybrid" else None
+                    )
+
+            prompts = {}
+            sources_by_question = {}
+            for i, hits in zip(pending, search_results):
+                if not hits:
+                    results[i] = self._no_results(start_time)
+                    continue
+                _, sources_by_question[i], prompts[i] = self._build_prompt(questions[i], hits)
+
+            # Generate answers
+            answers = await self._agenerate_llm_responses(list(prompts.values()))
+
+            # Every answered question waited for the whole batch
+            for i, answer in zip(prompts, answers):
+                results[i] = self._store_answer(
+                    query_embeddings[i], k, index_version, scope, start_time, answer, sources_by_question[i]
+                )
 
             log_event(
-                self.logger, 
-                "query_completed", 
-                "RAG query processing completed",
-                question=question,
-                answer_length=len(answer),
-                sources_found=len(sources),
-                context_chunks=len(context_chunks)
+                self.logger,
+                "batch_query_completed",
+                "Batched RAG query completed",
+                question_count=len(questions),
+                cached=len(questions) - len(pending),
+                llm_calls=len(prompts),
+                duration_seconds=time.time() - start_time
             )
-            return result
+            return results
 
         except Exception as e:
-            duration = time.time() - start_time
-            metrics_recorder.record_rag_query(
-                duration_seconds=duration,
-                sources_count=0,
-                success=False
+            self._record_query_failure(
+                e, start_time, "rag_query_batch", {"question_count": len(questions), "k": k}
             )
-            metrics_recorder.record_error(
-                error_type=type(e).__name__,
-                operation="rag_query"
-            )
-            log_error(self.logger, e, {
-                "operation": "rag_query",
-                "question": question,
-                "k": k
-            })
             raise
 
+    @observe(name="astream_query")
+    async def astream_query(self, question: str, k: int = 5, source_filter: Optional[List[str]] = None,
+                            max_distance: Optional[float] = None,
+                            retrieval_mode: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Answer a question using RAG, streaming the answer as it is generated.
+
+        Yields a "sources" event once retrieval is done, then "token" events as the LLM
+        produces them and finally a "done" event. Streams are not coalesced.
+        """
+        retrieval_mode = _retrieval_mode(retrieval_mode)
+        scope = _retrieval_scope(source_filter, max_distance, retrieval_mode)
+        start_time = self._start_query(question, k, "Processing streaming RAG query")
+
+        try:
+            # Generate query embedding
+            with metrics_recorder.time_rag_stage("query_embedding"):
+                query_embedding = await self.embedding_service.agenerate_query_embedding(question)
+
+            # A cached answer is sent as a single token
+            index_version = self.vector_store.version
+            cached = self._lookup_cached_answer(question, query_embedding, k, index_version, start_time, scope)
+            if cached is not None:
+                # Not a time to first token: that measures how fast the LLM starts answering
+                yield {"event": "sources", "data": {"sources": cached["sources"], "cached": True}}
+                yield {"event": "token", "data": {"text": cached["answer"]}}
+                yield {"event": "done", "data": {"answer_length": len(cached["answer"])}}
+                return
+
+            # Search for relevant documents (the backend is sync, runs on the search executor)
+            with metrics_recorder.time_rag_stage("vector_search"):
+                search_results = await self.vector_store.asimilarity_search(
+                    query_embedding, k=k, sources=source_filter, max_distance=max_distance,
+                    query_text=question if retrieval_mode == "hybrid" else None
+                )
+            if not search_results:
+                response = self._no_results(start_time)
+                yield {"event": "sources", "data": {"sources": [], "cached": False}}
+                yield {"event": "token", "data": {"text": response["answer"]}}
+                yield {"event": "done", "data": {"answer_length": len(response["answer"])}}
+                return
+
+            context_chunks, sources, prompt = self._build_prompt(question, search_results)
+
+            # Sources go out before generation starts
+            yield {"event": "sources", "data": {"sources": sources, "cached": False}}
+
+            # Stream the answer
+            answer_parts = []
+            llm_start = time.perf_counter()
+            async for chunk in self.llm.astream(prompt):
+                # The usage arrives in a final chunk without content
+                _record_token_usage(chunk)
+                if not chunk.content:
+                    continue
+                if not answer_parts:
+                    metrics_recorder.record_time_to_first_token(time.time() - start_time)
+                    metrics_recorder.record_rag_stage("llm_first_token", time.perf_counter() - llm_start)
+                answer_parts.append(chunk.content)
+                yield {"event": "token", "data": {"text": chunk.content}}
+            metrics_recorder.record_rag_stage("llm_total", time.perf_counter() - llm_start)
+
+            answer = "".join(answer_parts)
+            self._store_answer(query_embedding, k, index_version, scope, start_time, answer, sources)
+            self._log_query_completed(question, answer, sources, context_chunks, "Streaming RAG query completed")
+            yield {"event": "done", "data": {"answer_length": len(answer)}}
+
+        except Exception as e:
+            self._record_query_failure(e, start_time, "rag_query_stream", {"question": question, "k": k})
+            raise
+
+    # The query methods above differ only in how they call the embedding service, the vector
+    # store and the LLM (sync, async, batched, streamed); the steps around those calls are shared.
+
+    def _start_query(self, question: str, k: int, message: str) -> float:
+        """Log the start of a query and return its start time"""
+        log_event(
+            self.logger, 
+            "query_started", 
+            message,
+            question=question,
+            k=k
+        )
+        return time.time()
+
+    def _no_results(self, start_time: float) -> Dict[str, Any]:
+        """Record a query whose search found nothing and return the no-results response"""
+        metrics_recorder.record_rag_query(
+            duration_seconds=time.time() - start_time,
+            sources_count=0,
+            success=True
+        )
+        return _no_results_response()
+
+    def _build_prompt(self, question: str, search_results: List[Dict[str, Any]]
+                      ) -> Tuple[List[str], List[Dict[str, Any]], str]:
+        """Prepare the context passages and response sources of search results and the LLM prompt"""
+        with metrics_recorder.time_rag_stage("context_build"):
+            context_chunks, sources = _prepare_context(search_results)
+            prompt = _create_rag_prompt(question, "\n\n".join(context_chunks))
+        return context_chunks, sources, prompt
+
+    def _store_answer(self, query_embedding: List[float], k: int, index_version: int, scope: Hashable,
+                      start_time: float, answer: str, sources: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Build the result of an answered query, cache it and record the query metrics"""
+        duration = time.time() - start_time
+        result = {
+            "answer": answer,
+            "sources": sources,
+            "cached": False
+        }
+        self._store_cached_answer(query_embedding, k, index_version, result, duration, scope)
+
+        # Record metrics
+        metrics_recorder.record_rag_query(
+            duration_seconds=duration,
+            sources_count=len(sources),
+            success=True
+        )
+        return result
+
+    def _log_query_completed(self, question: str, answer: str, sources: List[Dict[str, Any]],
+                             context_chunks: List[str], message: str):
+        log_event(
+            self.logger, 
+            "query_completed", 
+            message,
+            question=question,
+            answer_length=len(answer),
+            sources_found=len(sources),
+            context_chunks=len(context_chunks)
+        )
+
+    def _record_query_failure(self, error: Exception, start_time: float, operation: str, context: Dict[str, Any]):
+        """Record and log a failed query (the caller re-raises)"""
+        metrics_recorder.record_rag_query(
+            duration_seconds=time.time() - start_time,
+            sources_count=0,
+            success=False
+        )
+        metrics_recorder.record_error(
+            error_type=type(error).__name__,
+            operation=operation
+        )
+        log_error(self.logger, error, {"operation": operation, **context})
+
+    def _lookup_cached_answer(self, question: str, query_embedding: List[float], k: int, index_version: int,
+                              start_time: float, scope: Hashable = None) -> Optional[Dict[str, Any]]:
+        """Return a cached answer for a similar question, recording cache metrics"""
+        if self.answer_cache is None:
+            return None
+
+        entry = self.answer_cache.lookup(query_embedding, k, index_version, scope=scope)
+        if entry is None:
+            metrics_recorder.record_answer_cache_lookup(hit=False)
+            return None
+
+        duration = time.time() - start_time
+        result = {**entry["result"], "cached": True}
+        metrics_recorder.record_answer_cache_lookup(
+            hit=True,
+            saved_seconds=entry["duration_seconds"] - duration
+        )
+        metrics_recorder.record_rag_query(
+            duration_seconds=duration,
+            sources_count=len(result["sources"]),
+            success=True
+        )
+        log_event(
+            self.logger,
+            "query_cache_hit",
+            "RAG query answered from cache",
+            question=question,
+            similarity=entry["similarity"]
+        )
+        return result
+
+    def _store_cached_answer(self, query_embedding: List[float], k: int, index_version: int,
+                             result: Dict[str, Any], duration_seconds: float, scope: Hashable = None):
+        # Tagged with the index version the answer was retrieved from, so ingestion invalidates it
+        if self.answer_cache is not None:
+            self.answer_cache.store(query_embedding, k, index_version, result, duration_seconds, scope=scope)
+
     @observe(name="llm_inference")
     def _generate_llm_response(self, prompt: str) -> str:
         """Generate LLM response with tracing"""
-        response = self.llm.invoke(prompt)
+        with metrics_recorder.time_rag_stage("llm_total"):
+            response = self.llm.invoke(prompt)
+        _record_token_usage(response)
         return response.content
+
+    @observe(name="llm_inference")
+    async def _agenerate_llm_response(self, prompt: str) -> str:
+        """Generate LLM response asynchronously with tracing"""
+        with metrics_recorder.time_rag_stage("llm_total"):
+            response = await self.llm.ainvoke(prompt)
+        _record_token_usage(response)
+        return response.content
+
+    @observe(name="llm_inference_batch")
+    async def _agenerate_llm_responses(self, prompts: List[str]) -> List[str]:
+        """Generate LLM responses for several prompts with bounded concurrency"""
+        if not prompts:
+            return []
+        with metrics_recorder.time_rag_stage("llm_total", mode="batch"):
+            responses = await self.llm.abatch(prompts, config={"max_concurrency": QUERY_BATCH_LLM_CONCURRENCY})
+        for response in responses:
+            _record_token_usage(response)
+        return [response.content for response in responses]
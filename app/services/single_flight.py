@@ -0,0 +1,41 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from app.core.metrics import metrics_recorder
+
+
+def normalize_question(question: str) -> str:
+    """Normalize a question so trivially different spellings share one computation"""
+    return " ".join(question.lower().split())
+
+
+class SingleFlight:
+    """Deduplicates concurrent async calls with the same key.
+
+    The first caller starts the computation as a task; callers arriving while it is
+    in flight await the same task and receive the same result (or exception). The
+    task is shielded, so a cancelled caller does not cancel it for the others.
+    """
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            metrics_recorder.record_coalesced_request(self.operation)
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Mark the exception as retrieved in case every caller was cancelled
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional
+from langchain.schema import Document
+from app.core.logging_config import get_logger, log_event
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SOURCE_CACHE_DIR = os.getenv("SOURCE_CACHE_DIR", "../data/source_cache")
+
+
+def _digest(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def _write_atomic(path: str, data: bytes):
+    """Write through a temp file so concurrent readers never see a partial file"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class SourceCache:
+    """On-disk cache of raw source pages (with HTTP validators) and of their chunks.
+
+    Pages are stored as the raw response body plus a JSON entry holding the ETag,
+    Last-Modified and extracted text, so a 304 needs no HTML parsing. Chunks are
+    stored per source keyed by a hash of the source text and splitter settings,
+    so an unchanged source needs no re-chunking.
+    """
+
+    def __init__(self, cache_dir: str = None):
+        self.logger = get_logger("source_cache")
+        self.cache_dir = os.path.abspath(cache_dir or SOURCE_CACHE_DIR)
+        self.pages_dir = os.path.join(self.cache_dir, "pages")
+        self.chunks_dir = os.path.join(self.cache_dir, "chunks")
+        os.makedirs(self.pages_dir, exist_ok=True)
+        os.makedirs(self.chunks_dir, exist_ok=True)
+
+        log_event(
+            self.logger,
+            "source_cache_initialized",
+            "Source cache initialized",
+            path=self.cache_dir
+        )
+
+    def get_page(self, url: str) -> Optional[Dict[str, Any]]:
+        """Return the cached entry (etag, last_modified, text) for a URL, if any"""
+        path = os.path.join(self.pages_dir, f"{_digest(url)}.json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put_page(self, url: str, etag: Optional[str], last_modified: Optional[str], raw: bytes, text: str):
+        """Store a freshly downloaded page with its validators and extracted text"""
+        key = _digest(url)
+        _write_atomic(os.path.join(self.pages_dir, f"{key}.html"), raw)
+        entry = {"url": url, "etag": etag, "last_modified": last_modified, "text": text}
+        _write_atomic(os.path.join(self.pages_dir, f"{key}.json"), json.dumps(entry).encode("utf-8"))
+
+    def get_chunks(self, key: str) -> Optional[List[Document]]:
+        """Return previously computed chunks for a source text key, if any"""
+        path = os.path.join(self.chunks_dir, f"{key}.json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                items = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return [Document(page_content=item["page_content"], metadata=item["metadata"]) for item in items]
+
+    def put_chunks(self, key: str, source: str, documents: List[Document]):
+        """Store the chunks of a source, replacing chunks of its previous versions"""
+        for name in os.listdir(self.chunks_dir):
+            if name.startswith(f"{_digest(source)[:16]}-") and name.endswith(".json") and name != f"{key}.json":
+                os.remove(os.path.join(self.chunks_dir, name))
+        items = [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in documents]
+        _write_atomic(os.path.join(self.chunks_dir, f"{key}.json"), json.dumps(items).encode("utf-8"))
+
+    @staticmethod
+    def chunks_key(source: str, text: str, splitter_settings: str) -> str:
+        """Key for the chunks of one version of a source under given splitter settings"""
+        return f"{_digest(source)[:16]}-{_digest(splitter_settings + chr(0) + text)}"
@@ -0,0 +1,67 @@
+import math
+import os
+import threading
+from typing import Optional
+import tiktoken
+from app.core.logging_config import get_logger
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# tiktoken encoding of the chat model (cl100k_base for gpt-3.5-turbo)
+TOKEN_ENCODING = os.getenv("TOKEN_ENCODING", "cl100k_base")
+
+# Estimate used when the encoding cannot be loaded
+CHARS_PER_TOKEN = 4
+
+_token_counter = None
+_token_counter_lock = threading.Lock()
+
+
+class TokenCounter:
+    """Counts and truncates text in tokens of a tiktoken encoding.
+
+    tiktoken downloads an encoding on first use; if that fails (e.g. no network access),
+    token counts fall back to an estimate of one token per CHARS_PER_TOKEN characters.
+    """
+
+    def __init__(self, encoding_name: str = TOKEN_ENCODING):
+        self.encoding_name = encoding_name
+        self._encoding: Optional[tiktoken.Encoding]
+        try:
+            self._encoding = tiktoken.get_encoding(encoding_name)
+        except Exception as e:
+            self._encoding = None
+            get_logger("token_counter").warning(
+                "Token encoding unavailable, estimating token counts from characters",
+                extra={"event_type": "token_encoding_unavailable", "encoding": encoding_name, "error": str(e)}
+            )
+
+    @property
+    def exact(self) -> bool:
+        return self._encoding is not None
+
+    def count(self, text: str) -> int:
+        if self._encoding is None:
+            return math.ceil(len(text) / CHARS_PER_TOKEN)
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Return the longest prefix of text that fits in max_tokens"""
+        if max_tokens <= 0:
+            return ""
+        if self._encoding is None:
+            return text[:max_tokens * CHARS_PER_TOKEN]
+        tokens = self._encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return self._encoding.decode(tokens[:max_tokens])
+
+
+def get_token_counter() -> TokenCounter:
+    """Shared TokenCounter for the configured encoding, loaded on first use"""
+    global _token_counter
+    with _token_counter_lock:
+        if _token_counter is None:
+            _token_counter = TokenCounter()
+        return _token_counter
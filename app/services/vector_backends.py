@@ -0,0 +1,477 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+
+COLLECTION_NAME = "rag_documents"
+
+# Rows are preallocated in the memory-mapped matrix and doubled when full
+_INITIAL_CAPACITY = 1024
+# SQLite limits the number of bound parameters per statement
+_SQL_BATCH_SIZE = 500
+
+
+class VectorBackend:
+    """Storage and nearest-neighbour search for chunk embeddings.
+
+    Backends only store and search; IDs, versioning, metrics and logging live in VectorStore.
+    Distances are squared L2, i.e. 2 - 2 * cosine similarity for the normalized OpenAI embeddings.
+    """
+
+    name = "base"
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def get_metadatas(self, sources: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Return {id: metadata} of all stored chunks belonging to the given sources"""
+        raise NotImplementedError
+
+    def get_sources(self, ids: List[str]) -> Dict[str, str]:
+        """Return {id: source} for the given IDs that are stored"""
+        raise NotImplementedError
+
+    def get_documents(self, ids: Optional[List[str]] = None) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+        """Return {id: (text, metadata)} for the given IDs that are stored, or for all chunks"""
+        raise NotImplementedError
+
+    def upsert(self, ids: List[str], texts: List[str], embeddings: List[List[float]],
+               metadatas: List[Dict[str, Any]]):
+        raise NotImplementedError
+
+    def update_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        raise NotImplementedError
+
+    def delete(self, ids: List[str]):
+        raise NotImplementedError
+
+    def query(self, embedding: List[float], k: int, sources: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Return up to k results as dicts with id, text, metadata and distance, nearest first.
+
+        With sources, only chunks of those sources are searched.
+        """
+        return self.query_batch([embedding], k, sources=sources)[0]
+
+    def query_batch(self, embeddings: List[List[float]], k: int,
+                    sources: Optional[List[str]] = None) -> List[List[Dict[str, Any]]]:
+        """Run several queries in one call; returns one result list per embedding"""
+        raise NotImplementedError
+
+    def source_counts(self) -> Dict[str, int]:
+        raise NotImplementedError
+
+    def iter_records(self, batch_size: int = 1000) -> Iterator[Tuple[List[str], List[str], np.ndarray,
+                                                                    List[Dict[str, Any]]]]:
+        """Yield every stored chunk in batches of (ids, texts, embeddings, metadatas).
+
+        Embeddings come as a float32 matrix, which upsert accepts as is.
+        """
+        raise NotImplementedError
+
+    def warm_up(self):
+        """Load the search structures into memory before the first query hits them"""
+
+    def drop(self):
+        """Delete everything this backend stored; it cannot be used afterwards"""
+        raise NotImplementedError
+
+
+class ChromaBackend(VectorBackend):
+    """Chroma persistent collection (SQLite + HNSW index)"""
+
+    name = "chroma"
+
+    def __init__(self, persist_directory: str):
+        # Imported here: chromadb is slow to import and unused with the default backend
+        import chromadb
+
+        self.client = chromadb.PersistentClient(path=persist_directory)
+        self.collection = self.client.get_or_create_collection(
+            name=COLLECTION_NAME,
+            metadata={"description": "RAG microservice document collection"}
+        )
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def get_metadatas(self, sources: List[str]) -> Dict[str, Dict[str, Any]]:
+        existing = self.collection.get(where={"source": {"$in": sources}}, include=["metadatas"])
+        return dict(zip(existing['ids'], existing['metadatas']))
+
+    def get_sources(self, ids: List[str]) -> Dict[str, str]:
+        if not ids:
+            return {}
+        existing = self.collection.get(ids=ids, include=["metadatas"])
+        return {
+            doc_id: metadata.get('source', 'unknown')
+            for doc_id, metadata in zip(existing['ids'], existing['metadatas'])
+        }
+
+    def get_documents(self, ids=None):
+        if ids is not None and not ids:
+            return {}
+        existing = self.collection.get(ids=ids, include=["documents", "metadatas"])
+        return {
+            doc_id: (text, metadata)
+            for doc_id, text, metadata in zip(existing['ids'], existing['documents'], existing['metadatas'])
+        }
+
+    def upsert(self, ids, texts, embeddings, metadatas):
+        self.collection.upsert(ids=ids, documents=texts, embeddings=embeddings, metadatas=metadatas)
+
+    def update_metadata(self, ids, metadatas):
+        self.collection.update(ids=ids, metadatas=metadatas)
+
+    def delete(self, ids):
+        self.collection.delete(ids=ids)
+
+    def query_batch(self, embeddings, k, sources=None):
+        results = self.collection.query(
+            query_embeddings=embeddings,
+            n_results=k,
+            where={"source": {"$in": sources}} if sources is not None else None,
+            include=["documents", "metadatas", "distances"]
+        )
+
+        batch_results = []
+        for q in range(len(embeddings)):
+            formatted_results = []
+            if results['documents'] and results['documents'][q]:
+                for i in range(len(results['documents'][q])):
+                    formatted_results.append({
+                        'id': results['ids'][q][i],
+                        'text': results['documents'][q][i],
+                        'metadata': results['metadatas'][q][i],
+                        'distance': results['distances'][q][i]
+                    })
+            batch_results.append(formatted_results)
+        return batch_results
+
+    def source_counts(self) -> Dict[str, int]:
+        count = self.collection.count()
+        results = self.collection.get(limit=count, include=["metadatas"])
+        sources = {}
+        for metadata in results['metadatas'] or []:
+            source = metadata.get('source', 'unknown')
+            sources[source] = sources.get(source, 0) + 1
+        return sources
+
+    def iter_records(self, batch_size=1000):
+        for offset in range(0, self.collection.count(), batch_size):
+            batch = self.collection.get(limit=batch_size, offset=offset,
+                                        include=["documents", "embeddings", "metadatas"])
+            yield batch['ids'], batch['documents'], np.asarray(batch['embeddings'], dtype=np.float32), batch['metadatas']
+
+    def warm_up(self):
+        # The first query loads the HNSW segment from disk
+        sample = self.collection.peek(limit=1)
+        if sample['ids']:
+            self.query_batch([np.asarray(sample['embeddings'][0], dtype=np.float32).tolist()], 1)
+
+    def drop(self):
+        self.client.delete_collection(COLLECTION_NAME)
+
+
+class NumpyBackend(VectorBackend):
+    """Exact brute-force search over a memory-mapped matrix of normalized float32 embeddings.
+
+    Row i of vectors.f32 holds the embedding of the record with row = i in records.sqlite3,
+    rows [0, count) are live. A batch of searches is one matrix product plus argpartition
+    for the top k of each query. Deletes move the last row into the freed slot so live rows
+    stay contiguous. The source of every row is kept in memory as a small integer code, so a
+    source filter selects its partition of rows before any similarity is computed.
+
+    Searches score outside the lock, so they run concurrently with each other: every write
+    bumps a generation counter, and a search that overlapped a write scores again under the lock.
+    """
+
+    name = "numpy"
+
+    def __init__(self, persist_directory: str):
+        self.vectors_path = os.path.join(persist_directory, "vectors.f32")
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._records_path = os.path.join(persist_directory, "records.sqlite3")
+        self._conn = sqlite3.connect(self._records_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            " id TEXT PRIMARY KEY,"
+            " row INTEGER NOT NULL UNIQUE,"
+            " source TEXT NOT NULL,"
+            " text TEXT NOT NULL,"
+            " metadata TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_records_source ON records (source)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.commit()
+
+        self._count = self._conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+        settings = dict(self._conn.execute("SELECT key, value FROM settings").fetchall())
+        self._dimensions = settings.get("dimensions")
+        self._matrix = None
+        if self._dimensions is not None and os.path.exists(self.vectors_path):
+            capacity = os.path.getsize(self.vectors_path) // (4 * self._dimensions)
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r+",
+                                     shape=(capacity, self._dimensions))
+
+        # Source code of every row, parallel to the matrix
+        self._source_codes: Dict[str, int] = {}
+        self._row_sources = np.zeros(self._matrix.shape[0] if self._matrix is not None else 0, dtype=np.int32)
+        for row, source in self._conn.execute("SELECT row, source FROM records"):
+            self._row_sources[row] = self._source_code(source)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._count
+
+    def get_metadatas(self, sources):
+        found = {}
+        with self._lock:
+            for start in range(0, len(sources), _SQL_BATCH_SIZE):
+                batch = sources[start:start + _SQL_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT id, metadata FROM records WHERE source IN ({placeholders})", batch
+                ).fetchall()
+                found.update((doc_id, json.loads(metadata)) for doc_id, metadata in rows)
+        return found
+
+    def get_sources(self, ids):
+        found = {}
+        with self._lock:
+            for start in range(0, len(ids), _SQL_BATCH_SIZE):
+                batch = ids[start:start + _SQL_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                found.update(self._conn.execute(
+                    f"SELECT id, source FROM records WHERE id IN ({placeholders})", batch
+                ).fetchall())
+        return found
+
+    def get_documents(self, ids=None):
+        with self._lock:
+            if ids is None:
+                rows = self._conn.execute("SELECT id, text, metadata FROM records").fetchall()
+            else:
+                rows = []
+                for start in range(0, len(ids), _SQL_BATCH_SIZE):
+                    batch = ids[start:start + _SQL_BATCH_SIZE]
+                    placeholders = ",".join("?" * len(batch))
+                    rows.extend(self._conn.execute(
+                        f"SELECT id, text, metadata FROM records WHERE id IN ({placeholders})", batch
+                    ).fetchall())
+        return {doc_id: (text, json.loads(metadata)) for doc_id, text, metadata in rows}
+
+    def upsert(self, ids, texts, embeddings, metadatas):
+        vectors = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        with self._lock:
+            self._ensure_capacity_locked(self._count + len(ids), vectors.shape[1])
+            self._generation += 1
+            existing = self._rows_locked(ids)
+            for doc_id, text, vector, metadata in zip(ids, texts, vectors, metadatas):
+                row = existing.get(doc_id)
+                if row is None:
+                    row = self._count
+                    self._count += 1
+                    existing[doc_id] = row
+                self._matrix[row] = vector
+                self._row_sources[row] = self._source_code(metadata.get('source', 'unknown'))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO records (id, row, source, text, metadata) VALUES (?, ?, ?, ?, ?)",
+                    (doc_id, row, metadata.get('source', 'unknown'), text, json.dumps(metadata))
+                )
+            self._matrix.flush()
+            self._conn.commit()
+
+    def update_metadata(self, ids, metadatas):
+        with self._lock:
+            self._generation += 1
+            rows = self._rows_locked(ids)
+            for doc_id, metadata in zip(ids, metadatas):
+                if doc_id in rows:
+                    self._row_sources[rows[doc_id]] = self._source_code(metadata.get('source', 'unknown'))
+            self._conn.executemany(
+                "UPDATE records SET source = ?, metadata = ? WHERE id = ?",
+                [(metadata.get('source', 'unknown'), json.dumps(metadata), doc_id)
+                 for doc_id, metadata in zip(ids, metadatas)]
+            )
+            self._conn.commit()
+
+    def delete(self, ids):
+        with self._lock:
+            self._generation += 1
+            rows = self._rows_locked(ids)
+            # Highest rows first, so a moved last row is never one still to be deleted
+            for doc_id, row in sorted(rows.items(), key=lambda item: item[1], reverse=True):
+                self._conn.execute("DELETE FROM records WHERE id = ?", (doc_id,))
+                last = self._count - 1
+                if row != last:
+                    self._matrix[row] = self._matrix[last]
+                    self._row_sources[row] = self._row_sources[last]
+                    self._conn.execute("UPDATE records SET row = ? WHERE row = ?", (row, last))
+                self._count -= 1
+            if self._matrix is not None:
+                self._matrix.flush()
+            self._conn.commit()
+
+    def query_batch(self, embeddings, k, sources=None):
+        queries = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        if k <= 0:
+            return [[] for _ in embeddings]
+
+        with self._lock:
+            generation, *snapshot = self._snapshot_locked(sources)
+        scores = self._score(queries, k, *snapshot)
+
+        with self._lock:
+            if self._generation != generation:
+                # A write moved or replaced rows while scoring; score again while holding the lock
+                _, *snapshot = self._snapshot_locked(sources)
+                scores = self._score(queries, k, *snapshot)
+            if scores is None:
+                return [[] for _ in embeddings]
+            similarities, top, top_rows = scores
+
+            rows = sorted({int(row) for row in top_rows.flat})
+            records = {}
+            for start in range(0, len(rows), _SQL_BATCH_SIZE):
+                batch = rows[start:start + _SQL_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                records.update(
+                    (row, (doc_id, text, metadata))
+                    for row, doc_id, text, metadata in self._conn.execute(
+                        f"SELECT row, id, text, metadata FROM records WHERE row IN ({placeholders})", batch
+                    )
+                )
+
+        return [
+            [
+                {
+                    'id': records[int(row)][0],
+                    'text': records[int(row)][1],
+                    'metadata': json.loads(records[int(row)][2]),
+                    'distance': float(2.0 - 2.0 * similarities[candidate, q])
+                }
+                for candidate, row in zip(top[:, q], top_rows[:, q])
+            ]
+            for q in range(len(embeddings))
+        ]
+
+    def source_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT source, COUNT(*) FROM records GROUP BY source").fetchall())
+
+    def iter_records(self, batch_size=1000):
+        # The lock is held per batch, not across yields, so searches interleave with a long export
+        with self._lock:
+            count = self._count
+        for start in range(0, count, batch_size):
+            with self._lock:
+                batch = self._conn.execute(
+                    "SELECT id, row, text, metadata FROM records WHERE row >= ? AND row < ? ORDER BY row",
+                    (start, min(start + batch_size, self._count))
+                ).fetchall()
+                vectors = self._matrix[[row for _, row, _, _ in batch]]
+            yield ([doc_id for doc_id, _, _, _ in batch], [text for _, _, text, _ in batch],
+                   vectors, [json.loads(metadata) for _, _, _, metadata in batch])
+
+    def warm_up(self):
+        # Touch every live row so the memory-mapped pages are resident
+        with self._lock:
+            if self._count:
+                float(self._matrix[:self._count].sum())
+
+    def drop(self):
+        self.close()
+        for path in (self.vectors_path, self._records_path,
+                     f"{self._records_path}-wal", f"{self._records_path}-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _snapshot_locked(self, sources):
+        """The write generation and what a search reads: the live rows, their source codes and the filter"""
+        if self._matrix is None or not self._count:
+            return self._generation, None, None, None
+        codes = None
+        if sources is not None:
+            codes = [self._source_codes[source] for source in sources if source in self._source_codes]
+        return self._generation, self._matrix[:self._count], self._row_sources[:self._count], codes
+
+    @staticmethod
+    def _score(queries, k, matrix, row_sources, codes):
+        """Similarities, top k candidates and their rows per query, or None without candidates"""
+        if matrix is None:
+            return None
+        if codes is None:
+            candidate_rows = None
+            candidates = matrix
+        else:
+            candidate_rows = np.flatnonzero(np.isin(row_sources, codes))
+            if not len(candidate_rows):
+                return None
+            candidates = matrix[candidate_rows]
+
+        # One matrix-matrix product scores every query against every candidate: (candidates, queries)
+        similarities = candidates @ queries.T
+        k = min(k, len(candidates))
+        top = np.argpartition(-similarities, k - 1, axis=0)[:k]
+        order = np.argsort(-np.take_along_axis(similarities, top, axis=0), axis=0)
+        top = np.take_along_axis(top, order, axis=0)
+        top_rows = top if candidate_rows is None else candidate_rows[top]
+        return similarities, top, top_rows
+
+    def _source_code(self, source: str) -> int:
+        return self._source_codes.setdefault(source, len(self._source_codes))
+
+    def _rows_locked(self, ids: List[str]) -> Dict[str, int]:
+        rows = {}
+        for start in range(0, len(ids), _SQL_BATCH_SIZE):
+            batch = ids[start:start + _SQL_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows.update(self._conn.execute(
+                f"SELECT id, row FROM records WHERE id IN ({placeholders})", batch
+            ).fetchall())
+        return rows
+
+    def _ensure_capacity_locked(self, rows: int, dimensions: int):
+        if self._dimensions is None:
+            self._dimensions = dimensions
+            self._conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('dimensions', ?)", (dimensions,))
+        elif dimensions != self._dimensions:
+            raise ValueError(f"Embedding dimension {dimensions} does not match the index ({self._dimensions})")
+
+        capacity = self._matrix.shape[0] if self._matrix is not None else 0
+        if rows <= capacity:
+            return
+        new_capacity = max(capacity, _INITIAL_CAPACITY)
+        while new_capacity < rows:
+            new_capacity *= 2
+
+        # Grow the backing file and remap it; existing rows keep their offsets
+        if self._matrix is not None:
+            self._matrix.flush()
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(new_capacity * dimensions * 4)
+        self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r+",
+                                 shape=(new_capacity, dimensions))
+        row_sources = np.zeros(new_capacity, dtype=np.int32)
+        row_sources[:len(self._row_sources)] = self._row_sources
+        self._row_sources = row_sources
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+BACKENDS = {
+    ChromaBackend.name: ChromaBackend,
+    NumpyBackend.name: NumpyBackend,
+}
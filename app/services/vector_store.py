@@ -1,90 +1,249 @@
-import chromadb
-from typing import List, Dict, Any
+import asyncio
+import contextvars
+import fcntl
+import hashlib
+import json
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from langchain.schema import Document
-from app.core.logging_config import get_logger, log_event
+from app.core.logging_config import get_logger, log_event, log_error
 from app.core.metrics import metrics_recorder
+from app.services.vector_backends import BACKENDS, VectorBackend
+from app.services.bm25_index import BM25Index
 from langfuse import observe
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Upper bound on concurrent vector searches issued from async request handlers
+VECTOR_SEARCH_MAX_WORKERS = int(os.getenv("VECTOR_SEARCH_MAX_WORKERS", "4"))
 
-class VectorStore:
-    def __init__(self, persist_directory: str = None):
-        """Initialize Chroma vector store"""
-        self.logger = get_logger("vector_store")
-        
-        # Use environment variable or default path
-        if persist_directory is None:
-            persist_directory = "../data/chroma_db"
-        
-        # Convert to absolute path for clarity
-        persist_directory = os.path.abspath(persist_directory)
-        
-        # Create directory if it doesn't exist
-        os.makedirs(persist_directory, exist_ok=True)
-        
-        log_event(
-            self.logger, 
-            "vector_store_path", 
-            "ChromaDB path initialized",
-            path=persist_directory
-        )
+# "numpy" (exact brute-force search, memory-mapped) or "chroma"
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "numpy")
 
-        # Initialize Chroma client with persistence
-        self.client = chromadb.PersistentClient(path=persist_directory)
+# Hybrid retrieval: candidates taken from each ranking per requested result, and the
+# reciprocal rank fusion constant (higher flattens the weight of top ranks)
+HYBRID_CANDIDATES_PER_RESULT = int(os.getenv("HYBRID_CANDIDATES_PER_RESULT", "4"))
+RRF_K = int(os.getenv("RRF_K", "60"))
 
-        # Get or create collection
-        self.collection = self.client.get_or_create_collection(
-            name="rag_documents",
-            metadata={"description": "RAG microservice document collection"}
-        )
+# Seconds a replaced index version is kept after it stops being the rollback target
+INDEX_VERSION_GRACE_SECONDS = float(os.getenv("INDEX_VERSION_GRACE_SECONDS", "600"))
+# Seconds between checks whether another process (worker) changed the active index version
+INDEX_MANIFEST_CHECK_SECONDS = float(os.getenv("INDEX_MANIFEST_CHECK_SECONDS", "1"))
+# The first version, stored directly in the persist directory
+INITIAL_VERSION = "v1"
+# Chunks copied per batch when a new version is seeded from the active one; small batches
+# keep each step short so searches running meanwhile are not held up
+_COPY_BATCH_SIZE = 256
 
-        collection_size = self.collection.count()
-        log_event(
-            self.logger, 
-            "vector_store_initialized", 
-            "Vector store initialized",
-            collection_size=collection_size,
-            persist_directory=persist_directory
-        )
+DEFAULT_PERSIST_DIRECTORIES = {
+    "chroma": "../data/chroma_db",
+    "numpy": "../data/numpy_index",
+}
+
+
+def _warn_if_other_backend_has_data(logger, backend: str, persist_directory: str):
+    """Warn when the default directory of another backend holds an index and this one has none.
+
+    numpy became the default backend after chroma, so an existing deployment would otherwise
+    start from an empty index without a hint.
+    """
+    if os.path.exists(persist_directory):
+        return
+    for other, directory in DEFAULT_PERSIST_DIRECTORIES.items():
+        if other != backend and os.path.isdir(directory) and os.listdir(directory):
+            logger.warning(
+                f"No {backend} index yet, but a {other} index exists; set VECTOR_STORE_BACKEND={other} to keep using it",
+                extra={
+                    "event_type": "vector_store_other_backend_found",
+                    "backend": backend,
+                    "other_backend": other,
+                    "other_directory": os.path.abspath(directory)
+                }
+            )
+
+
+def document_ids(documents: List[Document]) -> List[str]:
+    """Deterministic chunk IDs derived from the source and a hash of the chunk text.
+
+    Identical chunks within the same source get an occurrence suffix so IDs stay unique.
+    """
+    ids = []
+    occurrences = {}
+    for doc in documents:
+        digest = hashlib.sha256(
+            f"{doc.metadata.get('source', 'unknown')}\x00{doc.page_content}".encode("utf-8")
+        ).hexdigest()[:32]
+        occurrence = occurrences.get(digest, 0)
+        occurrences[digest] = occurrence + 1
+        ids.append(f"{digest}-{occurrence}" if occurrence else digest)
+    return ids
+
+
+def _within_distance(results: List[Dict[str, Any]], max_distance: Optional[float]) -> List[Dict[str, Any]]:
+    """Drop results farther than max_distance (results are sorted nearest first)"""
+    if max_distance is None:
+        return results
+    return [result for result in results if result['distance'] <= max_distance]
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = RRF_K) -> List[str]:
+    """Fuse several rankings of IDs: each ID scores the sum of 1 / (k + rank) over the rankings"""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class SourceCounts:
+    """Per-source chunk counts, updated incrementally on every write and persisted as JSON.
+
+    The file also records the total, so counts left stale by a crash between a backend
+    write and the count update are detected on load and rebuilt from the backend.
+    """
+
+    FILE_NAME = "source_counts.json"
+
+    def __init__(self, persist_directory: str, backend: VectorBackend):
+        self.path = os.path.join(persist_directory, self.FILE_NAME)
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {}
+
+        total = backend.count()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            if stored["total"] == total and sum(stored["sources"].values()) == total:
+                self._counts = stored["sources"]
+                return
+        except (OSError, ValueError, KeyError):
+            pass
+
+        # Missing or stale: one full scan, then incremental from here on
+        self._counts = backend.source_counts()
+        self._save_locked()
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def apply(self, delta: Dict[str, int]) -> Dict[str, int]:
+        """Add per-source deltas, persist, and return the new counts of the changed sources"""
+        changed = {}
+        with self._lock:
+            for source, change in delta.items():
+                if not change:
+                    continue
+                count = self._counts.get(source, 0) + change
+                if count > 0:
+                    self._counts[source] = count
+                else:
+                    self._counts.pop(source, None)
+                changed[source] = max(count, 0)
+            if changed:
+                self._save_locked()
+        return changed
+
+    def _save_locked(self):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"total": sum(self._counts.values()), "sources": self._counts}, f)
+        os.replace(tmp_path, self.path)
+
+
+class IndexVersion:
+    """One version of the index: a backend collection with its per-source counts and BM25 index.
+
+    Ingestion writes into a version that is not serving yet and VectorStore switches queries
+    to it once it is complete. Only the live (serving) version publishes collection size metrics.
+    """
+
+    def __init__(self, name: str, directory: str, backend: VectorBackend, logger):
+        self.name = name
+        self.directory = directory
+        self.backend = backend
+        self.logger = logger
+        self.live = False
+        self.source_counts = SourceCounts(directory, backend)
+        self.lexical_index = self._load_lexical_index()
+
+    def diff_documents(self, documents: List[Document], full: bool = False, complete: bool = True) -> Dict[str, Any]:
+        """Compare freshly loaded chunks with what is stored for the same sources.
+
+        Returns the documents to add (new content), the documents whose metadata changed,
+        the IDs of stored chunks that disappeared and the number of unchanged chunks.
+        With full=True every loaded chunk is re-added regardless of what is stored.
+        With complete=False the documents are only part of their sources (some pages failed
+        to load), so a stored chunk missing from them is kept rather than removed.
+        """
+        ids = document_ids(documents)
+        sources = sorted({doc.metadata.get('source', 'unknown') for doc in documents})
+
+        stored = self.backend.get_metadatas(sources) if sources else {}
+
+        added, updated = [], []
+        skipped = 0
+        for doc_id, doc in zip(ids, documents):
+            if full or doc_id not in stored:
+                added.append((doc_id, doc))
+            elif stored[doc_id] != doc.metadata:
+                updated.append((doc_id, doc))
+            else:
+                skipped += 1
+
+        current = set(ids)
+        removed = [doc_id for doc_id in stored if doc_id not in current] if complete else []
+
+        return {
+            "added": added,
+            "updated": updated,
+            "removed": removed,
+            "skipped": skipped
+        }
 
-    def add_documents(self, documents: List[Document], embeddings: List[List[float]]):
-        """Add documents and their embeddings to the vector store"""
+    def add_documents(self, documents: List[Document], embeddings: List[List[float]], ids: List[str] = None):
+        """Add documents and their embeddings to this version"""
         log_event(
-            self.logger, 
-            "documents_add_started", 
+            self.logger,
+            "documents_add_started",
             "Adding documents to vector store",
-            document_count=len(documents)
+            document_count=len(documents),
+            index_version=self.name
         )
 
         try:
-            # Prepare data for Chroma
-            ids = [f"doc_{i}" for i in range(len(documents))]
+            # Prepare data for the backend
+            if ids is None:
+                ids = document_ids(documents)
             texts = [doc.page_content for doc in documents]
             metadatas = [doc.metadata for doc in documents]
 
-            # Add to collection
-            self.collection.add(
-                ids=ids,
-                documents=texts,
-                embeddings=embeddings,
-                metadatas=metadatas
-            )
+            # Upsert so re-adding a chunk with the same content-derived ID is idempotent
+            previous_sources = self.backend.get_sources(ids)
+            self.backend.upsert(ids, texts, embeddings, metadatas)
+
+            self._update_source_counts(previous_sources, dict(zip(ids, metadatas)))
+            self.lexical_index.add(ids, texts, [metadata.get('source', 'unknown') for metadata in metadatas])
+            self._save_lexical_index()
+            total_count = self.backend.count()
 
-            total_count = self.collection.count()
-            
             # Record metrics
             metrics_recorder.record_vector_store_operation("add", success=True)
-            metrics_recorder.update_vector_store_size(total_count)
-            
+
             log_event(
-                self.logger, 
-                "documents_add_completed", 
+                self.logger,
+                "documents_add_completed",
                 "Documents added to vector store",
                 documents_added=len(documents),
-                total_collection_size=total_count
+                total_collection_size=total_count,
+                index_version=self.name
             )
         except Exception as e:
             metrics_recorder.record_vector_store_operation("add", success=False)
@@ -94,31 +253,403 @@ class VectorStore:
             )
             raise
 
-    @observe(name="similarity_search")
-    def similarity_search(self, query_embedding: List[float], k: int = 5) -> List[Dict[str, Any]]:
-        """Search for similar documents"""
+    def update_metadata(self, ids: List[str], documents: List[Document]):
+        """Update stored metadata of unchanged chunks (e.g. a shifted chunk_id)"""
+        try:
+            previous_sources = self.backend.get_sources(ids)
+            self.backend.update_metadata(ids, [doc.metadata for doc in documents])
+            self._update_source_counts(
+                previous_sources,
+                {doc_id: doc.metadata for doc_id, doc in zip(ids, documents) if doc_id in previous_sources}
+            )
+            self.lexical_index.update_sources(ids, [doc.metadata.get('source', 'unknown') for doc in documents])
+            self._save_lexical_index()
+            metrics_recorder.record_vector_store_operation("update", success=True)
+        except Exception as e:
+            metrics_recorder.record_vector_store_operation("update", success=False)
+            metrics_recorder.record_error(
+                error_type=type(e).__name__,
+                operation="vector_store_update"
+            )
+            raise
+
+    def delete_documents(self, ids: List[str]):
+        """Delete chunks by ID"""
         try:
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=k,
-                include=["documents", "metadatas", "distances"]
+            previous_sources = self.backend.get_sources(ids)
+            self.backend.delete(ids)
+            self._update_source_counts(previous_sources, {})
+            self.lexical_index.remove(ids)
+            self._save_lexical_index()
+            metrics_recorder.record_vector_store_operation("delete", success=True)
+            log_event(
+                self.logger,
+                "documents_deleted",
+                "Documents deleted from vector store",
+                documents_deleted=len(ids),
+                index_version=self.name
+            )
+        except Exception as e:
+            metrics_recorder.record_vector_store_operation("delete", success=False)
+            metrics_recorder.record_error(
+                error_type=type(e).__name__,
+                operation="vector_store_delete"
             )
+            raise
 
-            # Format results
-            formatted_results = []
-            if results['documents'] and results['documents'][0]:
-                for i in range(len(results['documents'][0])):
-                    formatted_results.append({
-                        'text': results['documents'][0][i],
-                        'metadata': results['metadatas'][0][i],
-                        'distance': results['distances'][0][i]
-                    })
+    def get_collection_stats(self) -> Dict[str, Any]:
+        """Get statistics about the collection from the incrementally maintained counts"""
+        sources = self.source_counts.snapshot()
+        return {
+            'total_documents': sum(sources.values()),
+            'sources': sources
+        }
+
+    def warm_up(self):
+        self.backend.warm_up()
+
+    def _save_lexical_index(self):
+        # A version that is not serving yet is saved once, when it is activated; if the process
+        # dies first, its BM25 index is rebuilt from the backend when the version is resumed
+        if self.live:
+            self.lexical_index.save()
+
+    def _load_lexical_index(self) -> BM25Index:
+        """Load the persisted BM25 index, rebuilding it from the stored chunks if missing or stale"""
+        path = os.path.join(self.directory, BM25Index.FILE_NAME)
+        index = BM25Index.load(path)
+        if index is not None and len(index) == self.backend.count():
+            return index
+
+        index = BM25Index(path)
+        documents = self.backend.get_documents()
+        index.add(
+            list(documents),
+            [text for text, _ in documents.values()],
+            [metadata.get('source', 'unknown') for _, metadata in documents.values()]
+        )
+        index.save()
+        log_event(
+            self.logger,
+            "lexical_index_rebuilt",
+            "BM25 index rebuilt from the vector store",
+            documents_indexed=len(documents),
+            index_version=self.name
+        )
+        return index
+
+    def _update_source_counts(self, previous_sources: Dict[str, str], current_metadatas: Dict[str, Dict[str, Any]]):
+        """Apply a write to the per-source counts: IDs leave their previous source and join their current one"""
+        delta = {}
+        for source in previous_sources.values():
+            delta[source] = delta.get(source, 0) - 1
+        for metadata in current_metadatas.values():
+            source = metadata.get('source', 'unknown')
+            delta[source] = delta.get(source, 0) + 1
+
+        changed = self.source_counts.apply(delta)
+        if self.live:
+            for source, count in changed.items():
+                metrics_recorder.update_vector_store_size(source, count)
+
+
+class VectorStore:
+    """Search over the active index version, with blue/green rebuilds.
+
+    A rebuild writes into a new version from create_version (seeded with a copy of the active
+    one) while queries keep being served by the active version. activate warms the new
+    version up and switches queries to it in one step; the version it replaced stays on disk
+    so rollback can switch back. Versions older than that are deleted by collect_garbage once
+    they have been retired for INDEX_VERSION_GRACE_SECONDS, long enough for searches still
+    running against them to finish.
+
+    Version v1 lives directly in persist_directory (the layout before versioning), later
+    versions in versions/<name>. index_versions.json records which version is active and is
+    replaced atomically, so a crash leaves either the old or the new version active. It also
+    records the version being built, which is kept when its build fails so that resume_version
+    can continue it.
+
+    Several processes (uvicorn workers) may open the same persist_directory. Every change of
+    the manifest is made under an exclusive lock on index_versions.lock, after re-reading the
+    manifest, so no process works from a stale copy. A background thread of each process checks
+    the manifest every INDEX_MANIFEST_CHECK_SECONDS and switches to the version another process
+    activated or rolled back to, so searches and the event loop never wait for the lock.
+    """
+
+    MANIFEST_FILE_NAME = "index_versions.json"
+    LOCK_FILE_NAME = "index_versions.lock"
+    VERSIONS_DIRECTORY = "versions"
+
+    def __init__(self, persist_directory: str = None, backend: str = None):
+        """Initialize the vector store on the configured backend"""
+        self.logger = get_logger("vector_store")
+
+        backend = backend or VECTOR_STORE_BACKEND
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown vector store backend: {backend}")
+
+        # Use environment variable or default path
+        if persist_directory is None:
+            persist_directory = DEFAULT_PERSIST_DIRECTORIES[backend]
+            _warn_if_other_backend_has_data(self.logger, backend, persist_directory)
+
+        # Convert to absolute path for clarity
+        persist_directory = os.path.abspath(persist_directory)
+
+        # Create directory if it doesn't exist
+        os.makedirs(persist_directory, exist_ok=True)
+
+        log_event(
+            self.logger,
+            "vector_store_path",
+            "Vector store path initialized",
+            path=persist_directory,
+            backend=backend
+        )
+
+        self.persist_directory = persist_directory
+        self.backend_name = backend
+        self._manifest_path = os.path.join(persist_directory, self.MANIFEST_FILE_NAME)
+        self._lock_path = os.path.join(persist_directory, self.LOCK_FILE_NAME)
+        self._versions_lock = threading.Lock()
+        self._manifest_stamp: Optional[Tuple[int, int, int]] = None
+        self._closed = threading.Event()
+
+        # Bumped on every write and version switch so caches derived from the collection can detect changes
+        self._version = 0
+
+        # Opened versions by name; queries read self._active once, so a swap never splits a search
+        self._versions: Dict[str, IndexVersion] = {}
+        self._active: Optional[IndexVersion] = None
+        with self._manifest_locked():
+            self._remove_abandoned_versions()
+
+        # Bounded pool for running blocking searches off the event loop
+        self._search_executor = ThreadPoolExecutor(
+            max_workers=VECTOR_SEARCH_MAX_WORKERS,
+            thread_name_prefix="vector_search"
+        )
+        self._manifest_watcher = threading.Thread(
+            target=self._watch_manifest,
+            name="index_manifest_watcher",
+            daemon=True
+        )
+        self._manifest_watcher.start()
+
+        collection_size = self.backend.count()
+        for source, count in self.source_counts.snapshot().items():
+            metrics_recorder.update_vector_store_size(source, count)
+        log_event(
+            self.logger,
+            "vector_store_initialized",
+            "Vector store initialized",
+            collection_size=collection_size,
+            persist_directory=persist_directory,
+            backend=backend,
+            index_version=self._active.name
+        )
+        self.collect_garbage()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def backend(self) -> VectorBackend:
+        return self._active.backend
+
+    @property
+    def source_counts(self) -> SourceCounts:
+        return self._active.source_counts
+
+    @property
+    def lexical_index(self) -> BM25Index:
+        return self._active.lexical_index
+
+    @property
+    def active_version(self) -> str:
+        return self._active.name
+
+    def diff_documents(self, documents: List[Document], full: bool = False, complete: bool = True) -> Dict[str, Any]:
+        """Diff loaded chunks against the active version (see IndexVersion.diff_documents)"""
+        return self._active.diff_documents(documents, full=full, complete=complete)
+
+    def add_documents(self, documents: List[Document], embeddings: List[List[float]], ids: List[str] = None):
+        """Add documents and their embeddings to the active version"""
+        self._active.add_documents(documents, embeddings, ids=ids)
+        self._version += 1
+
+    def update_metadata(self, ids: List[str], documents: List[Document]):
+        """Update stored metadata of unchanged chunks in the active version"""
+        self._active.update_metadata(ids, documents)
+        self._version += 1
+
+    def delete_documents(self, ids: List[str]):
+        """Delete chunks by ID from the active version"""
+        self._active.delete_documents(ids)
+        self._version += 1
+
+    def create_version(self) -> IndexVersion:
+        """Create a new, not yet serving version holding a copy of the active one.
+
+        Replaces any unfinished version. Writes to the active version made while the new one
+        is being built are not carried over.
+        """
+        with self._manifest_locked():
+            if self._manifest["building"] is not None:
+                self._drop_version_locked(self._manifest["building"]["name"])
+            name = f"v{self._manifest['next_version']}"
+            self._manifest["next_version"] += 1
+            source = self._active
+            self._manifest["building"] = {"name": name, "base": source.name}
+            self._save_manifest_locked()
+
+        directory = self._version_directory(name)
+        os.makedirs(directory, exist_ok=True)
+        backend = BACKENDS[self.backend_name](directory)
+        for ids, texts, embeddings, metadatas in source.backend.iter_records(_COPY_BATCH_SIZE):
+            backend.upsert(ids, texts, embeddings, metadatas)
+
+        index = IndexVersion(name, directory, backend, self.logger)
+        with self._versions_lock:
+            self._versions[name] = index
+        log_event(
+            self.logger,
+            "index_version_created",
+            "Index version created from the active version",
+            index_version=name,
+            copied_from=source.name,
+            documents_copied=backend.count()
+        )
+        return index
+
+    def resume_version(self) -> Optional[IndexVersion]:
+        """The unfinished version left by a failed build, if it was copied from the active version.
+
+        One copied from a version that is no longer active (e.g. after a rollback) is deleted.
+        """
+        with self._manifest_locked():
+            building = self._manifest["building"]
+            if building is None:
+                return None
+            if building["base"] != self._manifest["active"]:
+                self._drop_version_locked(building["name"])
+                self._manifest["building"] = None
+                self._save_manifest_locked()
+                log_event(self.logger, "index_version_discarded", "Outdated unfinished index version deleted",
+                          index_version=building["name"])
+                return None
+            return self._versions.get(building["name"]) or self._open_version(building["name"])
+
+    def activate(self, index: IndexVersion):
+        """Warm a version up and switch queries to it; the version it replaces is kept for rollback"""
+        index.lexical_index.save()
+        index.warm_up()
+        with self._manifest_locked():
+            replaced = self._active
+            retired = self._manifest["previous"]
+            if retired is not None and retired != index.name:
+                self._manifest["retired"][retired] = time.time()
+            self._manifest["active"] = index.name
+            self._manifest["previous"] = replaced.name
+            self._manifest["retired"].pop(index.name, None)
+            self._manifest["building"] = None
+            self._save_manifest_locked()
+            self._switch_locked(index)
+
+        log_event(
+            self.logger,
+            "index_version_activated",
+            "Queries switched to a new index version",
+            index_version=index.name,
+            previous_version=replaced.name,
+            collection_size=index.backend.count()
+        )
+        self.collect_garbage()
+
+    def rollback(self) -> Dict[str, Any]:
+        """Switch queries back to the previous version (calling it again rolls forward)"""
+        with self._manifest_locked():
+            previous = self._manifest["previous"]
+            if previous is None:
+                raise ValueError("No previous index version to roll back to")
+            index = self._versions.get(previous) or self._open_version(previous)
+            index.warm_up()
+            replaced = self._active
+            self._manifest["active"] = previous
+            self._manifest["previous"] = replaced.name
+            self._save_manifest_locked()
+            self._switch_locked(index)
+
+        log_event(
+            self.logger,
+            "index_version_rolled_back",
+            "Queries switched back to the previous index version",
+            index_version=index.name,
+            previous_version=replaced.name
+        )
+        return self.versions()
+
+    def discard(self, index: IndexVersion):
+        """Delete a version that was never activated (e.g. after a failed rebuild)"""
+        with self._manifest_locked():
+            if index.name in (self._manifest["active"], self._manifest["previous"]):
+                raise ValueError(f"Index version {index.name} is in use")
+            self._drop_version_locked(index.name)
+            self._manifest["building"] = None
+            self._save_manifest_locked()
+        log_event(self.logger, "index_version_discarded", "Index version discarded", index_version=index.name)
+
+    def collect_garbage(self, now: Optional[float] = None) -> List[str]:
+        """Delete retired versions whose grace period has passed; returns their names"""
+        now = time.time() if now is None else now
+        with self._manifest_locked():
+            expired = [
+                name for name, retired_at in self._manifest["retired"].items()
+                if now - retired_at >= INDEX_VERSION_GRACE_SECONDS
+            ]
+            for name in expired:
+                self._drop_version_locked(name)
+                del self._manifest["retired"][name]
+            if expired:
+                self._save_manifest_locked()
+
+        if expired:
+            log_event(self.logger, "index_versions_collected", "Retired index versions deleted", index_versions=expired)
+        return expired
+
+    def versions(self) -> Dict[str, Any]:
+        """The active and previous version names and the retired versions with their retirement time"""
+        with self._manifest_locked():
+            return {
+                "active": self._manifest["active"],
+                "previous": self._manifest["previous"],
+                "retired": dict(self._manifest["retired"])
+            }
+
+    @observe(name="similarity_search")
+    def similarity_search(self, query_embedding: List[float], k: int = 5, sources: Optional[List[str]] = None,
+                          max_distance: Optional[float] = None, query_text: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Search for similar documents, optionally only within the given sources and up to max_distance.
+
+        With query_text the vector ranking is fused with a BM25 ranking of the same text.
+        """
+        index = self._active
+        try:
+            if query_text is None:
+                results = index.backend.query(query_embedding, k, sources=sources)
+                formatted_results = _within_distance(results, max_distance)
+            else:
+                candidates = index.backend.query(query_embedding, k * HYBRID_CANDIDATES_PER_RESULT, sources=sources)
+                formatted_results = self._fuse_with_lexical(
+                    index, _within_distance(candidates, max_distance), query_text, k, sources
+                )
 
             # Record metrics
             metrics_recorder.record_vector_store_operation("search", success=True)
-            
+
             return formatted_results
-        
+
         except Exception as e:
             metrics_recorder.record_vector_store_operation("search", success=False)
             metrics_recorder.record_error(
@@ -127,20 +658,233 @@ class VectorStore:
             )
             raise
 
+    async def asimilarity_search(self, query_embedding: List[float], k: int = 5, sources: Optional[List[str]] = None,
+                                 max_distance: Optional[float] = None,
+                                 query_text: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Search for similar documents on the bounded search executor"""
+        loop = asyncio.get_running_loop()
+        # Copy the context so the search span stays attached to the current trace
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self._search_executor,
+            partial(context.run, self.similarity_search, query_embedding, k=k, sources=sources,
+                    max_distance=max_distance, query_text=query_text)
+        )
+
+    @observe(name="similarity_search_batch")
+    def similarity_search_batch(self, query_embeddings: List[List[float]], k: int = 5,
+                                sources: Optional[List[str]] = None,
+                                max_distance: Optional[float] = None,
+                                query_texts: Optional[List[str]] = None) -> List[List[Dict[str, Any]]]:
+        """Search for similar documents for many queries in one vectorized call"""
+        if not query_embeddings:
+            return []
+        index = self._active
+        try:
+            if query_texts is None:
+                batch_results = [
+                    _within_distance(results, max_distance)
+                    for results in index.backend.query_batch(query_embeddings, k, sources=sources)
+                ]
+            else:
+                batch_candidates = index.backend.query_batch(
+                    query_embeddings, k * HYBRID_CANDIDATES_PER_RESULT, sources=sources
+                )
+                batch_results = [
+                    self._fuse_with_lexical(index, _within_distance(candidates, max_distance), query_text, k, sources)
+                    for candidates, query_text in zip(batch_candidates, query_texts)
+                ]
+
+            # Record metrics
+            metrics_recorder.record_vector_store_operation("search_batch", success=True)
+
+            return batch_results
+
+        except Exception as e:
+            metrics_recorder.record_vector_store_operation("search_batch", success=False)
+            metrics_recorder.record_error(
+                error_type=type(e).__name__,
+                operation="vector_store_search_batch"
+            )
+            raise
+
+    async def asimilarity_search_batch(self, query_embeddings: List[List[float]], k: int = 5,
+                                       sources: Optional[List[str]] = None,
+                                       max_distance: Optional[float] = None,
+                                       query_texts: Optional[List[str]] = None) -> List[List[Dict[str, Any]]]:
+        """Batched similarity search on the bounded search executor"""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self._search_executor,
+            partial(context.run, self.similarity_search_batch, query_embeddings, k=k, sources=sources,
+                    max_distance=max_distance, query_texts=query_texts)
+        )
+
+    def lexical_search(self, query_text: str, k: int = 5, sources: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """BM25 keyword search; results carry a score instead of a distance"""
+        index = self._active
+        hits = index.lexical_index.search(query_text, k, sources=sources)
+        documents = index.backend.get_documents([doc_id for doc_id, _ in hits])
+        return [
+            {'id': doc_id, 'text': documents[doc_id][0], 'metadata': documents[doc_id][1], 'score': score}
+            for doc_id, score in hits
+            if doc_id in documents
+        ]
+
+    def _fuse_with_lexical(self, index: IndexVersion, vector_results: List[Dict[str, Any]], query_text: str, k: int,
+                           sources: Optional[List[str]]) -> List[Dict[str, Any]]:
+        """Reciprocal rank fusion of vector candidates with BM25 hits, top k.
+
+        Chunks found only lexically have no distance (None) and are not subject to max_distance.
+        """
+        lexical_hits = index.lexical_index.search(query_text, k * HYBRID_CANDIDATES_PER_RESULT, sources=sources)
+        ranked = reciprocal_rank_fusion([
+            [result['id'] for result in vector_results],
+            [doc_id for doc_id, _ in lexical_hits]
+        ])[:k]
+
+        by_id = {result['id']: result for result in vector_results}
+        missing = [doc_id for doc_id in ranked if doc_id not in by_id]
+        for doc_id, (text, metadata) in index.backend.get_documents(missing).items():
+            by_id[doc_id] = {'id': doc_id, 'text': text, 'metadata': metadata, 'distance': None}
+        return [by_id[doc_id] for doc_id in ranked if doc_id in by_id]
+
     def get_collection_stats(self) -> Dict[str, Any]:
-        """Get statistics about the collection"""
-        count = self.collection.count()
+        """Get statistics about the active version from the incrementally maintained counts"""
+        return self._active.get_collection_stats()
 
-        # Get some sample documents to analyze sources
-        sample_results = self.collection.get(limit=count, include=["metadatas"])
-        sources = {}
+    def refresh(self):
+        """Switch to the version another process activated or rolled back to, if the manifest changed"""
+        stamp = self._read_manifest_stamp()
+        if stamp is not None and stamp != self._manifest_stamp:
+            with self._manifest_locked():
+                pass
 
-        if sample_results['metadatas']:
-            for metadata in sample_results['metadatas']:
-                source = metadata.get('source', 'unknown')
-                sources[source] = sources.get(source, 0) + 1
+    def close(self):
+        """Stop following the manifest"""
+        self._closed.set()
+        self._manifest_watcher.join()
 
-        return {
-            'total_documents': count,
-            'sources': sources
-        }
+    def _watch_manifest(self):
+        while not self._closed.wait(INDEX_MANIFEST_CHECK_SECONDS):
+            try:
+                self.refresh()
+            except Exception as e:
+                log_error(self.logger, e, {"operation": "refresh_index_manifest"})
+
+    @contextmanager
+    def _manifest_locked(self) -> Iterator[None]:
+        """Hold the manifest exclusively (across threads and processes), re-read and in effect"""
+        with self._versions_lock, open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self._manifest = self._load_manifest()
+            self._manifest_stamp = self._read_manifest_stamp()
+            self._sync_active_locked()
+            yield
+
+    def _sync_active_locked(self):
+        """Serve the version the manifest names as active, and forget versions it no longer refers to"""
+        name = self._manifest["active"]
+        if self._active is None:
+            self._active = self._versions.get(name) or self._open_version(name)
+            self._active.live = True
+        elif self._active.name != name:
+            index = self._versions.get(name) or self._open_version(name)
+            index.warm_up()
+            replaced = self._active
+            self._switch_locked(index)
+            log_event(
+                self.logger,
+                "index_version_switched",
+                "Queries switched to the index version activated by another process",
+                index_version=name,
+                previous_version=replaced.name
+            )
+
+        # Versions deleted by another process; searches still holding one finish on their own
+        for stale in set(self._versions) - self._known_versions_locked():
+            del self._versions[stale]
+
+    def _known_versions_locked(self) -> set:
+        known = {self._manifest["active"], self._manifest["previous"], *self._manifest["retired"]}
+        if self._manifest["building"] is not None:
+            known.add(self._manifest["building"]["name"])
+        return known
+
+    def _read_manifest_stamp(self) -> Optional[Tuple[int, int, int]]:
+        # The manifest is replaced, never rewritten in place, so a new inode means a new manifest
+        try:
+            stat = os.stat(self._manifest_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _version_directory(self, name: str) -> str:
+        if name == INITIAL_VERSION:
+            return self.persist_directory
+        return os.path.join(self.persist_directory, self.VERSIONS_DIRECTORY, name)
+
+    def _open_version(self, name: str) -> IndexVersion:
+        directory = self._version_directory(name)
+        os.makedirs(directory, exist_ok=True)
+        index = IndexVersion(name, directory, BACKENDS[self.backend_name](directory), self.logger)
+        self._versions[name] = index
+        return index
+
+    def _switch_locked(self, index: IndexVersion):
+        """Make index the serving version and publish its per-source sizes"""
+        replaced = self._active
+        replaced.live = False
+        index.live = True
+        self._active = index
+        self._version += 1
+
+        sources = index.source_counts.snapshot()
+        for source in replaced.source_counts.snapshot():
+            if source not in sources:
+                metrics_recorder.update_vector_store_size(source, 0)
+        for source, count in sources.items():
+            metrics_recorder.update_vector_store_size(source, count)
+
+    def _drop_version_locked(self, name: str):
+        """Delete a version's backend data and side files (and its directory, unless it is the root)"""
+        directory = self._version_directory(name)
+        index = self._versions.pop(name, None)
+        if os.path.isdir(directory):
+            backend = index.backend if index is not None else BACKENDS[self.backend_name](directory)
+            backend.drop()
+            for file_name in (SourceCounts.FILE_NAME, BM25Index.FILE_NAME):
+                path = os.path.join(directory, file_name)
+                if os.path.exists(path):
+                    os.remove(path)
+        if directory != self.persist_directory:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def _remove_abandoned_versions(self):
+        """Delete version directories no manifest entry refers to (a crash before the manifest was saved)"""
+        versions_directory = os.path.join(self.persist_directory, self.VERSIONS_DIRECTORY)
+        if not os.path.isdir(versions_directory):
+            return
+        known = self._known_versions_locked()
+        for name in os.listdir(versions_directory):
+            if name not in known:
+                shutil.rmtree(os.path.join(versions_directory, name), ignore_errors=True)
+                log_event(self.logger, "index_version_abandoned", "Unfinished index version deleted",
+                          index_version=name)
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self._manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            manifest.setdefault("building", None)
+            return manifest
+        except FileNotFoundError:
+            return {"active": INITIAL_VERSION, "previous": None, "retired": {}, "building": None, "next_version": 2}
+
+    def _save_manifest_locked(self):
+        tmp_path = f"{self._manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._manifest, f)
+        os.replace(tmp_path, self._manifest_path)
+        self._manifest_stamp = self._read_manifest_stamp()
@@ -44,14 +44,22 @@ def test_ingest_endpoint_e2e():
     
     start_time = time.time()
     response = requests.post(f"{base_url}/ingest")
-    end_time = time.time()
-    
     print(f"Status Code: {response.status_code}")
+    assert response.status_code == 202, f"Ingestion failed to start: {response.text}"
+
+    # Ingestion runs as a background job; poll its status until it finishes
+    job = response.json()
+    while job["status"] in ("queued", "running") and time.time() - start_time < 900:
+        time.sleep(2)
+        job = requests.get(f"{base_url}/ingest/{job['job_id']}").json()
+        print(f"  {job['phase']}: {job['chunks_fetched']} fetched, {job['chunks_embedded']} embedded, "
+              f"{job['chunks_stored']} stored, ETA {job['eta_seconds']}")
+    end_time = time.time()
     print(f"Ingestion Time: {end_time - start_time:.2f} seconds")
     
     ingestion_result = None
-    if response.status_code == 200:
-        ingestion_result = response.json()
+    if job["status"] == "succeeded":
+        ingestion_result = job["result"]
         print("Ingestion successful!")
         print(f"  Status: {ingestion_result['status']}")
         print(f"  Message: {ingestion_result['message']}")
@@ -60,8 +68,8 @@ def test_ingest_endpoint_e2e():
         for source, count in ingestion_result['sources'].items():
             print(f"    - {source}: {count} chunks")
     else:
-        print(f"Ingestion failed: {response.text}")
-        assert False, f"Ingestion failed with status {response.status_code}: {response.text}"
+        print(f"Ingestion failed: {job['error']}")
+        assert False, f"Ingestion job ended with status {job['status']}: {job['error']}"
     
     # Step 4: Verify documents are in vector store
     print("\n4. Verifying documents in vector store...")
@@ -0,0 +1,70 @@
+import time
+from app.services.answer_cache import AnswerCache
+
+
+def _result(answer):
+    return {"answer": answer, "sources": [], "cached": False}
+
+
+class TestAnswerCache:
+
+    def test_near_duplicate_question_hits(self):
+        """Test a query embedding above the similarity threshold returns the cached answer"""
+        cache = AnswerCache(similarity_threshold=0.95, ttl_seconds=60, max_entries=10)
+        cache.store([1.0, 0.0, 0.0], k=5, version=1, result=_result("79 characters"), duration_seconds=2.0)
+
+        entry = cache.lookup([0.99, 0.05, 0.0], k=5, version=1)
+
+        assert entry["result"]["answer"] == "79 characters"
+        assert entry["duration_seconds"] == 2.0
+        assert entry["similarity"] > 0.95
+
+    def test_dissimilar_question_misses(self):
+        """Test a query embedding below the threshold is not served from cache"""
+        cache = AnswerCache(similarity_threshold=0.95, ttl_seconds=60, max_entries=10)
+        cache.store([1.0, 0.0, 0.0], k=5, version=1, result=_result("a"), duration_seconds=1.0)
+
+        assert cache.lookup([0.0, 1.0, 0.0], k=5, version=1) is None
+
+    def test_different_k_misses(self):
+        """Test answers are only reused for the same number of retrieved chunks"""
+        cache = AnswerCache(similarity_threshold=0.95, ttl_seconds=60, max_entries=10)
+        cache.store([1.0, 0.0], k=5, version=1, result=_result("a"), duration_seconds=1.0)
+
+        assert cache.lookup([1.0, 0.0], k=3, version=1) is None
+
+    def test_index_version_change_invalidates(self):
+        """Test entries computed against an older index version are dropped"""
+        cache = AnswerCache(similarity_threshold=0.95, ttl_seconds=60, max_entries=10)
+        cache.store([1.0, 0.0], k=5, version=1, result=_result("a"), duration_seconds=1.0)
+
+        assert cache.lookup([1.0, 0.0], k=5, version=2) is None
+        assert len(cache) == 0
+
+    def test_ttl_expiry(self):
+        """Test entries older than the TTL are not returned"""
+        cache = AnswerCache(similarity_threshold=0.95, ttl_seconds=0.01, max_entries=10)
+        cache.store([1.0, 0.0], k=5, version=1, result=_result("a"), duration_seconds=1.0)
+        time.sleep(0.02)
+
+        assert cache.lookup([1.0, 0.0], k=5, version=1) is None
+
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted beyond max_entries"""
+        cache = AnswerCache(similarity_threshold=0.99, ttl_seconds=60, max_entries=2)
+        cache.store([1.0, 0.0, 0.0], k=5, version=1, result=_result("x"), duration_seconds=1.0)
+        cache.store([0.0, 1.0, 0.0], k=5, version=1, result=_result("y"), duration_seconds=1.0)
+        cache.lookup([1.0, 0.0, 0.0], k=5, version=1)  # "x" becomes most recently used
+        cache.store([0.0, 0.0, 1.0], k=5, version=1, result=_result("z"), duration_seconds=1.0)
+
+        assert cache.lookup([0.0, 1.0, 0.0], k=5, version=1) is None
+        assert cache.lookup([1.0, 0.0, 0.0], k=5, version=1)["result"]["answer"] == "x"
+        assert len(cache) == 2
+
+    def test_scope_must_match(self):
+        """Test an answer computed with retrieval filters only serves the same filters"""
+        cache = AnswerCache(similarity_threshold=0.9, ttl_seconds=60, max_entries=10)
+        cache.store([1.0, 0.0], k=5, version=1, result=_result("a"), duration_seconds=1.0, scope=(("PEP 8",), None))
+
+        assert cache.lookup([1.0, 0.0], k=5, version=1) is None
+        assert cache.lookup([1.0, 0.0], k=5, version=1, scope=(("PEP 8",), None)) is not None
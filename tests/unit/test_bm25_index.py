@@ -0,0 +1,48 @@
+from app.services.bm25_index import BM25Index, tokenize
+
+
+class TestBM25Index:
+    def test_tokenize_splits_identifiers(self):
+        """Test identifiers keep their exact form and also yield their words"""
+        assert tokenize("Call __init__ on My_Class!") == ["call", "__init__", "init", "on", "my_class", "my", "class"]
+
+    def test_search_ranks_rare_terms_higher(self, tmp_path):
+        """Test chunks matching the rarer query term rank first"""
+        index = BM25Index(str(tmp_path / BM25Index.FILE_NAME))
+        index.add(
+            ["a", "b", "c"],
+            ["lines should be short", "E501 means the line is too long", "blank lines separate functions"],
+            ["PEP 8", "PEP 8", "Think Python"]
+        )
+
+        results = index.search("E501 lines", k=3)
+
+        assert [doc_id for doc_id, _ in results] == ["b", "a", "c"]
+        assert results[0][1] > results[1][1]
+        assert [doc_id for doc_id, _ in index.search("lines", k=3, sources=["Think Python"])] == ["c"]
+        assert index.search("unknown words", k=3) == []
+
+    def test_add_replaces_and_remove_forgets(self, tmp_path):
+        """Test re-adding an ID replaces its terms and removed IDs no longer match"""
+        index = BM25Index(str(tmp_path / BM25Index.FILE_NAME))
+        index.add(["a", "b"], ["snake_case names", "CamelCase names"], ["PEP 8", "PEP 8"])
+        index.add(["a"], ["lowercase names"], ["PEP 8"])
+        index.remove(["b"])
+
+        assert len(index) == 1
+        assert index.search("snake", k=5) == []
+        assert [doc_id for doc_id, _ in index.search("names", k=5)] == ["a"]
+
+    def test_save_and_load(self, tmp_path):
+        """Test a saved index loads with the same results and a missing file loads as None"""
+        path = str(tmp_path / BM25Index.FILE_NAME)
+        index = BM25Index(path)
+        index.add(["a", "b"], ["def __init__(self)", "return values"], ["Think Python", "Think Python"])
+        index.update_sources(["b"], ["PEP 8"])
+        index.save()
+
+        loaded = BM25Index.load(path)
+
+        assert loaded.search("__init__ return", k=5) == index.search("__init__ return", k=5)
+        assert loaded.search("return", k=5, sources=["PEP 8"]) == index.search("return", k=5, sources=["PEP 8"])
+        assert BM25Index.load(str(tmp_path / "missing.json")) is None
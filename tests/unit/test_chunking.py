@@ -0,0 +1,57 @@
+import types
+import pytest
+from unittest.mock import patch
+from app.services.chunking import Chunker, iter_chunk_documents
+from app.services.token_counter import get_token_counter
+
+_TEXT = "\n\n".join(
+    f"Paragraph {i}. A variable is a name that refers to a value, and assignment binds it. " * 3
+    for i in range(60)
+)
+
+
+class TestChunker:
+    def test_character_chunks_keep_the_existing_settings(self):
+        """Test the default character splitter keeps its cache key and size limit"""
+        chunker = Chunker("characters")
+
+        chunks = chunker.split(_TEXT)
+
+        assert chunker.settings == "characters:1000:200"
+        assert len(chunks) > 1
+        assert all(len(chunk) <= 1000 for chunk in chunks)
+
+    def test_token_chunks_fit_the_token_size(self):
+        """Test token chunks are measured with the token counter"""
+        chunker = Chunker("tokens", chunk_size=64, chunk_overlap=8)
+        token_counter = get_token_counter()
+
+        chunks = chunker.split(_TEXT)
+
+        assert chunker.settings.startswith("tokens:")
+        assert chunker.settings.endswith(":64:8")
+        assert len(chunks) > 1
+        assert all(token_counter.count(chunk) <= 64 for chunk in chunks)
+
+    def test_process_pool_gives_the_same_chunks(self):
+        """Test splitting on the process pool matches splitting in-process"""
+        chunker = Chunker("characters", chunk_size=300, chunk_overlap=50)
+        expected = chunker.splitter.split_text(_TEXT)
+
+        with patch("app.services.chunking.CHUNKING_PROCESSES", 1), \
+                patch("app.services.chunking.CHUNKING_POOL_MIN_CHARS", 0):
+            assert chunker.split(_TEXT) == expected
+
+    def test_iter_chunk_documents_is_lazy(self):
+        """Test documents are generated one by one with position metadata"""
+        documents = iter_chunk_documents(["one", "two"], "PEP 8")
+
+        assert isinstance(documents, types.GeneratorType)
+        assert [(doc.page_content, doc.metadata) for doc in documents] == [
+            ("one", {"source": "PEP 8", "chunk_id": 0, "total_chunks": 2}),
+            ("two", {"source": "PEP 8", "chunk_id": 1, "total_chunks": 2}),
+        ]
+
+    def test_unknown_unit(self):
+        with pytest.raises(ValueError, match="Unknown chunk length unit"):
+            Chunker("words")
@@ -0,0 +1,77 @@
+from app.services.context_assembly import assemble_context
+from app.services.token_counter import TokenCounter
+
+
+class WordCounter:
+    """One token per whitespace-separated word"""
+
+    def count(self, text):
+        return len(text.split())
+
+    def truncate(self, text, max_tokens):
+        return " ".join(text.split()[:max(max_tokens, 0)])
+
+
+def _result(text, source="Think Python", chunk_id=None):
+    metadata = {"source": source}
+    if chunk_id is not None:
+        metadata["chunk_id"] = chunk_id
+    return {"text": text, "metadata": metadata, "distance": 0.5}
+
+
+class TestContextAssembly:
+    def test_adjacent_chunks_are_merged_without_overlap(self):
+        """Test consecutive chunks of one source become one passage with the repeated span removed"""
+        first = "A variable is a name that refers to a value stored somewhere in memory."
+        second = "refers to a value stored somewhere in memory. Assignment binds the name."
+        results = [_result(second, chunk_id=4), _result("PEP 8 prefers spaces.", source="PEP 8", chunk_id=4),
+                   _result(first, chunk_id=3)]
+
+        passages, tokens, saved = assemble_context(results, token_budget=1000, token_counter=WordCounter())
+
+        assert passages == [
+            "A variable is a name that refers to a value stored somewhere in memory. Assignment binds the name.",
+            "PEP 8 prefers spaces."
+        ]
+        assert tokens == 18 + 4
+        assert saved == 8
+
+    def test_duplicates_and_chunks_without_position(self):
+        """Test duplicate chunks are sent once and chunks without chunk_id are never merged"""
+        results = [_result("one two", chunk_id=1), _result("one two", chunk_id=1),
+                   _result("three four"), _result("three four")]
+
+        passages, _, saved = assemble_context(results, token_budget=1000, token_counter=WordCounter())
+
+        assert passages == ["one two", "three four", "three four"]
+        assert saved == 2
+
+    def test_non_overlapping_neighbours_are_joined(self):
+        """Test neighbours that share no text are kept whole on separate lines"""
+        results = [_result("first chunk of the chapter", chunk_id=0), _result("second chunk", chunk_id=1)]
+
+        passages, _, _ = assemble_context(results, token_budget=1000, token_counter=WordCounter())
+
+        assert passages == ["first chunk of the chapter\nsecond chunk"]
+
+    def test_token_budget_truncates_in_rank_order(self):
+        """Test passages are added best first and the one crossing the budget is cut"""
+        results = [_result("a b c d", source="PEP 8", chunk_id=1), _result("e f g h", chunk_id=7),
+                   _result("i j", chunk_id=20)]
+
+        passages, tokens, saved = assemble_context(results, token_budget=6, token_counter=WordCounter())
+
+        assert passages == ["a b c d", "e f"]
+        assert tokens == 6
+        assert saved == 4
+
+    def test_empty_results(self):
+        assert assemble_context([], token_counter=WordCounter()) == ([], 0, 0)
+
+    def test_token_counter_estimates_without_encoding(self):
+        """Test an unavailable encoding falls back to a character-based estimate"""
+        counter = TokenCounter("no-such-encoding")
+
+        assert counter.exact is False
+        assert counter.count("x" * 10) == 3
+        assert counter.truncate("x" * 10, 2) == "x" * 8
@@ -1,5 +1,6 @@
-from unittest.mock import patch
-from app.services.document_service import DocumentService
+from unittest.mock import Mock, patch
+from app.services.document_service import DocumentService, load_think_python, _fetch_page
+from app.services.source_cache import SourceCache
 
 
 class TestDocumentService:
@@ -20,10 +21,10 @@ class TestDocumentService:
     @patch('app.services.document_service.load_pep8')
     def test_load_all_documents_with_pep8(self, mock_load_pep8):
         """Test load_all_documents with mocked PEP 8 content"""
-        mock_load_pep8.return_value = "Sample PEP 8 content for testing"
+        mock_load_pep8.return_value = ("Sample PEP 8 content for testing", True)
         
         with patch('app.services.document_service.load_think_python') as mock_think_python:
-            mock_think_python.return_value = "Sample Think Python content"
+            mock_think_python.return_value = ("Sample Think Python content", True)
             
             doc_service = DocumentService()
             documents = doc_service.load_all_documents()
@@ -31,3 +32,66 @@ class TestDocumentService:
             assert len(documents) > 0
             assert any("Think Python" in doc.metadata["source"] for doc in documents)
             assert any("PEP 8" in doc.metadata["source"] for doc in documents)
+
+    @patch('app.services.document_service._fetch_page')
+    def test_load_think_python_isolates_chapter_errors(self, mock_fetch):
+        """Test concurrent chapter fetching keeps book order, skips failed chapters and reports them"""
+        def fake_fetch(url, page, extract):
+            if url.endswith("chap02.html"):
+                raise ConnectionError("chapter unavailable")
+            return extract(f"<html><body><main>Text of {page}</main></body></html>".encode())
+
+        mock_fetch.side_effect = fake_fetch
+
+        content, complete = load_think_python()
+
+        assert mock_fetch.call_count == 19
+        assert complete is False
+        assert "chap02.html" not in content
+        assert content.index("Text of chap01.html") < content.index("Text of chap03.html") < content.index("Text of chap19.html")
+
+
+class TestSourceCache:
+
+    def _response(self, status_code, content=b"", headers=None):
+        response = Mock()
+        response.status_code = status_code
+        response.content = content
+        response.headers = headers or {}
+        return response
+
+    def test_conditional_get_skips_parsing_on_304(self, tmp_path):
+        """Test a 304 revalidation returns the cached text without re-extracting"""
+        cache = SourceCache(cache_dir=str(tmp_path))
+        session = Mock()
+        session.get.side_effect = [
+            self._response(200, b"<main>Chapter text</main>", {"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"}),
+            self._response(304),
+        ]
+        extract = Mock(return_value="Chapter text")
+
+        with patch('app.services.document_service._get_session', return_value=session), \
+                patch('app.services.document_service._get_source_cache', return_value=cache):
+            first = _fetch_page("http://example.test/chap01.html", "chap01.html", extract)
+            second = _fetch_page("http://example.test/chap01.html", "chap01.html", extract)
+
+        assert first == second == "Chapter text"
+        extract.assert_called_once()
+        revalidation_headers = session.get.call_args_list[1].kwargs["headers"]
+        assert revalidation_headers["If-None-Match"] == '"v1"'
+        assert revalidation_headers["If-Modified-Since"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+
+    def test_unchanged_source_reuses_cached_chunks(self, tmp_path):
+        """Test chunking is skipped when a source's text has not changed"""
+        cache = SourceCache(cache_dir=str(tmp_path))
+        doc_service = DocumentService()
+
+        with patch('app.services.document_service._get_source_cache', return_value=cache), \
+                patch.object(doc_service, 'chunk_text', wraps=doc_service.chunk_text) as chunk_text:
+            first = doc_service._chunk_source("B" * 1500, "test_source")
+            second = doc_service._chunk_source("B" * 1500, "test_source")
+            doc_service._chunk_source("C" * 1500, "test_source")
+
+        assert chunk_text.call_count == 2
+        assert [doc.page_content for doc in first] == [doc.page_content for doc in second]
+        assert [doc.metadata for doc in first] == [doc.metadata for doc in second]
@@ -0,0 +1,69 @@
+from unittest.mock import Mock
+from app.services.embedding_cache import EmbeddingCache, cache_key
+from app.services.embedding_service import EmbeddingService
+
+
+class TestEmbeddingCache:
+
+    def test_cache_key_depends_on_model_dimensions_and_text(self):
+        """Test the content address changes with every keyed field"""
+        base = cache_key("text-embedding-3-small", None, "hello")
+
+        assert base == cache_key("text-embedding-3-small", None, "hello")
+        assert base != cache_key("text-embedding-3-large", None, "hello")
+        assert base != cache_key("text-embedding-3-small", 512, "hello")
+        assert base != cache_key("text-embedding-3-small", None, "hello!")
+
+    def test_put_and_get_round_trip(self, tmp_path):
+        """Test embeddings survive a reopen of the cache file"""
+        path = str(tmp_path / "cache.sqlite3")
+        cache = EmbeddingCache(path=path)
+        cache.put_many({"a": [0.5, -0.25], "b": [1.0, 2.0]})
+        cache.close()
+
+        reopened = EmbeddingCache(path=path)
+        found = reopened.get_many(["a", "b", "missing"])
+
+        assert found == {"a": [0.5, -0.25], "b": [1.0, 2.0]}
+
+    def test_eviction_keeps_cache_within_limit(self, tmp_path):
+        """Test least recently used entries are evicted past max_entries"""
+        cache = EmbeddingCache(path=str(tmp_path / "cache.sqlite3"), max_entries=2)
+        cache.put_many({"old": [1.0]})
+        cache.put_many({"recent": [2.0]})
+        cache.get_many(["old"])  # touch "old" so "recent" becomes the LRU entry
+        cache.put_many({"new": [3.0]})
+
+        assert len(cache) == 2
+        assert set(cache.get_many(["old", "recent", "new"])) == {"old", "new"}
+
+
+class TestEmbeddingServiceCache:
+
+    def _service(self, tmp_path):
+        service = EmbeddingService(cache=EmbeddingCache(path=str(tmp_path / "cache.sqlite3")))
+        service.embeddings = Mock()
+        service.embeddings.model = "text-embedding-3-small"
+        service.embeddings.dimensions = None
+        service.embeddings.embed_documents.side_effect = lambda texts: [[float(len(t))] for t in texts]
+        return service
+
+    def test_reingest_makes_no_embedding_calls(self, tmp_path, sample_documents):
+        """Test unchanged documents are served entirely from the cache"""
+        service = self._service(tmp_path)
+
+        first = service.generate_embeddings(sample_documents)
+        second = service.generate_embeddings(sample_documents)
+
+        assert first == second
+        service.embeddings.embed_documents.assert_called_once()
+
+    def test_only_missing_texts_are_embedded(self, tmp_path, sample_documents, sample_document):
+        """Test a partially cached batch embeds just the new, deduplicated texts"""
+        service = self._service(tmp_path)
+        service.generate_embeddings(sample_documents)
+
+        embeddings = service.generate_embeddings(sample_documents + [sample_document, sample_document])
+
+        assert len(embeddings) == len(sample_documents) + 2
+        service.embeddings.embed_documents.assert_called_with([sample_document.page_content])
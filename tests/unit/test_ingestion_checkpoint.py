@@ -0,0 +1,101 @@
+import os
+import pytest
+from unittest.mock import Mock, patch
+from langchain_core.documents import Document
+from langchain_openai import OpenAIEmbeddings
+from app.core.logging_config import get_logger
+from app.services.embedding_service import EmbeddingService
+from app.services.ingestion_checkpoint import IngestionCheckpoint
+from app.services.rag_service import RAGService
+from app.services.vector_store import VectorStore
+from utils.fake_openai_server import FakeOpenAIServer
+
+# Chunks per source, fetched in this order; with batches of 2 that is 3 + 5 embedding requests
+SOURCES = {"PEP 8": 6, "Think Python": 10}
+
+
+def _document_service():
+    """Document service mock that honours skip_sources and records the sources it fetched"""
+    service = Mock()
+    service.fetched = []
+
+    def iter_source_documents(skip_sources=()):
+        for source, count in SOURCES.items():
+            if source in skip_sources:
+                continue
+            service.fetched.append(source)
+            yield source, [
+                Document(page_content=f"{source} chunk {i}",
+                         metadata={"source": source, "chunk_id": i, "total_chunks": count})
+                for i in range(count)
+            ], True
+
+    service.iter_source_documents.side_effect = iter_source_documents
+    return service
+
+
+class TestResumableIngestion:
+    @pytest.fixture
+    def server(self):
+        server = FakeOpenAIServer(latency_seconds=0.0).start()
+        yield server
+        server.stop()
+
+    @pytest.fixture
+    def rag_service(self, server, tmp_path):
+        with patch.object(RAGService, "__init__", return_value=None), \
+                patch("app.services.embedding_service.EMBEDDING_CACHE_ENABLED", False):
+            rag_service = RAGService()
+            rag_service.embedding_service = EmbeddingService()
+        rag_service.logger = get_logger("rag_service")
+        rag_service.document_service = _document_service()
+        # No client retries, so the injected fault fails the batch right away
+        rag_service.embedding_service.embeddings = OpenAIEmbeddings(
+            model="text-embedding-3-small", openai_api_key="sk-test", base_url=server.base_url,
+            max_retries=0, check_embedding_ctx_length=False
+        )
+        rag_service.vector_store = VectorStore(persist_directory=str(tmp_path / "numpy"), backend="numpy")
+        with patch("app.services.ingestion_pipeline.EMBEDDING_BATCH_SIZE", 2), \
+                patch("app.services.ingestion_pipeline.PIPELINE_QUEUE_SIZE", 1):
+            yield rag_service
+
+    @pytest.mark.parametrize("mode", ["incremental", "full"])
+    def test_retry_after_embedding_failure_redoes_only_the_remaining_work(self, rag_service, server, mode):
+        """Test a retry skips the completed source and the stored batches of the interrupted one"""
+        server.fail_after = 5
+        with pytest.raises(Exception):
+            rag_service.ingest_documents(mode=mode)
+        unfinished = rag_service.vector_store.resume_version()
+        checkpoint = IngestionCheckpoint.load(unfinished.directory)
+
+        server.fail_after = None
+        embedded_before_retry = server.embedded_texts
+        rag_service.document_service.fetched.clear()
+        result = rag_service.ingest_documents(mode=mode)
+
+        # PEP 8 and the first two Think Python batches were stored before the failure
+        assert checkpoint.completed_sources() == {"PEP 8": 6}
+        assert len(checkpoint.stored_ids("Think Python")) == 4
+        assert rag_service.document_service.fetched == ["Think Python"]
+        assert server.embedded_texts - embedded_before_retry == 6
+        assert (result["added"], result["resumed"], result["total_documents"]) == (6, 10, 16)
+        assert result["index_version"] == unfinished.name
+        assert rag_service.vector_store.get_collection_stats()["sources"] == SOURCES
+        assert not os.path.exists(checkpoint.path)
+
+    def test_retry_in_another_mode_starts_over(self, rag_service, server):
+        """Test a checkpoint is only resumed by an ingestion in the same mode"""
+        server.fail_after = 5
+        with pytest.raises(Exception):
+            rag_service.ingest_documents(mode="full")
+
+        unfinished = rag_service.vector_store.resume_version()
+
+        server.fail_after = None
+        embedded_before_retry = server.embedded_texts
+        result = rag_service.ingest_documents(mode="incremental")
+
+        assert server.embedded_texts - embedded_before_retry == 16
+        assert (result["added"], result["resumed"]) == (16, 0)
+        assert result["index_version"] != unfinished.name
+        assert not os.path.exists(unfinished.directory)
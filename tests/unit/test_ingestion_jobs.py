@@ -0,0 +1,157 @@
+import json
+import threading
+import time
+from unittest.mock import Mock
+import pytest
+from app.services.ingestion_jobs import IngestionJobConflict, IngestionJobs
+
+
+def _wait_until_finished(job, timeout=5.0):
+    deadline = time.time() + timeout
+    while not job.finished and time.time() < deadline:
+        time.sleep(0.01)
+    assert job.finished
+
+
+class TestIngestionJobs:
+    def test_concurrent_starts_join_the_running_job(self):
+        """Test a second start while a job runs returns that job instead of starting another"""
+        release = threading.Event()
+        calls = []
+
+        def ingest(mode, job):
+            calls.append(mode)
+            release.wait(5)
+            return {"status": "success", "added": 3}
+
+        jobs = IngestionJobs(ingest)
+        first, first_created = jobs.start("incremental")
+        second, second_created = jobs.start("incremental")
+        release.set()
+        _wait_until_finished(first)
+        third, third_created = jobs.start("incremental")
+        _wait_until_finished(third)
+
+        assert (first_created, second_created, third_created) == (True, False, True)
+        assert second is first
+        assert third is not first
+        assert calls == ["incremental", "incremental"]
+        assert jobs.get(first.id).snapshot()["result"] == {"status": "success", "added": 3}
+
+    def test_start_in_another_mode_conflicts_with_the_running_job(self):
+        """Test a full ingestion requested while an incremental one runs is rejected, not joined"""
+        release = threading.Event()
+        jobs = IngestionJobs(lambda mode, job: release.wait(5) and {"status": "success"})
+        running, _ = jobs.start("incremental")
+
+        with pytest.raises(IngestionJobConflict) as conflict:
+            jobs.start("full")
+        release.set()
+        _wait_until_finished(running)
+
+        assert conflict.value.job is running
+        assert conflict.value.mode == "full"
+
+    def test_snapshot_reports_pipeline_progress(self):
+        """Test a running job reports the pipeline's phase, chunk counts and ETA"""
+        release = threading.Event()
+        pipeline = Mock(phase="embedding", progress={
+            "chunks_loaded": 600, "chunks_to_embed": 100, "chunks_embedded": 40, "chunks_stored": 20
+        })
+        pipeline.eta_seconds.return_value = 12.5
+
+        def ingest(mode, job):
+            job.pipeline = pipeline
+            release.wait(5)
+            return {}
+
+        jobs = IngestionJobs(ingest)
+        job, _ = jobs.start("incremental")
+        while job.pipeline is None:
+            time.sleep(0.01)
+        snapshot = job.snapshot()
+        release.set()
+        _wait_until_finished(job)
+
+        assert snapshot["status"] == "running"
+        assert snapshot["phase"] == "embedding"
+        assert (snapshot["chunks_fetched"], snapshot["chunks_embedded"], snapshot["chunks_stored"]) == (600, 40, 20)
+        assert snapshot["eta_seconds"] == 12.5
+        assert job.snapshot()["phase"] == "completed"
+        assert job.snapshot()["eta_seconds"] is None
+
+    def test_failed_job_records_error(self):
+        """Test a failing ingestion marks the job failed and frees the slot"""
+        def ingest(mode, job):
+            raise RuntimeError("source unavailable")
+
+        jobs = IngestionJobs(ingest)
+        job, _ = jobs.start("incremental")
+        _wait_until_finished(job)
+        retry, created = jobs.start("incremental")
+        _wait_until_finished(retry)
+
+        assert job.status == "failed"
+        assert job.snapshot()["phase"] == "failed"
+        assert job.error == "source unavailable"
+        assert created is True
+
+    def test_only_recent_finished_jobs_are_kept(self):
+        """Test finished jobs beyond the retention limit are forgotten oldest first"""
+        jobs = IngestionJobs(lambda mode, job: {}, retained=2)
+        started = []
+        for _ in range(3):
+            job, _ = jobs.start("incremental")
+            _wait_until_finished(job)
+            started.append(job)
+
+        assert jobs.get(started[0].id) is None
+        assert jobs.get(started[1].id) is started[1]
+        assert jobs.get(started[2].id) is started[2]
+
+    def test_workers_sharing_a_state_directory_run_one_job(self, tmp_path):
+        """Test another worker joins, reports and conflicts with the job running in this one"""
+        release = threading.Event()
+        calls = []
+
+        def ingest(mode, job):
+            calls.append(mode)
+            release.wait(5)
+            return {"status": "success"}
+
+        worker = IngestionJobs(ingest, state_directory=str(tmp_path))
+        other_worker = IngestionJobs(ingest, state_directory=str(tmp_path))
+        job, _ = worker.start("incremental")
+        joined, joined_created = other_worker.start("incremental")
+        deadline = time.time() + 5
+        while other_worker.get(job.id).snapshot()["status"] == "queued" and time.time() < deadline:
+            time.sleep(0.01)
+        running = other_worker.get(job.id).snapshot()
+        with pytest.raises(IngestionJobConflict) as conflict:
+            other_worker.start("full")
+        release.set()
+        _wait_until_finished(job)
+        finished = other_worker.get(job.id).snapshot()
+        next_job, next_created = other_worker.start("full")
+        _wait_until_finished(next_job)
+
+        assert (joined.id, joined_created) == (job.id, False)
+        assert running["status"] == "running"
+        assert conflict.value.job.id == job.id
+        assert finished["status"] == "succeeded" and finished["result"] == {"status": "success"}
+        assert next_created is True
+        assert calls == ["incremental", "full"]
+        assert other_worker.get("../ingestion") is None
+
+    def test_job_of_an_exited_worker_is_marked_failed(self, tmp_path):
+        """Test a job recorded as running without a worker holding the lock is failed by the next start"""
+        orphan = {"job_id": "0" * 32, "mode": "full", "status": "running", "phase": "embedding"}
+        (tmp_path / f"{orphan['job_id']}.json").write_text(json.dumps(orphan))
+        (tmp_path / IngestionJobs.ACTIVE_FILE_NAME).write_text(orphan["job_id"])
+
+        jobs = IngestionJobs(lambda mode, job: {}, state_directory=str(tmp_path))
+        job, created = jobs.start("incremental")
+        _wait_until_finished(job)
+
+        assert created is True
+        assert jobs.get(orphan["job_id"]).snapshot()["status"] == "failed"
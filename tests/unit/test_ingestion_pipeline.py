@@ -0,0 +1,100 @@
+import pytest
+from unittest.mock import Mock
+from langchain_core.documents import Document
+from app.services.ingestion_pipeline import IngestionPipeline
+
+
+def _documents(source, count):
+    return [
+        Document(page_content=f"{source} chunk {i}", metadata={"source": source, "chunk_id": i})
+        for i in range(count)
+    ]
+
+
+class TestIngestionPipeline:
+    @pytest.fixture
+    def services(self):
+        document_service = Mock()
+        embedding_service = Mock()
+        vector_store = Mock()
+        embedding_service.generate_embeddings.side_effect = lambda docs: [[0.1]] * len(docs)
+        vector_store.diff_documents.side_effect = lambda docs, full=False, complete=True: {
+            'added': [(f"id-{doc.page_content}", doc) for doc in docs],
+            'updated': [],
+            'removed': [],
+            'skipped': 0
+        }
+        return document_service, embedding_service, vector_store
+
+    def test_batches_are_embedded_and_stored_incrementally(self, services):
+        """Test chunks flow through in batches and each batch is written once embedded"""
+        document_service, embedding_service, vector_store = services
+        document_service.iter_source_documents.return_value = iter([
+            ("PEP 8", _documents("PEP 8", 3), True),
+            ("Think Python", _documents("Think Python", 2), True)
+        ])
+        events = []
+        embedding_service.generate_embeddings.side_effect = lambda docs: events.append("embed") or [[0.1]] * len(docs)
+        vector_store.add_documents.side_effect = lambda docs, embeddings, ids: events.append("store")
+
+        pipeline = IngestionPipeline(document_service, embedding_service, vector_store, batch_size=2, queue_size=1)
+        result = pipeline.run()
+
+        assert embedding_service.generate_embeddings.call_count == 3
+        assert vector_store.add_documents.call_count == 3
+        assert result["added"] == 5
+        assert result["total_documents"] == 5
+        assert result["sources"] == ["PEP 8", "Think Python"]
+        assert pipeline.progress == {"chunks_loaded": 5, "chunks_to_embed": 5, "chunks_embedded": 5, "chunks_stored": 5}
+        assert pipeline.phase == "done"
+        assert pipeline.eta_seconds() == 0.0
+        # The first batch is stored before the last one has been embedded
+        assert events.index("store") < len(events) - 1 - events[::-1].index("embed")
+
+    def test_removed_and_updated_chunks_skip_embedding(self, services):
+        """Test deletes and metadata updates go straight to the store stage"""
+        document_service, embedding_service, vector_store = services
+        documents = _documents("PEP 8", 2)
+        document_service.iter_source_documents.return_value = iter([("PEP 8", documents, True)])
+        vector_store.diff_documents.side_effect = None
+        vector_store.diff_documents.return_value = {
+            'added': [],
+            'updated': [("id-1", documents[1])],
+            'removed': ["stale"],
+            'skipped': 1
+        }
+
+        result = IngestionPipeline(document_service, embedding_service, vector_store).run()
+
+        embedding_service.generate_embeddings.assert_not_called()
+        vector_store.delete_documents.assert_called_once_with(["stale"])
+        vector_store.update_metadata.assert_called_once_with(["id-1"], [documents[1]])
+        assert (result["added"], result["updated"], result["removed"], result["skipped"]) == (0, 1, 1, 1)
+
+    def test_incomplete_source_is_reported_and_not_checkpointed(self, services):
+        """Test a partly loaded source is diffed without removals and not recorded as complete"""
+        document_service, embedding_service, vector_store = services
+        documents = _documents("Think Python", 2)
+        document_service.iter_source_documents.return_value = iter([("Think Python", documents, False)])
+        checkpoint = Mock()
+        checkpoint.completed_sources.return_value = {}
+        checkpoint.stored_ids.return_value = set()
+
+        result = IngestionPipeline(document_service, embedding_service, vector_store, checkpoint=checkpoint).run()
+
+        vector_store.diff_documents.assert_called_once_with(documents, full=False, complete=False)
+        assert result["incomplete_sources"] == ["Think Python"]
+        assert result["added"] == 2
+        checkpoint.complete_source.assert_not_called()
+
+    def test_stage_error_propagates(self, services):
+        """Test a failing stage stops the pipeline and re-raises in the caller"""
+        document_service, embedding_service, vector_store = services
+        document_service.iter_source_documents.return_value = iter([("PEP 8", _documents("PEP 8", 10), True)])
+        embedding_service.generate_embeddings.side_effect = RuntimeError("rate limited")
+
+        pipeline = IngestionPipeline(document_service, embedding_service, vector_store, batch_size=1, queue_size=1)
+
+        with pytest.raises(RuntimeError, match="rate limited"):
+            pipeline.run()
+        vector_store.add_documents.assert_not_called()
@@ -0,0 +1,54 @@
+import threading
+from unittest.mock import Mock
+from app.services.lazy_service import LazyService
+
+
+class TestLazyService:
+    def test_concurrent_gets_build_once(self):
+        """Test threads asking for the service while it is built share one instance"""
+        release = threading.Event()
+        builds = []
+
+        def factory():
+            builds.append(1)
+            release.wait(5)
+            return object()
+
+        service = LazyService("test", factory)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(service.get())) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        assert not service.ready
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert len(builds) == 1
+        assert len(results) == 4
+        assert all(result is service.instance for result in results)
+        assert service.ready
+
+    def test_failed_build_is_reported_and_retried(self):
+        """Test a failed build leaves an error and the next get builds again"""
+        factory = Mock(side_effect=[RuntimeError("vector store locked"), "service"])
+        service = LazyService("test", factory)
+
+        service.start().join()
+
+        assert not service.ready
+        assert service.error == "vector store locked"
+        assert service.get() == "service"
+        assert service.error is None
+
+    def test_close_releases_the_instance(self):
+        """Test close closes the built service and a later get builds a new one"""
+        instances = [Mock(), Mock()]
+        service = LazyService("test", lambda: instances.pop(0))
+        first = service.get()
+
+        service.close()
+
+        first.close.assert_called_once()
+        assert not service.ready
+        assert service.get() is not first
@@ -0,0 +1,113 @@
+import asyncio
+import os
+import subprocess
+import sys
+import httpx
+from fastapi import FastAPI
+from prometheus_client import REGISTRY
+from app.core.metrics import metrics_recorder
+from app.middleware.metrics_middleware import MetricsMiddleware
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CONCURRENT_REQUESTS = 2000
+CANCELLED_REQUESTS = 200
+
+
+def _sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestHttpRequestMetrics:
+    def test_concurrent_requests_are_counted_exactly(self):
+        """Test thousands of simultaneous requests (some abandoned) leave exact counts and no in-progress drift"""
+        endpoint = "/stress"
+        app = FastAPI()
+        app.add_middleware(MetricsMiddleware)
+
+        async def main():
+            gate = asyncio.Event()
+
+            @app.get(endpoint)
+            async def held():
+                await gate.wait()
+                return {"status": "ok"}
+
+            before_ok = _sample("http_requests_total", method="GET", endpoint=endpoint, status_code="200")
+            before_closed = _sample("http_requests_total", method="GET", endpoint=endpoint, status_code="499")
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                tasks = [asyncio.create_task(client.get(endpoint)) for _ in range(CONCURRENT_REQUESTS)]
+                while _sample("http_requests_in_progress", method="GET", endpoint=endpoint) < CONCURRENT_REQUESTS:
+                    await asyncio.sleep(0.01)
+                all_in_progress = _sample("http_requests_in_progress", method="GET", endpoint=endpoint)
+
+                for task in tasks[:CANCELLED_REQUESTS]:
+                    task.cancel()
+                await asyncio.gather(*tasks[:CANCELLED_REQUESTS], return_exceptions=True)
+                after_cancel = _sample("http_requests_in_progress", method="GET", endpoint=endpoint)
+
+                gate.set()
+                responses = await asyncio.gather(*tasks[CANCELLED_REQUESTS:])
+
+            ok = _sample("http_requests_total", method="GET", endpoint=endpoint, status_code="200") - before_ok
+            closed = _sample("http_requests_total", method="GET", endpoint=endpoint, status_code="499") - before_closed
+            return all_in_progress, after_cancel, responses, ok, closed
+
+        all_in_progress, after_cancel, responses, ok, closed = asyncio.run(main())
+
+        assert all_in_progress == CONCURRENT_REQUESTS
+        assert after_cancel == CONCURRENT_REQUESTS - CANCELLED_REQUESTS
+        assert all(response.status_code == 200 for response in responses)
+        assert (ok, closed) == (CONCURRENT_REQUESTS - CANCELLED_REQUESTS, CANCELLED_REQUESTS)
+        assert _sample("http_requests_in_progress", method="GET", endpoint=endpoint) == 0
+        assert _sample("http_request_duration_seconds_count", method="GET", endpoint=endpoint) == CONCURRENT_REQUESTS
+
+    def test_request_end_is_recorded_once(self):
+        """Test ending the same request twice neither double-counts it nor decrements the gauge twice"""
+        timing = metrics_recorder.record_http_request_start("GET", "/twice")
+        metrics_recorder.record_http_request_end(timing, 200)
+        metrics_recorder.record_http_request_end(timing, 200)
+
+        assert _sample("http_requests_total", method="GET", endpoint="/twice", status_code="200") == 1
+        assert _sample("http_requests_in_progress", method="GET", endpoint="/twice") == 0
+
+
+# A worker that serves 3 requests, leaves one in progress and is killed (never marked as exited)
+KILLED_WORKER = """
+import os
+from app.core.metrics import metrics_recorder
+for _ in range(3):
+    metrics_recorder.record_http_request_end(metrics_recorder.record_http_request_start("GET", "/query"), 200)
+metrics_recorder.record_http_request_start("GET", "/query")
+metrics_recorder.update_vector_store_size("PEP 8", 60)
+os._exit(0)
+"""
+
+# A running worker that serves 2 requests, has one in progress and renders /metrics
+SCRAPED_WORKER = """
+from app.core.metrics import get_metrics_content, metrics_recorder, remove_dead_workers
+for _ in range(2):
+    metrics_recorder.record_http_request_end(metrics_recorder.record_http_request_start("GET", "/query"), 200)
+metrics_recorder.record_http_request_start("GET", "/query")
+metrics_recorder.update_vector_store_size("PEP 8", 61)
+remove_dead_workers()
+print(get_metrics_content()[0].decode())
+"""
+
+
+class TestMultiprocessMetrics:
+    def test_metrics_are_aggregated_across_workers(self, tmp_path):
+        """Test /metrics sums counters of all workers and live gauges of the running ones only"""
+        env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path / "prometheus"))
+        for script in (KILLED_WORKER, KILLED_WORKER):
+            subprocess.run([sys.executable, "-c", script], cwd=REPO_ROOT, env=env, check=True)
+        output = subprocess.run([sys.executable, "-c", SCRAPED_WORKER], cwd=REPO_ROOT, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        samples = dict(line.rsplit(" ", 1) for line in output.splitlines() if line and not line.startswith("#"))
+
+        assert float(samples['http_requests_total{endpoint="/query",method="GET",status_code="200"}']) == 8
+        assert float(samples['http_request_duration_seconds_count{endpoint="/query",method="GET"}']) == 8
+        assert float(samples['http_requests_in_progress{endpoint="/query",method="GET"}']) == 1
+        assert float(samples['vector_store_collection_size{source="PEP 8"}']) == 61
+        assert 'rsm_rag_info_info{service="rsm-rag",version="1.0.0"}' in samples
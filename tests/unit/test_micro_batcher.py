@@ -0,0 +1,105 @@
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
+from app.services.embedding_service import EmbeddingService
+from app.services.micro_batcher import MicroBatcher
+
+
+class TestMicroBatcher:
+
+    def test_concurrent_items_are_processed_in_one_batch(self):
+        """Test items submitted within the window share a single batch call"""
+        batches = []
+
+        async def process(items):
+            batches.append(list(items))
+            return [item * 2 for item in items]
+
+        async def main():
+            batcher = MicroBatcher(process, max_batch_size=32, max_wait_seconds=0.01)
+            return await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+
+        assert asyncio.run(main()) == [0, 2, 4, 6, 8]
+        assert batches == [[0, 1, 2, 3, 4]]
+
+    def test_full_batch_flushes_without_waiting(self):
+        """Test reaching max_batch_size flushes immediately and starts a new batch"""
+        batches = []
+
+        async def process(items):
+            batches.append(list(items))
+            return items
+
+        async def main():
+            batcher = MicroBatcher(process, max_batch_size=2, max_wait_seconds=10)
+            return await asyncio.wait_for(asyncio.gather(*(batcher.submit(i) for i in range(4))), timeout=1)
+
+        assert asyncio.run(main()) == [0, 1, 2, 3]
+        assert batches == [[0, 1], [2, 3]]
+
+    def test_batch_failure_reaches_every_caller(self):
+        """Test an exception from the batch call is raised in all waiting callers"""
+        async def process(items):
+            raise RuntimeError("API down")
+
+        async def main():
+            batcher = MicroBatcher(process, max_batch_size=32, max_wait_seconds=0.001)
+            return await asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True)
+
+        assert all(isinstance(result, RuntimeError) for result in asyncio.run(main()))
+
+    def test_in_flight_batch_is_referenced_until_done(self):
+        """Test the batcher holds its batch tasks so they cannot be garbage-collected mid-flight"""
+        release = None
+
+        async def process(items):
+            await release.wait()
+            return items
+
+        async def main():
+            nonlocal release
+            release = asyncio.Event()
+            batcher = MicroBatcher(process, max_batch_size=2, max_wait_seconds=10)
+            callers = asyncio.gather(batcher.submit(1), batcher.submit(2))
+            await asyncio.sleep(0)
+            in_flight = len(batcher._tasks)
+            release.set()
+            results = await callers
+            await asyncio.sleep(0)
+            return in_flight, results, len(batcher._tasks)
+
+        assert asyncio.run(main()) == (1, [1, 2], 0)
+
+    def test_cancelled_batch_cancels_waiting_callers(self):
+        """Test callers do not wait forever when their batch is cancelled"""
+        async def process(items):
+            await asyncio.sleep(10)
+            return items
+
+        async def main():
+            batcher = MicroBatcher(process, max_batch_size=2, max_wait_seconds=10)
+            callers = [asyncio.ensure_future(batcher.submit(i)) for i in range(2)]
+            await asyncio.sleep(0)
+            for task in batcher._tasks:
+                task.cancel()
+            await asyncio.wait(callers, timeout=1)
+            return [caller.cancelled() for caller in callers]
+
+        assert asyncio.run(main()) == [True, True]
+
+
+class TestEmbeddingServiceQueryBatching:
+
+    def test_concurrent_query_embeddings_use_one_request(self):
+        """Test concurrent agenerate_query_embedding calls are sent as one embed_documents call"""
+        with patch('app.services.embedding_service.EMBEDDING_CACHE_ENABLED', False):
+            service = EmbeddingService()
+        service.embeddings = Mock()
+        service.embeddings.aembed_documents = AsyncMock(side_effect=lambda texts: [[float(len(t))] for t in texts])
+        service.embeddings.aembed_query = AsyncMock()
+
+        async def main():
+            return await asyncio.gather(*(service.agenerate_query_embedding(q) for q in ["a", "bb", "ccc"]))
+
+        assert asyncio.run(main()) == [[1.0], [2.0], [3.0]]
+        service.embeddings.aembed_documents.assert_awaited_once_with(["a", "bb", "ccc"])
+        service.embeddings.aembed_query.assert_not_awaited()
@@ -0,0 +1,88 @@
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from app.core.metrics import metrics_recorder
+from app.middleware.logging_middleware import LoggingMiddleware
+from app.middleware.metrics_middleware import MetricsMiddleware
+from app.middleware.server_timing_middleware import ServerTimingMiddleware
+
+
+def _requests_total(endpoint: str, status_code: int) -> float:
+    return REGISTRY.get_sample_value(
+        "http_requests_total", {"method": "GET", "endpoint": endpoint, "status_code": str(status_code)}
+    ) or 0.0
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+    app.add_middleware(LoggingMiddleware)
+
+    @app.get("/mw/ok")
+    async def ok():
+        return {"status": "ok"}
+
+    @app.get("/mw/missing")
+    async def missing():
+        raise HTTPException(status_code=404, detail="missing")
+
+    @app.get("/mw/crash")
+    async def crash():
+        raise RuntimeError("boom")
+
+    @app.get("/mw/stream")
+    async def stream():
+        async def chunks():
+            for i in range(3):
+                yield f"chunk {i}\n"
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    return TestClient(app, raise_server_exceptions=False)
+
+
+class TestMiddleware:
+    @pytest.mark.parametrize("path, status_code", [("/mw/ok", 200), ("/mw/missing", 404), ("/mw/crash", 500)])
+    def test_status_code_is_recorded(self, client, path, status_code):
+        """Test the recorded status is the one sent in http.response.start (500 for unhandled errors)"""
+        before = _requests_total(path, status_code)
+
+        response = client.get(path)
+
+        assert response.status_code == status_code
+        assert _requests_total(path, status_code) == before + 1
+        assert REGISTRY.get_sample_value(
+            "http_requests_in_progress", {"method": "GET", "endpoint": path}
+        ) == 0
+
+    def test_streamed_response_passes_through(self, client):
+        """Test a streamed body reaches the client intact and is counted once"""
+        before = _requests_total("/mw/stream", 200)
+
+        response = client.get("/mw/stream")
+
+        assert response.text == "chunk 0\nchunk 1\nchunk 2\n"
+        assert _requests_total("/mw/stream", 200) == before + 1
+
+    def test_server_timing_header_carries_the_recorded_stages(self):
+        """Test stages recorded while handling a request are sent in its Server-Timing header"""
+        app = FastAPI()
+        app.add_middleware(ServerTimingMiddleware)
+
+        @app.get("/mw/staged")
+        async def staged():
+            metrics_recorder.record_rag_stage("query_embedding", 0.2124)
+            metrics_recorder.record_rag_stage("context_build", 0.0005)
+            metrics_recorder.record_rag_stage("context_build", 0.0003)
+            return {"status": "ok"}
+
+        @app.get("/mw/plain")
+        async def plain():
+            return {"status": "ok"}
+
+        client = TestClient(app)
+
+        assert client.get("/mw/staged").headers["server-timing"] == "query_embedding;dur=212.4, context_build;dur=0.8"
+        assert "server-timing" not in client.get("/mw/plain").headers
@@ -1,13 +1,42 @@
+import asyncio
 import pytest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import Mock, patch, AsyncMock
+from prometheus_client import REGISTRY
+from app.core.metrics import collect_stage_timings
 from app.services.rag_service import RAGService, _create_rag_prompt
+from app.services.answer_cache import AnswerCache
+from app.services.single_flight import SingleFlight
 from langchain_core.documents import Document
 
+def _vector_store_mock(directory):
+    """Vector store mock whose new index versions live in directory"""
+    vector_store = Mock()
+    vector_store.resume_version.return_value = None
+    vector_store.create_version.return_value.directory = str(directory)
+    return vector_store
+
+
 class TestRAGService:
     @pytest.fixture
     def rag_service(self):
         return RAGService()
     
+    @patch('app.services.rag_service.Langfuse')
+    @patch('app.services.rag_service.ChatOpenAI')
+    @patch('app.services.rag_service.VectorStore')
+    @patch('app.services.rag_service.EmbeddingService')
+    @patch('app.services.rag_service.DocumentService')
+    @patch('app.services.rag_service.get_token_counter')
+    def test_init_loads_token_encoding(self, mock_get_token_counter, mock_document_service,
+                                       mock_embedding_service, mock_vector_store, mock_chat, mock_langfuse,
+                                       tmp_path):
+        """Test the token encoding is loaded while the service is built, not on the first query"""
+        mock_vector_store.return_value.persist_directory = str(tmp_path)
+
+        RAGService()
+
+        mock_get_token_counter.assert_called_once_with()
+
     def test_create_rag_prompt(self, rag_service):
         """Test RAG prompt creation"""
         question = "What is a variable?"
@@ -37,14 +66,15 @@ class TestRAGService:
 
     # INGESTION TESTS
     @patch('app.services.rag_service.RAGService.__init__')
-    def test_ingest_documents_success(self, mock_init, rag_service):
+    def test_ingest_documents_success(self, mock_init, rag_service, tmp_path):
         """Test successful document ingestion"""
         mock_init.return_value = None
         
         # Mock dependencies
         rag_service.document_service = Mock()
         rag_service.embedding_service = Mock()
-        rag_service.vector_store = Mock()
+        rag_service.vector_store = _vector_store_mock(tmp_path)
+        index = rag_service.vector_store.create_version.return_value
         
         # Mock document data
         mock_documents = [
@@ -53,8 +83,15 @@ class TestRAGService:
         ]
         mock_embeddings = [[0.1] * 1536, [0.2] * 1536]
         
-        rag_service.document_service.load_all_documents.return_value = mock_documents
-        rag_service.embedding_service.generate_embeddings.return_value = mock_embeddings
+        rag_service.document_service.iter_source_documents.return_value = iter([
+            ("test1.py", mock_documents[:1], True),
+            ("test2.py", mock_documents[1:], True)
+        ])
+        rag_service.embedding_service.generate_embeddings.side_effect = [mock_embeddings[:1], mock_embeddings[1:]]
+        index.diff_documents.side_effect = [
+            {'added': [('id1', mock_documents[0])], 'updated': [], 'removed': [], 'skipped': 0},
+            {'added': [('id2', mock_documents[1])], 'updated': [], 'removed': [], 'skipped': 0}
+        ]
         rag_service.vector_store.get_collection_stats.return_value = {
             'total_documents': 2,
             'sources': {'test1.py': 1, 'test2.py': 1}
@@ -63,27 +100,79 @@ class TestRAGService:
         result = rag_service.ingest_documents()
         
         # Verify calls
-        rag_service.document_service.load_all_documents.assert_called_once()
-        rag_service.embedding_service.generate_embeddings.assert_called_once_with(mock_documents)
-        rag_service.vector_store.add_documents.assert_called_once_with(mock_documents, mock_embeddings)
+        rag_service.document_service.iter_source_documents.assert_called_once()
+        index.diff_documents.assert_any_call(mock_documents[:1], full=False, complete=True)
+        index.diff_documents.assert_any_call(mock_documents[1:], full=False, complete=True)
+        rag_service.embedding_service.generate_embeddings.assert_any_call(mock_documents[:1])
+        rag_service.embedding_service.generate_embeddings.assert_any_call(mock_documents[1:])
+        index.add_documents.assert_any_call(
+            mock_documents[:1], mock_embeddings[:1], ids=['id1']
+        )
+        index.add_documents.assert_any_call(
+            mock_documents[1:], mock_embeddings[1:], ids=['id2']
+        )
+        index.delete_documents.assert_not_called()
+        rag_service.vector_store.activate.assert_called_once_with(index)
         
         # Verify result
         assert result["status"] == "success"
         assert result["total_documents"] == 2
+        assert result["added"] == 2
         assert "test1.py" in result["sources"]
         assert "Successfully ingested" in result["message"]
 
     @patch('app.services.rag_service.RAGService.__init__')
-    def test_ingest_documents_empty(self, mock_init, rag_service):
+    def test_ingest_documents_incremental_unchanged(self, mock_init, rag_service, tmp_path):
+        """Test re-ingesting unchanged sources skips embedding and writes"""
+        mock_init.return_value = None
+
+        rag_service.document_service = Mock()
+        rag_service.embedding_service = Mock()
+        rag_service.vector_store = _vector_store_mock(tmp_path)
+        index = rag_service.vector_store.create_version.return_value
+
+        mock_documents = [
+            Document(page_content="Test content 1", metadata={"source": "test1.py", "chunk_id": 0})
+        ]
+        rag_service.document_service.iter_source_documents.return_value = iter([("test1.py", mock_documents, True)])
+        index.diff_documents.return_value = {
+            'added': [],
+            'updated': [],
+            'removed': ['stale_id'],
+            'skipped': 1
+        }
+        rag_service.vector_store.get_collection_stats.return_value = {
+            'total_documents': 1,
+            'sources': {'test1.py': 1}
+        }
+
+        result = rag_service.ingest_documents()
+
+        rag_service.embedding_service.generate_embeddings.assert_not_called()
+        index.add_documents.assert_not_called()
+        index.delete_documents.assert_called_once_with(['stale_id'])
+        assert result["skipped"] == 1
+        assert result["removed"] == 1
+        assert result["added"] == 0
+
+    @patch('app.services.rag_service.RAGService.__init__')
+    def test_ingest_documents_invalid_mode(self, mock_init, rag_service):
+        """Test unknown ingest modes are rejected"""
+        mock_init.return_value = None
+
+        with pytest.raises(ValueError, match="Unknown ingest mode"):
+            rag_service.ingest_documents(mode="partial")
+
+    @patch('app.services.rag_service.RAGService.__init__')
+    def test_ingest_documents_empty(self, mock_init, rag_service, tmp_path):
         """Test ingestion with empty document set"""
         mock_init.return_value = None
         
         rag_service.document_service = Mock()
         rag_service.embedding_service = Mock()
-        rag_service.vector_store = Mock()
+        rag_service.vector_store = _vector_store_mock(tmp_path)
         
-        rag_service.document_service.load_all_documents.return_value = []
-        rag_service.embedding_service.generate_embeddings.return_value = []
+        rag_service.document_service.iter_source_documents.return_value = iter([])
         rag_service.vector_store.get_collection_stats.return_value = {
             'total_documents': 0,
             'sources': {}
@@ -96,16 +185,23 @@ class TestRAGService:
         assert result["sources"] == {}
 
     @patch('app.services.rag_service.RAGService.__init__')
-    def test_ingest_documents_error_handling(self, mock_init, rag_service):
+    def test_ingest_documents_error_handling(self, mock_init, rag_service, tmp_path):
         """Test ingestion error handling"""
         mock_init.return_value = None
         
         rag_service.document_service = Mock()
-        rag_service.document_service.load_all_documents.side_effect = Exception("Document loading failed")
+        rag_service.embedding_service = Mock()
+        rag_service.vector_store = _vector_store_mock(tmp_path)
+        rag_service.document_service.iter_source_documents.side_effect = Exception("Document loading failed")
         
         with pytest.raises(Exception, match="Document loading failed"):
             rag_service.ingest_documents()
 
+        # Queries stay on the active version; the unfinished one is kept for the retry to resume
+        rag_service.vector_store.activate.assert_not_called()
+        rag_service.vector_store.discard.assert_not_called()
+        assert (tmp_path / "ingest_checkpoint.json").exists()
+
     # QUERY TESTS
     @patch('app.services.rag_service.RAGService.__init__')
     def test_query_success_with_results(self, mock_init, rag_service):
@@ -143,7 +239,7 @@ class TestRAGService:
         
         # Verify calls
         rag_service.embedding_service.generate_query_embedding.assert_called_once_with("What is a variable?")
-        rag_service.vector_store.similarity_search.assert_called_once_with([0.1] * 1536, k=5)
+        rag_service.vector_store.similarity_search.assert_called_once_with([0.1] * 1536, k=5, sources=None, max_distance=None, query_text=None)
         rag_service.llm.invoke.assert_called_once()
         
         # Verify result structure
@@ -168,7 +264,7 @@ class TestRAGService:
         
         rag_service.query("test question", k=10)
         
-        rag_service.vector_store.similarity_search.assert_called_once_with([0.1] * 1536, k=10)
+        rag_service.vector_store.similarity_search.assert_called_once_with([0.1] * 1536, k=10, sources=None, max_distance=None, query_text=None)
 
     @patch('app.services.rag_service.RAGService.__init__')
     def test_query_embedding_error(self, mock_init, rag_service):
@@ -284,5 +380,397 @@ class TestRAGService:
         assert "source" in source
         assert "distance" in source
 
+    # ASYNC QUERY TESTS
+    @patch('app.services.rag_service.RAGService.__init__')
+    def test_aquery_success_with_results(self, mock_init, rag_service):
+        """Test async query uses the non-blocking embedding, search and LLM calls"""
+        mock_init.return_value = None
+
+        rag_service.embedding_service = Mock()
+        rag_service.vector_store = Mock()
+        rag_service.llm = Mock()
+
+        rag_service.embedding_service.agenerate_query_embedding = AsyncMock(return_value=[0.1] * 1536)
+        rag_service.vector_store.asimilarity_search = AsyncMock(return_value=[
+            {
+                'text': 'A variable is a named storage location in memory.',
+                'metadata': {'source': 'python_basics.py', 'chunk_id': 5},
+                'distance': 0.2
+            }
+        ])
+        mock_response = Mock()
+        mock_response.content = "A variable is a name that refers to a value."
+        rag_service.llm.ainvoke = AsyncMock(return_value=mock_response)
+
+        result = asyncio.run(rag_service.aquery("What is a variable?", k=3))
+
+        rag_service.embedding_service.agenerate_query_embedding.assert_awaited_once_with("What is a variable?")
+        rag_service.vector_store.asimilarity_search.assert_awaited_once_with([0.1] * 1536, k=3, sources=None, max_distance=None, query_text=None)
+        rag_service.llm.ainvoke.assert_awaited_once()
+        rag_service.embedding_service.generate_query_embedding.assert_not_called()
+        rag_service.llm.invoke.assert_not_called()
+
+        assert result["answer"] == "A variable is a name that refers to a value."
+        assert result["sources"][0]["source"] == "python_basics.py"
+        assert result["sources"][0]["page"] == 5
+
+    @patch('app.services.rag_service.RAGService.__init__')
+    def test_aquery_records_stage_durations_and_tokens(self, mock_init, rag_service):
+        """Test async query times each stage (histograms and request timings) and counts LLM tokens"""
+        mock_init.return_value = None
+
+        rag_service.embedding_service = Mock()
+        rag_service.vector_store = Mock()
+        rag_service.llm = Mock()
+
+        rag_service.embedding_service.agenerate_query_embedding = AsyncMock(return_value=[0.1] * 1536)
+        rag_service.vector_store.asimilarity_search = AsyncMock(return_value=[
+            {'text': 'test', 'metadata': {'source': 'test.py', 'chunk_id': 1}, 'distance': 0.1}
+        ])
+        mock_response = Mock()
+        mock_response.content = "answer"
+        mock_response.usage_metadata = {"input_tokens": 120, "output_tokens": 30, "total_tokens": 150}
+        rag_service.llm.ainvoke = AsyncMock(return_value=mock_response)
+
+        def sample(name, **labels):
+            return REGISTRY.get_sample_value(name, labels) or 0.0
+
+        stages = ["query_embedding", "vector_search", "context_build", "llm_total"]
+        counts_before = [sample("rag_stage_duration_seconds_count", stage=stage, mode="single") for stage in stages]
+        prompt_before = sample("rag_llm_tokens_total", type="prompt")
+        completion_before = sample("rag_llm_tokens_total", type="completion")
+
+        async def run():
+            timings = collect_stage_timings()
+            await rag_service.aquery("What is a variable?")
+            return timings
+
+        timings = asyncio.run(run())
+
+        assert list(timings.durations) == stages
+        assert [sample("rag_stage_duration_seconds_count", stage=stage, mode="single") for stage in stages] == \
+            [count + 1 for count in counts_before]
+        assert sample("rag_llm_tokens_total", type="prompt") - prompt_before == 120
+        assert sample("rag_llm_tokens_total", type="completion") - completion_before == 30
+
+    @patch('app.services.rag_service.RAGService.__init__')
+    def test_aquery_no_results(self, mock_init, rag_service):
+        """Test async query when no documents found"""
+        mock_init.return_value = None
+
+        rag_service.embedding_service = Mock()
+        rag_service.vector_store = Mock()
+        rag_service.llm = Mock()
+
+        rag_service.embedding_service.agenerate_query_embedding = AsyncMock(return_value=[0.1] * 1536)
+        rag_service.vector_store.asimilarity_search = AsyncMock(return_value=[])
+        rag_service.llm.ainvoke = AsyncMock()
+
+        result = asyncio.run(rag_service.aquery("test question"))
+
+        assert "couldn't find any relevant information" in result["answer"]
+        assert result["sources"] == []
+        rag_service.llm.ainvoke.assert_not_awaited()
+
+    @patch('app.services.rag_service.RAGService.__init__')
+    def test_aquery_llm_error(self, mock_init, rag_service):
+        """Test async query error handling for LLM failures"""
+        mock_init.return_value = None
+
+        rag_service.embedding_service = Mock()
+        rag_service.vector_store = Mock()
+        rag_service.llm = Mock()
+
+        rag_service.embedding_service.agenerate_query_embedding = AsyncMock(return_value=[0.1] * 1536)
+        rag_service.vector_store.asimilarity_search = AsyncMock(return_value=[
+            {'text': 'test', 'metadata': {'source': 'test.py'}, 'distance': 0.1}
+        ])
+        rag_service.llm.ainvoke = AsyncMock(side_effect=Exception("LLM failed"))
+
+        with pytest.raises(Exception, match="LLM failed"):
+            asyncio.run(rag_service.aquery("test question"))
+
+    @patch('app.services.rag_service.RAGService.__init__')
+    def test_aquery_pushes_filters_to_vector_store(self, mock_init, rag_service):
+        """Test source filter and max distance reach the search and separate cached answers"""
+        mock_init.return_value = None
+
+        rag_service.embedding_service = Mock()
+        rag_service.vector_store = Mock()
+        rag_service.vector_store.version = 1
+        rag_service.llm = Mock()
+        rag_service.answer_cache = AnswerCache(similarity_threshold=0.95, ttl_seconds=60, max_entries=10)
+        rag_service.query_single_flight = None
+
+        rag_service.embedding_service.agenerate_query_embedding = AsyncMock(return_value=[0.1] * 1536)
+        rag_service.vector_store.asimilarity_search = AsyncMock(return_value=[
+            {'text': 'Limit all lines to 79 characters.', 'metadata': {'source': 'PEP 8', 'chunk_id': 3}, 'distance': 0.4}
+        ])
+        mock_response = Mock()
+        mock_response.content = "79 characters"
+        rag_service.llm.ainvoke = AsyncMock(return_value=mock_response)
+
+        asyncio.run(rag_service.aquery("line length?", k=2, source_filter=["PEP 8"], max_distance=0.8))
+        unfiltered = asyncio.run(rag_service.aquery("line length?", k=2))
+
+        assert rag_service.vector_store.asimilarity_search.await_args_list[0].kwargs == {
+            "k": 2, "sources": ["PEP 8"], "max_distance": 0.8, "query_text": None
+        }
+        assert unfiltered["cached"] is False
+        assert rag_service.llm.ainvoke.await_count == 2
+
+    @patch('app.services.rag_service.RAGService.__init__')
+    def test_aquery_hybrid_passes_question_text(self, mock_init, rag_service):
+        """Test hybrid retrieval hands the question to the vector store for BM25 fusion"""
+        mock_init.return_value = None
+
+        rag_service.embedding_service = Mock()
+        rag_service.vector_store = Mock()
+        rag_service.llm = Mock()
+        rag_service.answer_cache = None
+        rag_service.query_single_flight = None
+
+        rag_service.embedding_service.agenerate_query_embedding = AsyncMock(return_value=[0.1] * 1536)
+        rag_service.vector_store.asimilarity_search = AsyncMock(return_value=[
+            {'text': 'E501 line too long', 'metadata': {'source': 'PEP 8', 'chunk_id': 3}, 'distance': None}
+        ])
+        mock_response = Mock()
+        mock_response.content = "E501 flags long lines"
+        rag_service.llm.ainvoke = AsyncMock(return_value=mock_response)
+
+        result = asyncio.run(rag_service.aquery("What is E501?", retrieval_mode="hybrid"))
+
+        assert rag_service.vector_store.asimilarity_search.await_args.kwargs["query_text"] == "What is E501?"
+        assert result["sources"][0]["distance"] is None
+        with pytest.raises(ValueError, match="Unknown retrieval mode"):
+            asyncio.run(rag_service.aquery("What is E501?", retrieval_mode="sparse"))
+
+    # ANSWER CACHE TESTS
+    @patch('app.services.rag_service.RAGService.__init__')
+    def test_query_served_from_answer_cache(self, mock_init, rag_service):
+        """Test a repeated question skips search and LLM and is marked as cached"""
+        mock_init.return_value = None
+
+        rag_service.embedding_service = Mock()
+        rag_service.vector_store = Mock()
+        rag_service.vector_store.version = 1
+        rag_service.llm = Mock()
+        rag_service.answer_cache = AnswerCache(similarity_threshold=0.95, ttl_seconds=60, max_entries=10)
+
+        rag_service.embedding_service.generate_query_embedding.return_value = [0.1] * 1536
+        rag_service.vector_store.similarity_search.return_value = [
+            {'text': 'Limit all lines to 79 characters.', 'metadata': {'source': 'PEP 8', 'chunk_id': 3}, 'distance': 0.1}
+        ]
+        mock_response = Mock()
+        mock_response.content = "79 characters"
+        rag_service.llm.invoke.return_value = mock_response
+
+        first = rag_service.query("what is PEP 8 line length")
+        second = rag_service.query("max line length pep8")
+
+        assert first["cached"] is False
+        assert second["cached"] is True
+        assert second["answer"] == first["answer"]
+        rag_service.vector_store.similarity_search.assert_called_once()
+        rag_service.llm.invoke.assert_called_once()
+
+    @patch('app.services.rag_service.RAGService.__init__')
+    def test_answer_cache_invalidated_by_index_change(self, mock_init, rag_service):
+        """Test answers are recomputed after the vector store changes"""
+        mock_init.return_value = None
+
+        rag_service.embedding_service = Mock()
+        rag_service.vector_store = Mock()
+        rag_service.vector_store.version = 1
+        rag_service.llm = Mock()
+        rag_service.answer_cache = AnswerCache(similarity_threshold=0.95, ttl_seconds=60, max_entries=10)
+
+        rag_service.embedding_service.generate_query_embedding.return_value = [0.1] * 1536
+        rag_service.vector_store.similarity_search.return_value = [
+            {'text': 'test', 'metadata': {'source': 'test.py'}, 'distance': 0.1}
+        ]
+        mock_response = Mock()
+        mock_response.content = "answer"
+        rag_service.llm.invoke.return_value = mock_response
+
+        rag_service.query("test question")
+        rag_service.vector_store.version = 2
+        result = rag_service.query("test question")
+
+        assert result["cached"] is False
+        assert rag_service.llm.invoke.call_count == 2
+
+    # COALESCING TESTS
+    @patch('app.services.rag_service.RAGService.__init__')
+    def test_aquery_coalesces_identical_concurrent_questions(self, mock_init, rag_service):
+        """Test concurrent identical questions share one embedding and LLM call"""
+        mock_init.return_value = None
+
+        rag_service.embedding_service = Mock()
+        rag_service.vector_store = Mock()
+        rag_service.llm = Mock()
+        rag_service.query_single_flight = SingleFlight("rag_query")
+
+        async def slow_embedding(question):
+            await asyncio.sleep(0.01)
+            return [0.1] * 1536
+
+        rag_service.embedding_service.agenerate_query_embedding = AsyncMock(side_effect=slow_embedding)
+        rag_service.vector_store.asimilarity_search = AsyncMock(return_value=[
+            {'text': 'test', 'metadata': {'source': 'test.py', 'chunk_id': 1}, 'distance': 0.1}
+        ])
+        mock_response = Mock()
+        mock_response.content = "answer"
+        rag_service.llm.ainvoke = AsyncMock(return_value=mock_response)
+
+        async def burst():
+            return await asyncio.gather(
+                rag_service.aquery("What is PEP 8?"),
+                rag_service.aquery("what is  pep 8?"),
+                rag_service.aquery("What is PEP 8?", k=3),
+            )
+
+        results = asyncio.run(burst())
+
+        assert [result["answer"] for result in results] == ["answer"] * 3
+        # The first two are coalesced; a different k is a different computation
+        assert rag_service.embedding_service.agenerate_query_embedding.await_count == 2
+        assert rag_service.llm.ainvoke.await_count == 2
+
+    # STREAMING TESTS
+    @patch('app.services.rag_service.RAGService.__init__')
+    def test_astream_query_sends_sources_before_tokens(self, mock_init, rag_service):
+        """Test streaming yields sources first, then the LLM tokens, then done"""
+        mock_init.return_value = None
+
+        rag_service.embedding_service = Mock()
+        rag_service.vector_store = Mock()
+        rag_service.llm = Mock()
+
+        rag_service.embedding_service.agenerate_query_embedding = AsyncMock(return_value=[0.1] * 1536)
+        rag_service.vector_store.asimilarity_search = AsyncMock(return_value=[
+            {'text': 'test', 'metadata': {'source': 'test.py', 'chunk_id': 1}, 'distance': 0.1}
+        ])
+
+        async def fake_stream(prompt):
+            for token in ["A variable ", "", "is a name."]:
+                chunk = Mock()
+                chunk.content = token
+                yield chunk
+
+        rag_service.llm.astream = fake_stream
+
+        async def collect():
+            return [event async for event in rag_service.astream_query("What is a variable?")]
+
+        events = asyncio.run(collect())
+
+        assert [event["event"] for event in events] == ["sources", "token", "token", "done"]
+        assert events[0]["data"]["sources"][0]["source"] == "test.py"
+        assert "".join(event["data"]["text"] for event in events if event["event"] == "token") == "A variable is a name."
+        assert events[-1]["data"]["answer_length"] == len("A variable is a name.")
+
+    @patch('app.services.rag_service.RAGService.__init__')
+    def test_astream_query_serves_cached_answer(self, mock_init, rag_service):
+        """Test a streamed answer is cached and a repeat is sent as one token"""
+        mock_init.return_value = None
+
+        rag_service.embedding_service = Mock()
+        rag_service.vector_store = Mock()
+        rag_service.vector_store.version = 1
+        rag_service.llm = Mock()
+        rag_service.answer_cache = AnswerCache(similarity_threshold=0.95, ttl_seconds=60, max_entries=10)
+
+        rag_service.embedding_service.agenerate_query_embedding = AsyncMock(return_value=[0.1] * 1536)
+        rag_service.vector_store.asimilarity_search = AsyncMock(return_value=[
+            {'text': 'test', 'metadata': {'source': 'test.py', 'chunk_id': 1}, 'distance': 0.1}
+        ])
+        calls = []
+
+        async def fake_stream(prompt):
+            calls.append(prompt)
+            for token in ["cached ", "answer"]:
+                chunk = Mock()
+                chunk.content = token
+                yield chunk
+
+        rag_service.llm.astream = fake_stream
+
+        async def collect():
+            return [event async for event in rag_service.astream_query("test question")]
+
+        asyncio.run(collect())
+        first_tokens_before = REGISTRY.get_sample_value("rag_time_to_first_token_seconds_count")
+        events = asyncio.run(collect())
+
+        assert len(calls) == 1
+        assert REGISTRY.get_sample_value("rag_time_to_first_token_seconds_count") == first_tokens_before
+        assert events[0]["data"]["cached"] is True
+        assert [event["data"]["text"] for event in events if event["event"] == "token"] == ["cached answer"]
+
+    # BATCH QUERY TESTS
+    @patch('app.services.rag_service.RAGService.__init__')
+    def test_aquery_batch_shares_embedding_and_search_calls(self, mock_init, rag_service):
+        """Test a batch embeds and searches once and answers in question order"""
+        mock_init.return_value = None
+
+        rag_service.embedding_service = Mock()
+        rag_service.vector_store = Mock()
+        rag_service.vector_store.version = 1
+        rag_service.llm = Mock()
+        rag_service.answer_cache = AnswerCache(similarity_threshold=0.95, ttl_seconds=60, max_entries=10)
+        rag_service.answer_cache.store([0.0, 1.0], 5, 1, {"answer": "cached", "sources": [], "cached": False}, 1.0)
+
+        rag_service.embedding_service.agenerate_query_embeddings = AsyncMock(
+            return_value=[[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]]
+        )
+        rag_service.vector_store.asimilarity_search_batch = AsyncMock(return_value=[
+            [{'text': 'first', 'metadata': {'source': 'PEP 8', 'chunk_id': 1}, 'distance': 0.1}],
+            []
+        ])
+        rag_service.llm.abatch = AsyncMock(return_value=[Mock(content="answer 1")])
+
+        results = asyncio.run(rag_service.aquery_batch(["q1", "q2", "q3"]))
+
+        rag_service.embedding_service.agenerate_query_embeddings.assert_awaited_once_with(["q1", "q2", "q3"])
+        # q2 is served from the cache, so only q1 and q3 are searched
+        rag_service.vector_store.asimilarity_search_batch.assert_awaited_once_with(
+            [[1.0, 0.0], [1.0, 1.0]], k=5, sources=None, max_distance=None, query_texts=None
+        )
+        assert rag_service.llm.abatch.await_args.args[0][0].count("first") == 1
+        assert [result["answer"] for result in results] == [
+            "answer 1", "cached", "I couldn't find any relevant information to answer your question."
+        ]
+        assert [result["cached"] for result in results] == [False, True, False]
+
+    @patch('app.services.rag_service.RAGService.__init__')
+    def test_aquery_batch_records_batch_stages_separately(self, mock_init, rag_service):
+        """Test batch-wide stage timings use mode="batch" and a fully cached batch is not searched"""
+        mock_init.return_value = None
+
+        rag_service.embedding_service = Mock()
+        rag_service.vector_store = Mock()
+        rag_service.vector_store.version = 1
+        rag_service.llm = Mock()
+        rag_service.answer_cache = AnswerCache(similarity_threshold=0.95, ttl_seconds=60, max_entries=10)
+        rag_service.answer_cache.store([0.0, 1.0], 5, 1, {"answer": "cached", "sources": [], "cached": False}, 1.0)
+
+        rag_service.embedding_service.agenerate_query_embeddings = AsyncMock(return_value=[[0.0, 1.0], [0.0, 1.0]])
+        rag_service.vector_store.asimilarity_search_batch = AsyncMock()
+        rag_service.llm.abatch = AsyncMock()
+
+        def sample(stage, mode):
+            return REGISTRY.get_sample_value("rag_stage_duration_seconds_count", {"stage": stage, "mode": mode}) or 0.0
+
+        stages = [(stage, mode) for stage in ["query_embedding", "vector_search"] for mode in ["single", "batch"]]
+        counts_before = [sample(stage, mode) for stage, mode in stages]
+
+        results = asyncio.run(rag_service.aquery_batch(["q1", "q2"]))
+
+        assert [result["answer"] for result in results] == ["cached", "cached"]
+        rag_service.vector_store.asimilarity_search_batch.assert_not_awaited()
+        rag_service.llm.abatch.assert_not_awaited()
+        assert [sample(stage, mode) - before for (stage, mode), before in zip(stages, counts_before)] == [0, 1, 0, 0]
+
 # Install pytest first: pip install pytest
-# Run tests: pytest tests/ -v
\ No newline at end of file
+# Run tests: pytest tests/ -v
@@ -0,0 +1,79 @@
+import asyncio
+import pytest
+from app.services.single_flight import SingleFlight, normalize_question
+
+
+class TestSingleFlight:
+
+    def test_normalize_question(self):
+        """Test case and whitespace differences map to the same key"""
+        assert normalize_question("  What is  PEP 8?\n") == normalize_question("what is pep 8?")
+
+    def test_concurrent_identical_calls_share_one_computation(self):
+        """Test N concurrent callers with the same key trigger a single call"""
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"answer": "42"}
+
+        async def main():
+            single_flight = SingleFlight("test")
+            results = await asyncio.gather(*(single_flight.run("key", compute) for _ in range(10)))
+            return single_flight, results
+
+        single_flight, results = asyncio.run(main())
+
+        assert len(calls) == 1
+        assert all(result == {"answer": "42"} for result in results)
+        assert len(single_flight) == 0
+
+    def test_different_keys_run_independently(self):
+        """Test calls with different keys are not coalesced"""
+        calls = []
+
+        async def compute(key):
+            calls.append(key)
+            await asyncio.sleep(0.01)
+            return key
+
+        async def main():
+            single_flight = SingleFlight("test")
+            return await asyncio.gather(*(single_flight.run(key, lambda key=key: compute(key)) for key in "abc"))
+
+        assert asyncio.run(main()) == ["a", "b", "c"]
+        assert sorted(calls) == ["a", "b", "c"]
+
+    def test_exception_reaches_every_caller(self):
+        """Test a failing computation raises in all coalesced callers"""
+        async def compute():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("LLM failed")
+
+        async def main():
+            single_flight = SingleFlight("test")
+            return await asyncio.gather(*(single_flight.run("key", compute) for _ in range(3)), return_exceptions=True)
+
+        results = asyncio.run(main())
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    def test_cancelled_caller_does_not_cancel_others(self):
+        """Test the shared computation survives cancellation of the first caller"""
+        async def compute():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        async def main():
+            single_flight = SingleFlight("test")
+            first = asyncio.ensure_future(single_flight.run("key", compute))
+            await asyncio.sleep(0)
+            second = asyncio.ensure_future(single_flight.run("key", compute))
+            await asyncio.sleep(0)
+            first.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await first
+            return await second
+
+        assert asyncio.run(main()) == "done"
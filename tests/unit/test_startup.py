@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+import threading
+import pytest
+from unittest.mock import Mock
+from fastapi.testclient import TestClient
+from app.api import endpoints
+from app.main import app
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class TestStartup:
+    def test_importing_the_app_defers_heavy_imports(self):
+        """Test import app.main loads neither the RAG service nor its heavy dependencies"""
+        heavy = ("app.services.rag_service", "chromadb", "langchain", "langchain_openai", "langfuse")
+        code = f"import sys, app.main; print(','.join(m for m in {heavy!r} if m in sys.modules))"
+        env = dict(os.environ, OPENAI_API_KEY="sk-test")
+        output = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, env=env,
+                                capture_output=True, text=True, check=True).stdout
+
+        assert output.strip() == ""
+
+    @pytest.fixture
+    def gated_service(self, monkeypatch):
+        """The app's service holder with a factory that blocks until released"""
+        release = threading.Event()
+        service = Mock()
+
+        def factory():
+            release.wait(5)
+            return service
+
+        monkeypatch.setattr(endpoints.rag_services, "factory", factory)
+        monkeypatch.setattr(endpoints.rag_services, "_instance", None)
+        yield release, service
+        release.set()
+
+    def test_ready_turns_200_once_services_are_built(self, gated_service):
+        """Test /health answers while the services are built in the background and /ready waits for them"""
+        release, service = gated_service
+        service.vector_store.versions.return_value = {"active": "v1", "previous": None, "retired": {}}
+
+        with TestClient(app) as client:
+            health = client.get("/health")
+            not_ready = client.get("/ready")
+            release.set()
+            versions = client.get("/index/versions")
+            ready = client.get("/ready")
+
+        assert health.status_code == 200
+        assert (not_ready.status_code, not_ready.json()) == (503, {"status": "starting"})
+        assert versions.json()["active"] == "v1"
+        assert ready.status_code == 200
+        service.close.assert_called_once()
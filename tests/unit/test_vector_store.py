@@ -0,0 +1,436 @@
+import os
+import time
+import pytest
+from unittest.mock import patch
+from langchain_core.documents import Document
+from app.services.vector_store import VectorStore, document_ids
+
+
+def _chunks(texts, source="test"):
+    return [
+        Document(page_content=text, metadata={"source": source, "chunk_id": i, "total_chunks": len(texts)})
+        for i, text in enumerate(texts)
+    ]
+
+
+def _embeddings(documents):
+    return [[float(len(doc.page_content)), 1.0, 0.0] for doc in documents]
+
+
+class TestVectorStore:
+    @pytest.fixture(params=["chroma", "numpy"])
+    def vector_store(self, request, tmp_path):
+        return VectorStore(persist_directory=str(tmp_path / request.param), backend=request.param)
+
+    def test_document_ids_are_deterministic(self):
+        """Test IDs depend on source and content, not on batch position"""
+        first = document_ids(_chunks(["alpha", "beta"]))
+        second = document_ids(_chunks(["beta", "alpha"]))
+        other_source = document_ids(_chunks(["alpha"], source="other"))
+
+        assert first == list(reversed(second))
+        assert other_source[0] != first[0]
+
+    def test_document_ids_unique_for_duplicate_chunks(self):
+        """Test identical chunks in one source still get distinct IDs"""
+        ids = document_ids(_chunks(["same", "same", "same"]))
+
+        assert len(set(ids)) == 3
+
+    def test_diff_documents(self, vector_store):
+        """Test diff classifies added, updated, removed and skipped chunks"""
+        original = _chunks(["one", "two", "three"])
+        vector_store.add_documents(original, _embeddings(original))
+
+        # "one" dropped, "two"/"three" shift position, "four" is new
+        current = _chunks(["two", "three", "four"])
+        diff = vector_store.diff_documents(current)
+
+        assert [doc.page_content for _, doc in diff["added"]] == ["four"]
+        assert [doc.page_content for _, doc in diff["updated"]] == ["two", "three"]
+        assert diff["removed"] == document_ids(original[:1])
+        assert diff["skipped"] == 0
+
+    def test_reingest_unchanged_skips_everything(self, vector_store):
+        """Test unchanged chunks are neither added nor removed, and re-adding does not duplicate"""
+        documents = _chunks(["one", "two"])
+        vector_store.add_documents(documents, _embeddings(documents))
+        vector_store.add_documents(documents, _embeddings(documents))
+
+        diff = vector_store.diff_documents(documents)
+
+        assert vector_store.backend.count() == 2
+        assert diff == {"added": [], "updated": [], "removed": [], "skipped": 2}
+
+    def test_diff_ignores_other_sources(self, vector_store):
+        """Test chunks of sources not being ingested are never removed"""
+        pep8 = _chunks(["style"], source="PEP 8")
+        vector_store.add_documents(pep8, _embeddings(pep8))
+
+        diff = vector_store.diff_documents(_chunks(["variables"], source="Think Python"))
+
+        assert diff["removed"] == []
+
+    def test_diff_of_incomplete_source_removes_nothing(self, vector_store):
+        """Test chunks missing from a partly loaded source are kept"""
+        original = _chunks(["one", "two", "three"])
+        vector_store.add_documents(original, _embeddings(original))
+
+        # "one" and "two" come from a page that failed to load
+        diff = vector_store.diff_documents(_chunks(["three", "four"]), complete=False)
+
+        assert [doc.page_content for _, doc in diff["added"]] == ["four"]
+        assert diff["removed"] == []
+
+    def test_writes_bump_version(self, vector_store):
+        """Test every write changes the version used to invalidate derived caches"""
+        documents = _chunks(["one", "two"])
+        versions = [vector_store.version]
+
+        vector_store.add_documents(documents, _embeddings(documents))
+        versions.append(vector_store.version)
+        vector_store.update_metadata(document_ids(documents[:1]), documents[:1])
+        versions.append(vector_store.version)
+        vector_store.delete_documents(document_ids(documents[1:]))
+        versions.append(vector_store.version)
+
+        assert len(set(versions)) == 4
+
+    def test_similarity_search_orders_by_distance(self, vector_store):
+        """Test search returns the nearest chunks first with squared L2 distances"""
+        documents = _chunks(["east", "north", "west"])
+        vector_store.add_documents(documents, [[1.0, 0.0], [0.0, 1.0], [-1.0, 0.0]])
+
+        results = vector_store.similarity_search([0.8, 0.6], k=2)
+
+        assert [result["text"] for result in results] == ["east", "north"]
+        assert results[0]["metadata"] == documents[0].metadata
+        assert results[0]["distance"] == pytest.approx(0.4, abs=1e-5)
+        assert results[1]["distance"] == pytest.approx(0.8, abs=1e-5)
+
+    def test_collection_stats(self, vector_store):
+        """Test stats count chunks per source"""
+        documents = _chunks(["one", "two"], source="PEP 8") + _chunks(["three"], source="Think Python")
+        vector_store.add_documents(documents, _embeddings(documents))
+
+        assert vector_store.get_collection_stats() == {
+            "total_documents": 3,
+            "sources": {"PEP 8": 2, "Think Python": 1}
+        }
+
+
+    def test_similarity_search_batch_matches_single_searches(self, vector_store):
+        """Test a batched search returns the same results as one search per query"""
+        documents = _chunks(["east", "north", "west", "south"])
+        vector_store.add_documents(documents, [[1.0, 0.0], [0.0, 1.0], [-1.0, 0.0], [0.0, -1.0]])
+        queries = [[0.8, 0.6], [-0.1, -1.0], [-1.0, 0.2]]
+
+        batch = vector_store.similarity_search_batch(queries, k=2)
+
+        assert batch == [vector_store.similarity_search(query, k=2) for query in queries]
+        assert [[result["text"] for result in results] for results in batch] == [
+            ["east", "north"], ["south", "west"], ["west", "north"]
+        ]
+
+    def test_similarity_search_source_filter_and_max_distance(self, vector_store):
+        """Test the source filter is applied before top-k and max_distance cuts far results"""
+        pep8 = _chunks(["indentation", "line length"], source="PEP 8")
+        think_python = _chunks(["variables"], source="Think Python")
+        vector_store.add_documents(pep8 + think_python, [[0.0, 1.0], [-1.0, 0.0], [1.0, 0.0]])
+
+        filtered = vector_store.similarity_search([1.0, 0.0], k=1, sources=["PEP 8"])
+        batch = vector_store.similarity_search_batch([[1.0, 0.0]], k=3, sources=["PEP 8"], max_distance=2.5)
+        nearby = vector_store.similarity_search([1.0, 0.0], k=3, max_distance=0.5)
+
+        assert [result["text"] for result in filtered] == ["indentation"]
+        assert [result["text"] for result in batch[0]] == ["indentation"]
+        assert [result["text"] for result in nearby] == ["variables"]
+        assert vector_store.similarity_search([1.0, 0.0], k=3, sources=["Unknown"]) == []
+
+    def test_source_counts_follow_writes_and_persist(self, vector_store):
+        """Test per-source counts are updated on add, re-add and delete and survive a reopen"""
+        pep8 = _chunks(["one", "two", "three"], source="PEP 8")
+        think_python = _chunks(["four"], source="Think Python")
+        vector_store.add_documents(pep8 + think_python, _embeddings(pep8 + think_python))
+        vector_store.add_documents(pep8, _embeddings(pep8))
+        vector_store.delete_documents(document_ids(pep8[:1]))
+        vector_store.delete_documents(document_ids(pep8[:1]))
+
+        expected = {"total_documents": 3, "sources": {"PEP 8": 2, "Think Python": 1}}
+        assert vector_store.get_collection_stats() == expected
+
+        reopened = VectorStore(persist_directory=os.path.dirname(vector_store.source_counts.path),
+                               backend=vector_store.backend.name)
+        assert reopened.get_collection_stats() == expected
+
+    def test_stale_source_counts_are_rebuilt(self, vector_store):
+        """Test counts that disagree with the backend are rebuilt from a full scan on load"""
+        documents = _chunks(["one", "two"], source="PEP 8")
+        vector_store.add_documents(documents, _embeddings(documents))
+        with open(vector_store.source_counts.path, "w") as f:
+            f.write('{"total": 7, "sources": {"PEP 8": 7}}')
+
+        reopened = VectorStore(persist_directory=os.path.dirname(vector_store.source_counts.path),
+                               backend=vector_store.backend.name)
+
+        assert reopened.get_collection_stats()["sources"] == {"PEP 8": 2}
+
+    def test_hybrid_search_fuses_keyword_matches(self, vector_store):
+        """Test hybrid search ranks an exact keyword match first and fills lexical-only hits"""
+        documents = _chunks(["east wind", "north star", "E501 line too long"])
+        vector_store.add_documents(documents, [[1.0, 0.0], [0.0, 1.0], [-1.0, 0.0]])
+
+        hybrid = vector_store.similarity_search([1.0, 0.0], k=2, query_text="what is E501")
+        filtered = vector_store.similarity_search([1.0, 0.0], k=2, max_distance=0.5, query_text="what is E501")
+        batch = vector_store.similarity_search_batch([[1.0, 0.0]], k=2, query_texts=["what is E501"])
+
+        assert [result["text"] for result in hybrid] == ["E501 line too long", "east wind"]
+        assert [result["text"] for result in filtered] == ["east wind", "E501 line too long"]
+        assert filtered[1]["distance"] is None
+        assert batch == [hybrid]
+        assert [result["text"] for result in vector_store.lexical_search("E501", k=5)] == ["E501 line too long"]
+
+    def test_lexical_index_follows_writes_and_is_rebuilt(self, vector_store):
+        """Test the BM25 index drops deleted chunks and is rebuilt on load when missing"""
+        documents = _chunks(["pep8 indentation", "pep8 naming"], source="PEP 8")
+        vector_store.add_documents(documents, _embeddings(documents))
+        vector_store.delete_documents(document_ids(documents[:1]))
+        os.remove(vector_store.lexical_index.path)
+
+        reopened = VectorStore(persist_directory=os.path.dirname(vector_store.lexical_index.path),
+                               backend=vector_store.backend.name)
+
+        assert [result["text"] for result in reopened.lexical_search("pep8", k=5)] == ["pep8 naming"]
+
+
+class TestIndexVersions:
+    @pytest.fixture(params=["chroma", "numpy"])
+    def vector_store(self, request, tmp_path):
+        return VectorStore(persist_directory=str(tmp_path / request.param), backend=request.param)
+
+    def test_new_version_serves_only_after_activation(self, vector_store):
+        """Test a rebuild starts from a copy of the active version and is invisible until activated"""
+        original = _chunks(["one", "two"])
+        vector_store.add_documents(original, [[1.0, 0.0], [0.0, 1.0]])
+
+        index = vector_store.create_version()
+        index.delete_documents(document_ids(original[:1]))
+        index.add_documents(_chunks(["three"], source="other"), [[-1.0, 0.0]])
+        before = vector_store.similarity_search([1.0, 0.0], k=5)
+        version_before = vector_store.version
+        vector_store.activate(index)
+        after = vector_store.similarity_search([1.0, 0.0], k=5)
+
+        assert sorted(result["text"] for result in before) == ["one", "two"]
+        assert sorted(result["text"] for result in after) == ["three", "two"]
+        assert vector_store.version != version_before
+        assert vector_store.get_collection_stats() == {"total_documents": 2, "sources": {"test": 1, "other": 1}}
+        assert [result["text"] for result in vector_store.lexical_search("three")] == ["three"]
+        assert vector_store.versions() == {"active": "v2", "previous": "v1", "retired": {}}
+
+    def test_rollback_switches_back_and_forth(self, vector_store):
+        """Test rollback serves the previous version again and a second rollback undoes it"""
+        vector_store.add_documents(_chunks(["one"]), [[1.0, 0.0]])
+        index = vector_store.create_version()
+        index.add_documents(_chunks(["two"]), [[0.0, 1.0]])
+        vector_store.activate(index)
+
+        rolled_back = vector_store.rollback()
+        count_after_rollback = vector_store.backend.count()
+        vector_store.rollback()
+
+        assert rolled_back["active"] == "v1" and rolled_back["previous"] == "v2"
+        assert count_after_rollback == 1
+        assert vector_store.active_version == "v2"
+        assert vector_store.backend.count() == 2
+
+    def test_rollback_without_previous_version(self, vector_store):
+        with pytest.raises(ValueError, match="No previous index version"):
+            vector_store.rollback()
+
+    def test_retired_versions_are_collected_after_the_grace_period(self, vector_store):
+        """Test the version before the rollback target is deleted once its grace period has passed"""
+        for text in ["one", "two"]:
+            index = vector_store.create_version()
+            index.add_documents(_chunks([text]), [[1.0, 0.0]])
+            vector_store.activate(index)
+        retired_at = vector_store.versions()["retired"]["v1"]
+
+        kept = vector_store.collect_garbage(now=retired_at + 1)
+        collected = vector_store.collect_garbage(now=retired_at + 10 ** 6)
+
+        assert kept == []
+        assert collected == ["v1"]
+        assert vector_store.versions() == {"active": "v3", "previous": "v2", "retired": {}}
+        assert not os.path.exists(os.path.join(vector_store.persist_directory, "source_counts.json"))
+        assert vector_store.rollback()["active"] == "v2"
+
+    def test_active_version_survives_reopen(self, vector_store):
+        """Test the manifest selects the active version on load, keeps the unfinished one and removes strays"""
+        index = vector_store.create_version()
+        index.add_documents(_chunks(["one"]), [[1.0, 0.0]])
+        vector_store.activate(index)
+        unfinished = vector_store.create_version()
+        unfinished.add_documents(_chunks(["two"]), [[0.0, 1.0]])
+        stray = os.path.join(vector_store.persist_directory, "versions", "v9")
+        os.makedirs(stray)
+
+        reopened = VectorStore(persist_directory=vector_store.persist_directory, backend=vector_store.backend_name)
+        resumed = reopened.resume_version()
+
+        assert reopened.active_version == "v2"
+        assert reopened.get_collection_stats()["total_documents"] == 1
+        assert resumed.name == unfinished.name
+        assert resumed.backend.count() == 2
+        assert not os.path.exists(stray)
+
+    def test_unfinished_version_of_a_replaced_base_is_not_resumed(self, vector_store):
+        """Test a version copied from a version that is no longer active is deleted instead of resumed"""
+        index = vector_store.create_version()
+        vector_store.activate(index)
+        unfinished = vector_store.create_version()
+        vector_store.rollback()
+
+        assert vector_store.resume_version() is None
+        assert not os.path.exists(unfinished.directory)
+
+    def test_discard_deletes_an_unfinished_version(self, vector_store):
+        index = vector_store.create_version()
+
+        vector_store.discard(index)
+
+        assert not os.path.exists(index.directory)
+        assert vector_store.active_version == "v1"
+
+    def test_stores_sharing_a_directory_follow_each_other(self, vector_store):
+        """Test a store opened by another worker numbers its versions after ours and serves what we activated"""
+        other = VectorStore(persist_directory=vector_store.persist_directory, backend=vector_store.backend_name)
+        index = vector_store.create_version()
+        index.add_documents(_chunks(["one"]), [[1.0, 0.0]])
+        vector_store.activate(index)
+
+        other.refresh()
+        results = other.similarity_search([1.0, 0.0], k=5)
+        active = other.active_version
+        second = other.create_version()
+
+        assert [result["text"] for result in results] == ["one"]
+        assert active == "v2"
+        assert second.name == "v3"
+
+    def test_rollback_by_another_store_is_picked_up(self, vector_store):
+        """Test a rollback starts from the current manifest and other stores switch to its result"""
+        other = VectorStore(persist_directory=vector_store.persist_directory, backend=vector_store.backend_name)
+        vector_store.activate(vector_store.create_version())
+        version_before = vector_store.version
+
+        versions = other.rollback()
+
+        assert versions == {"active": "v1", "previous": "v2", "retired": {}}
+        vector_store.refresh()
+        assert vector_store.active_version == "v1"
+        assert vector_store.version != version_before
+
+    def test_manifest_is_followed_in_the_background(self, vector_store):
+        """Test a store switches to a version another store activated without serving a search"""
+        with patch('app.services.vector_store.INDEX_MANIFEST_CHECK_SECONDS', 0.01):
+            other = VectorStore(persist_directory=vector_store.persist_directory, backend=vector_store.backend_name)
+            vector_store.activate(vector_store.create_version())
+            deadline = time.monotonic() + 5
+            while other.active_version != "v2" and time.monotonic() < deadline:
+                time.sleep(0.01)
+            other.close()
+
+        assert other.active_version == "v2"
+
+
+class TestNumpyBackend:
+
+    def test_delete_keeps_rows_contiguous_and_survives_reopen(self, tmp_path):
+        """Test deleted rows are refilled from the end and the index persists on disk"""
+        path = str(tmp_path / "numpy")
+        vector_store = VectorStore(persist_directory=path, backend="numpy")
+        documents = _chunks(["a", "bb", "ccc", "dddd"])
+        vector_store.add_documents(documents, [[1.0, 0.0], [0.0, 1.0], [-1.0, 0.0], [0.0, -1.0]])
+        vector_store.delete_documents(document_ids(documents[:2]))
+        vector_store.backend.close()
+
+        reopened = VectorStore(persist_directory=path, backend="numpy")
+        results = reopened.similarity_search([0.0, -1.0], k=5)
+
+        assert reopened.backend.count() == 2
+        assert [result["text"] for result in results] == ["dddd", "ccc"]
+        assert results[0]["distance"] == pytest.approx(0.0, abs=1e-6)
+
+    def test_index_grows_past_initial_capacity(self, tmp_path):
+        """Test the memory-mapped matrix is grown when rows run out"""
+        vector_store = VectorStore(persist_directory=str(tmp_path / "numpy"), backend="numpy")
+        documents = _chunks([f"chunk {i}" for i in range(1500)])
+        embeddings = [[float(i), 1.0] for i in range(1500)]
+        vector_store.add_documents(documents, embeddings)
+
+        results = vector_store.similarity_search([1499.0, 1.0], k=1)
+
+        assert vector_store.backend.count() == 1500
+        assert results[0]["distance"] == pytest.approx(0.0, abs=1e-6)
+
+    def test_search_scores_without_holding_the_lock(self, tmp_path):
+        """Test the matrix product runs outside the backend lock"""
+        vector_store = VectorStore(persist_directory=str(tmp_path / "numpy"), backend="numpy")
+        vector_store.add_documents(_chunks(["a", "bb"]), [[1.0, 0.0], [0.0, 1.0]])
+        backend = vector_store.backend
+        score = backend._score
+        lock_held = []
+        backend._score = lambda *args: lock_held.append(backend._lock.locked()) or score(*args)
+
+        results = vector_store.similarity_search([0.0, 1.0], k=1)
+
+        assert lock_held == [False]
+        assert results[0]["text"] == "bb"
+
+    def test_search_overlapping_a_delete_scores_again(self, tmp_path):
+        """Test a search whose rows were moved by a concurrent delete does not return the wrong records"""
+        vector_store = VectorStore(persist_directory=str(tmp_path / "numpy"), backend="numpy")
+        documents = _chunks(["a", "bb", "ccc"])
+        vector_store.add_documents(documents, [[1.0, 0.0], [0.0, 1.0], [-1.0, 0.0]])
+        backend = vector_store.backend
+        score = backend._score
+        calls = []
+
+        def score_during_delete(*args):
+            calls.append(backend._lock.locked())
+            result = score(*args)
+            if len(calls) == 1:
+                # "ccc" moves into the row of "a" after the first scoring
+                backend.delete(document_ids(documents[:1]))
+            return result
+
+        backend._score = score_during_delete
+        results = backend.query_batch([[1.0, 0.0]], k=1)
+
+        assert calls == [False, True]
+        assert results[0][0]["text"] == "bb"
+        assert results[0][0]["distance"] == pytest.approx(2.0, abs=1e-6)
+
+    def test_unknown_backend(self, tmp_path):
+        """Test an unknown backend name is rejected"""
+        with pytest.raises(ValueError, match="Unknown vector store backend"):
+            VectorStore(persist_directory=str(tmp_path), backend="faiss")
+
+    def test_default_backend_warns_about_existing_chroma_index(self, tmp_path):
+        """Test the numpy default points at an existing chroma index instead of silently starting empty"""
+        directories = {"chroma": str(tmp_path / "chroma_db"), "numpy": str(tmp_path / "numpy_index")}
+        os.makedirs(directories["chroma"])
+        open(os.path.join(directories["chroma"], "chroma.sqlite3"), "w").close()
+
+        with patch('app.services.vector_store.DEFAULT_PERSIST_DIRECTORIES', directories), \
+                patch('app.services.vector_store.get_logger') as mock_get_logger:
+            VectorStore(backend="numpy").close()
+            VectorStore(backend="numpy").close()
+
+        warnings = [
+            call for call in mock_get_logger.return_value.warning.call_args_list
+            if call.kwargs["extra"]["event_type"] == "vector_store_other_backend_found"
+        ]
+        assert len(warnings) == 1
+        assert "VECTOR_STORE_BACKEND=chroma" in warnings[0].args[0]
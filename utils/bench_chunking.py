@@ -0,0 +1,130 @@
+"""
+Chunking throughput and peak memory: the previous splitter vs. the chunking engine.
+
+Splits a Think Python-sized text (~450 KB; pass --text-file to use a real dump
+of the book) and a PEP 8-sized text and reports chunks per second and peak
+traced memory (tracemalloc, so the pool's worker processes are not included)
+for:
+
+  previous        RecursiveCharacterTextSplitter by characters, full Document list
+  characters      Chunker by characters, Documents generated one at a time
+  tokens          Chunker by tokens with the cached token counter
+  tokens-uncached tokens without the per-splitter length cache
+  pool            both sources at once, the large one on the process pool
+
+Without network access tiktoken cannot download its encoding and token
+counts fall back to the character estimate; the output says which was used.
+
+Run from the repository root:
+    python -m utils.bench_chunking --repeat 3
+"""
+
+import argparse
+import os
+import random
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+WORDS = (
+    "a variable is name that refers to value the function returns list loop string object class method "
+    "python code statement expression module import def return if else for while in and or not"
+).split()
+
+
+def _synthetic_text(size: int, seed: int) -> str:
+    rng = random.Random(seed)
+    paragraphs = []
+    length = 0
+    while length < size:
+        sentences = [
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 18))).capitalize() + "."
+            for _ in range(rng.randint(2, 8))
+        ]
+        paragraphs.append(" ".join(sentences))
+        length += len(paragraphs[-1]) + 2
+    return "\n\n".join(paragraphs)
+
+
+def _measure(fn, repeat):
+    """Average wall time over repeat runs, then peak memory in one traced run (tracing slows it down)"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        chunks = fn()
+    elapsed = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return chunks, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--text-file", help="Think Python text to split instead of the synthetic one")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ.setdefault("LANGFUSE_TRACING_ENABLED", "false")
+    from langchain.schema import Document
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from app.services import chunking
+    from app.services.chunking import Chunker, iter_chunk_documents
+    from app.services.token_counter import get_token_counter
+
+    if args.text_file:
+        with open(args.text_file, "r", encoding="utf-8") as f:
+            think_python = f.read()
+    else:
+        think_python = _synthetic_text(450_000, seed=0)
+    pep8 = _synthetic_text(60_000, seed=1)
+
+    def previous():
+        splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200, length_function=len)
+        chunks = splitter.split_text(think_python)
+        documents = [
+            Document(page_content=chunk, metadata={"source": "Think Python", "chunk_id": i,
+                                                   "total_chunks": len(chunks)})
+            for i, chunk in enumerate(chunks)
+        ]
+        return len(documents)
+
+    def engine(unit):
+        def run():
+            chunker = Chunker(unit)
+            return sum(1 for _ in iter_chunk_documents(chunker.splitter.split_text(think_python), "Think Python"))
+        return run
+
+    def tokens_uncached():
+        splitter = RecursiveCharacterTextSplitter(chunk_size=256, chunk_overlap=50,
+                                                  length_function=get_token_counter().count)
+        return sum(1 for _ in iter_chunk_documents(splitter.split_text(think_python), "Think Python"))
+
+    def pool():
+        chunker = Chunker("characters")
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(chunker.split, text) for text in (think_python, pep8)]
+            return sum(len(future.result()) for future in futures)
+
+    def serial():
+        chunker = Chunker("characters")
+        return sum(len(chunker.splitter.split_text(text)) for text in (think_python, pep8))
+
+    token_counter = get_token_counter()
+    print(f"think_python={len(think_python)} chars pep8={len(pep8)} chars cpus={os.cpu_count()} "
+          f"token counts={'exact (' + token_counter.encoding_name + ')' if token_counter.exact else 'estimated'}")
+
+    # Start the pool's workers outside the measurement
+    chunking.CHUNKING_POOL_MIN_CHARS = 100_000
+    chunking._get_pool().submit(chunking._split_in_worker, "warm-up", "characters", 1000, 200).result()
+
+    print(f"{'mode':>16} {'chunks':>7} {'ms':>8} {'chunks/s':>9} {'peak MB':>8}")
+    for label, fn in [("previous", previous), ("characters", engine("characters")), ("tokens", engine("tokens")),
+                      ("tokens-uncached", tokens_uncached), ("serial (2 src)", serial), ("pool (2 src)", pool)]:
+        chunks, elapsed, peak = _measure(fn, args.repeat)
+        print(f"{label:>16} {chunks:>7} {elapsed * 1000:>8.1f} {chunks / elapsed:>9.0f} {peak / 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
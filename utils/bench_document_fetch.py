@@ -0,0 +1,60 @@
+"""
+Benchmark DocumentService.load_all_documents against a local fixture server.
+
+Every page (19 Think Python chapters + PEP 8) is served with the same artificial
+latency. With serial fetching the wall time is roughly the sum of all fetches;
+with concurrent fetching it should approach the slowest single fetch. A final
+warm run revalidates every page against the source cache (304s, no parsing or
+chunking).
+
+Run from the repository root:
+    python -m utils.bench_document_fetch --latency 0.2
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from utils.fake_source_server import FakeSourceServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.2, help="per-page latency (seconds)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 20])
+    args = parser.parse_args()
+
+    os.environ.setdefault("LANGFUSE_TRACING_ENABLED", "false")
+    from app.services import document_service
+    from app.services.source_cache import SourceCache
+
+    server = FakeSourceServer(latency_seconds=args.latency).start()
+    try:
+        document_service.THINK_PYTHON_BASE_URL = server.think_python_base_url
+        document_service.PEP8_URL = server.pep8_url
+        service = document_service.DocumentService()
+
+        pages = 20
+        print(f"pages={pages} latency={args.latency * 1000:.0f}ms (serial lower bound {pages * args.latency:.2f}s)")
+        print(f"{'run':>16} {'wall s':>8} {'chunks':>7}")
+        with tempfile.TemporaryDirectory() as cache_root:
+            for concurrency in args.concurrency:
+                document_service.DOCUMENT_FETCH_CONCURRENCY = concurrency
+                document_service._session = None  # resize the connection pool
+                document_service._source_cache = SourceCache(os.path.join(cache_root, str(concurrency)))
+                start = time.perf_counter()
+                documents = service.load_all_documents()
+                elapsed = time.perf_counter() - start
+                print(f"{f'cold, c={concurrency}':>16} {elapsed:>8.2f} {len(documents):>7}")
+
+            start = time.perf_counter()
+            documents = service.load_all_documents()
+            elapsed = time.perf_counter() - start
+            print(f"{f'warm, c={concurrency}':>16} {elapsed:>8.2f} {len(documents):>7}  ({server.not_modified_count} x 304)")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
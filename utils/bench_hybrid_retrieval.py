@@ -0,0 +1,141 @@
+"""
+Latency and recall of vector, BM25 and hybrid (RRF) retrieval.
+
+Builds a labeled corpus shaped like the style-guide chunks the service indexes:
+each chunk documents one lint rule (an identifier such as E501 or W605) in
+prose that shares most of its vocabulary with the other rules, padded with
+generic filler chunks. Every question asks about one rule by its identifier,
+and the chunk documenting that rule is the only relevant result.
+
+--embeddings hashed (default) uses a local character-trigram hashing
+embedding so the benchmark runs offline; --embeddings openai embeds the
+corpus and questions with the configured OpenAI model instead, which is what
+the recall numbers are meant for. Lexical recall does not depend on it.
+
+Run from the repository root:
+    python -m utils.bench_hybrid_retrieval --filler 500
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+DIMENSIONS = 1536
+K = 5
+
+PREFIXES = ["E1", "E2", "E3", "E5", "E7", "W1", "W2", "W5", "W6"]
+SUBJECTS = [
+    "indentation", "whitespace", "blank lines", "line length", "imports", "comparisons",
+    "statements", "escape sequences", "operators", "comments", "trailing commas", "names"
+]
+PROBLEMS = [
+    "is not a multiple of four", "is missing around the operator", "is too long for the limit",
+    "appears after the statement", "is deprecated and should be replaced", "is unexpected here",
+    "should be avoided in new code", "is ambiguous to readers"
+]
+FILLER = [
+    "Readability counts, and code is read much more often than it is written.",
+    "A function should do one thing and its name should say what that thing is.",
+    "Variables hold references to objects; assignment never copies the object itself.",
+    "Consistency within a project is more important than consistency with this guide.",
+    "Lists are mutable sequences, while tuples are immutable and often heterogeneous.",
+    "When in doubt, use your best judgment and look at other examples in the codebase."
+]
+
+
+def _corpus(filler: int, seed: int = 0):
+    """Return (texts, sources, questions, relevant chunk index per question)"""
+    rng = random.Random(seed)
+    texts, sources, questions, relevant = [], [], [], []
+    for prefix in PREFIXES:
+        for number in range(1, 12):
+            code = f"{prefix}{number:02d}"
+            subject, problem = rng.choice(SUBJECTS), rng.choice(PROBLEMS)
+            relevant.append(len(texts))
+            texts.append(f"{code}: the check reports code where the {subject} {problem}. "
+                         f"Style checkers emit {code} so the {subject} can be fixed before review.")
+            sources.append("PEP 8")
+            questions.append(f"Why does the style checker report {code}?")
+    for i in range(filler):
+        texts.append(" ".join(rng.sample(FILLER, 3)))
+        sources.append("Think Python")
+    return texts, sources, questions, relevant
+
+
+def _hashed_embeddings(texts):
+    """Character-trigram hashing, L2-normalized: a cheap offline stand-in for a text embedding model"""
+    matrix = np.zeros((len(texts), DIMENSIONS), dtype=np.float32)
+    for row, text in enumerate(texts):
+        padded = f"  {text.lower()}  "
+        for i in range(len(padded) - 2):
+            matrix[row, zlib.crc32(padded[i:i + 3].encode("utf-8")) % DIMENSIONS] += 1.0
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix.tolist()
+
+
+def _percentile(values, q):
+    return float(np.percentile(values, q)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filler", type=int, default=500)
+    parser.add_argument("--backend", default="numpy")
+    parser.add_argument("--embeddings", choices=["hashed", "openai"], default="hashed")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ.setdefault("LANGFUSE_TRACING_ENABLED", "false")
+    from langchain.schema import Document
+    from app.services.vector_store import VectorStore
+
+    texts, sources, questions, relevant = _corpus(args.filler)
+    if args.embeddings == "openai":
+        from app.services.embedding_service import EmbeddingService
+        embedding_service = EmbeddingService()
+        chunk_embeddings = embedding_service.embeddings.embed_documents(texts)
+        question_embeddings = embedding_service.embeddings.embed_documents(questions)
+    else:
+        chunk_embeddings = _hashed_embeddings(texts)
+        question_embeddings = _hashed_embeddings(questions)
+
+    ids = [str(i) for i in range(len(texts))]
+    with tempfile.TemporaryDirectory() as root:
+        vector_store = VectorStore(persist_directory=os.path.join(root, args.backend), backend=args.backend)
+        documents = [
+            Document(page_content=text, metadata={"source": source, "chunk_id": i})
+            for i, (text, source) in enumerate(zip(texts, sources))
+        ]
+        vector_store.add_documents(documents, chunk_embeddings, ids=ids)
+
+        modes = {
+            "vector": lambda q, e: vector_store.similarity_search(e, k=K),
+            "lexical": lambda q, e: vector_store.lexical_search(q, k=K),
+            "hybrid": lambda q, e: vector_store.similarity_search(e, k=K, query_text=q),
+        }
+        print(f"chunks={len(texts)} questions={len(questions)} k={K} backend={args.backend} "
+              f"embeddings={args.embeddings}")
+        print(f"{'mode':>8} {'p50 ms':>8} {'p99 ms':>8} {f'recall@{K}':>9} {'MRR':>6}")
+        for mode, search in modes.items():
+            latencies, hits, reciprocal_ranks = [], 0, 0.0
+            for _ in range(args.repeat):
+                for question, embedding, target in zip(questions, question_embeddings, relevant):
+                    start = time.perf_counter()
+                    results = search(question, embedding)
+                    latencies.append(time.perf_counter() - start)
+                    ranked = [result["id"] for result in results]
+                    if ids[target] in ranked:
+                        hits += 1
+                        reciprocal_ranks += 1.0 / (ranked.index(ids[target]) + 1)
+            total = len(questions) * args.repeat
+            print(f"{mode:>8} {_percentile(latencies, 50):>8.3f} {_percentile(latencies, 99):>8.3f} "
+                  f"{hits / total:>9.2f} {reciprocal_ranks / total:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
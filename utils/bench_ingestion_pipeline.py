@@ -0,0 +1,91 @@
+"""
+Compare phased ingestion with the streaming ingestion pipeline.
+
+Sources come from the local fixture server and embeddings from the fake OpenAI
+server, both with artificial latency. The phased run loads every chunk, embeds
+them in one call and stores them in one call; the pipelined run overlaps the
+stages. Reports wall time, per-stage busy time and, with --trace-memory, peak
+traced memory.
+
+Run from the repository root:
+    python -m utils.bench_ingestion_pipeline --page-latency 0.2 --embedding-latency 0.2
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from utils.fake_openai_server import FakeOpenAIServer
+from utils.fake_source_server import FakeSourceServer
+
+
+def _phased(document_service, embedding_service, vector_store):
+    documents = document_service.load_all_documents()
+    embeddings = embedding_service.generate_embeddings(documents)
+    vector_store.add_documents(documents, embeddings)
+    return {"added": len(documents)}
+
+
+def _measure(label, fn, trace_memory):
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak_text = ""
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_text = f" peak={peak / 1e6:.1f}MB"
+    stages = result.get("stage_seconds", {})
+    stage_text = " ".join(f"{name}={seconds:.2f}s" for name, seconds in stages.items())
+    print(f"{label:>10} wall={elapsed:.2f}s{peak_text} added={result['added']} {stage_text}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-latency", type=float, default=0.2)
+    parser.add_argument("--embedding-latency", type=float, default=0.2)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--trace-memory", action="store_true", help="report peak memory (tracemalloc slows every stage)")
+    args = parser.parse_args()
+
+    openai_server = FakeOpenAIServer(latency_seconds=args.embedding_latency).start()
+    source_server = FakeSourceServer(latency_seconds=args.page_latency).start()
+    os.environ["OPENAI_BASE_URL"] = openai_server.base_url
+    os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+    os.environ.setdefault("LANGFUSE_TRACING_ENABLED", "false")
+    os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+    os.environ["SOURCE_CACHE_ENABLED"] = "false"
+
+    from app.services import document_service as document_module
+    from app.services.embedding_service import EmbeddingService
+    from app.services.ingestion_pipeline import IngestionPipeline
+    from app.services.vector_store import VectorStore
+
+    document_module.THINK_PYTHON_BASE_URL = source_server.think_python_base_url
+    document_module.PEP8_URL = source_server.pep8_url
+
+    try:
+        document_service = document_module.DocumentService()
+        embedding_service = EmbeddingService()
+        embedding_service.embeddings.check_embedding_ctx_length = False
+        # One HTTP request per batch so the latency applies per batch in both runs
+        embedding_service.embeddings.chunk_size = args.batch_size
+
+        with tempfile.TemporaryDirectory() as root:
+            vector_store = VectorStore(persist_directory=os.path.join(root, "phased"))
+            _measure("phased", lambda: _phased(document_service, embedding_service, vector_store), args.trace_memory)
+
+            vector_store = VectorStore(persist_directory=os.path.join(root, "pipelined"))
+            pipeline = IngestionPipeline(document_service, embedding_service, vector_store, batch_size=args.batch_size)
+            _measure("pipelined", lambda: pipeline.run(), args.trace_memory)
+    finally:
+        source_server.stop()
+        openai_server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+GET /health requests per second on one uvicorn worker with the metrics and
+logging middleware implemented as:
+
+  none   no middleware (the ceiling)
+  base   BaseHTTPMiddleware subclasses (the previous implementation)
+  asgi   plain ASGI middleware (app/middleware/)
+
+The app is the API router without the lifespan, so the RAG service is never
+built. The load comes from keep-alive connections speaking minimal HTTP/1.1
+over asyncio streams, to leave as much CPU as possible to the server.
+
+Run from the repository root:
+    python -m utils.bench_middleware --seconds 5 --connections 32
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VARIANTS = ("none", "base", "asgi")
+
+REQUEST = b"GET /health HTTP/1.1\r\nHost: bench\r\n\r\n"
+
+
+def _base_http_middleware():
+    """The previous BaseHTTPMiddleware implementations, kept here for comparison"""
+    from starlette.middleware.base import BaseHTTPMiddleware
+    from app.core.logging_config import get_logger, log_request, log_response
+    from app.core.metrics import metrics_recorder
+    from app.middleware.metrics_middleware import _get_endpoint_name
+
+    class MetricsMiddleware(BaseHTTPMiddleware):
+        async def dispatch(self, request, call_next):
+            method, endpoint = request.method, _get_endpoint_name(request.url.path)
+            timing = metrics_recorder.record_http_request_start(method, endpoint)
+            try:
+                response = await call_next(request)
+            except Exception:
+                metrics_recorder.record_http_request_end(timing, 500)
+                raise
+            metrics_recorder.record_http_request_end(timing, response.status_code)
+            return response
+
+    class LoggingMiddleware(BaseHTTPMiddleware):
+        logger = get_logger("middleware")
+
+        async def dispatch(self, request, call_next):
+            start_time = time.time()
+            method, path = request.method, request.url.path
+            log_request(self.logger, method, path)
+            response = await call_next(request)
+            log_response(self.logger, method, path, response.status_code, (time.time() - start_time) * 1000)
+            return response
+
+    return MetricsMiddleware, LoggingMiddleware
+
+
+def create_app():
+    """uvicorn --factory entry point; the variant comes from BENCH_MIDDLEWARE"""
+    from fastapi import FastAPI
+    from app.api.endpoints import router
+    from app.core.logging_config import setup_logging
+
+    setup_logging()
+    app = FastAPI()
+    variant = os.environ["BENCH_MIDDLEWARE"]
+    if variant == "base":
+        metrics_middleware, logging_middleware = _base_http_middleware()
+    elif variant == "asgi":
+        from app.middleware.logging_middleware import LoggingMiddleware as logging_middleware
+        from app.middleware.metrics_middleware import MetricsMiddleware as metrics_middleware
+    if variant != "none":
+        app.add_middleware(metrics_middleware)
+        app.add_middleware(logging_middleware)
+    app.include_router(router)
+    return app
+
+
+async def _connection(port: int, deadline: float, counts: list):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        while time.perf_counter() < deadline:
+            writer.write(REQUEST)
+            headers = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in headers.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            if not headers.startswith(b"HTTP/1.1 200"):
+                raise RuntimeError(headers.split(b"\r\n", 1)[0].decode())
+            counts[0] += 1
+    finally:
+        writer.close()
+
+
+async def _load(port: int, connections: int, seconds: float) -> float:
+    counts = [0]
+    start = time.perf_counter()
+    await asyncio.gather(*(_connection(port, start + seconds, counts) for _ in range(connections)))
+    return counts[0] / (time.perf_counter() - start)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(port: int, timeout: float = 30.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError("server did not start")
+
+
+def _run_variant(variant: str, args) -> float:
+    port = _free_port()
+    env = dict(os.environ, BENCH_MIDDLEWARE=variant, OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "sk-fake"))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "utils.bench_middleware:create_app", "--factory",
+         "--port", str(port), "--workers", "1", "--log-level", "warning", "--no-access-log"],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        _wait_for(port)
+        asyncio.run(_load(port, args.connections, 1.0))  # warm-up
+        return statistics.median(
+            asyncio.run(_load(port, args.connections, args.seconds)) for _ in range(args.repeat)
+        )
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration of each measurement")
+    parser.add_argument("--repeat", type=int, default=3, help="measurements per variant (median is reported)")
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--variants", nargs="+", choices=VARIANTS, default=list(VARIANTS))
+    args = parser.parse_args()
+
+    print(f"GET /health, 1 worker, {args.connections} keep-alive connections, {args.seconds:.0f}s x {args.repeat}")
+    print(f"{'middleware':>10} {'req/s':>8}")
+    for variant in args.variants:
+        print(f"{variant:>10} {_run_variant(variant, args):>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Offline-evaluation style benchmark: N questions sent one by one to POST /query
+vs. in chunks to POST /query/batch, against a local fake OpenAI server.
+
+Reports wall time and the number of embedding and chat requests that reached
+the fake server for each approach.
+
+Run from the repository root:
+    python -m utils.bench_query_batch --latency 0.1 --questions 200
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+
+from utils.bench_query_load import _setup_app
+from utils.fake_openai_server import FakeOpenAIServer
+
+
+async def _serial(client, questions, batch_size):
+    for question in questions:
+        response = await client.post("/query", json={"question": question})
+        response.raise_for_status()
+
+
+async def _batched(client, questions, batch_size):
+    for start in range(0, len(questions), batch_size):
+        response = await client.post("/query/batch", json={"questions": questions[start:start + batch_size]})
+        response.raise_for_status()
+
+
+async def _main(args):
+    import httpx
+
+    server = FakeOpenAIServer(latency_seconds=args.latency).start()
+    try:
+        with tempfile.TemporaryDirectory() as persist_directory:
+            app, rag_service = _setup_app(server.base_url, persist_directory)
+            rag_service.answer_cache = None
+
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+                print(f"fake_latency={args.latency * 1000:.0f}ms questions={args.questions} batch_size={args.batch_size}")
+                print(f"{'endpoint':>12} {'seconds':>8} {'embedding reqs':>15} {'chat reqs':>10}")
+                for name, fn in (("/query", _serial), ("/query/batch", _batched)):
+                    questions = [f"What is a variable? {name} #{i}" for i in range(args.questions)]
+                    server.request_counts = {"embeddings": 0, "chat": 0}
+                    start = time.perf_counter()
+                    await fn(client, questions, args.batch_size)
+                    elapsed = time.perf_counter() - start
+                    print(f"{name:>12} {elapsed:>8.1f} {server.request_counts['embeddings']:>15} "
+                          f"{server.request_counts['chat']:>10}")
+    finally:
+        server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.1, help="fake OpenAI latency per call (seconds)")
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=100, help="questions per /query/batch request")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark of micro-batched query embeddings against a local fake OpenAI server.
+
+Fires concurrent EmbeddingService.agenerate_query_embedding calls with and
+without the query micro-batcher and reports throughput, p50 latency and the
+number of embedding requests that reached the server. The fake server serves
+a limited number of embedding requests at once (--max-concurrency) to mimic a
+rate-limited provider.
+
+Run from the repository root:
+    python -m utils.bench_query_embedding_batching --latency 0.05 --queries 512
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from utils.fake_openai_server import FakeOpenAIServer
+
+DIMENSIONS = 64
+
+
+def _embedding_service(base_url: str, batched: bool, window_ms: float, max_batch_size: int):
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+    os.environ.setdefault("LANGFUSE_TRACING_ENABLED", "false")
+    os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+
+    from app.services import embedding_service
+    from app.services.micro_batcher import MicroBatcher
+
+    service = embedding_service.EmbeddingService(cache=None)
+    service.embeddings.check_embedding_ctx_length = False
+    service.query_batcher = None
+    if batched:
+        service.query_batcher = MicroBatcher(
+            service._embed_query_batch,
+            max_batch_size=max_batch_size,
+            max_wait_seconds=window_ms / 1000
+        )
+    return service
+
+
+async def _run(service, concurrency: int, total_queries: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one_query(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            await service.agenerate_query_embedding(f"What is a variable? #{i}")
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_query(i) for i in range(total_queries)))
+    elapsed = time.perf_counter() - start
+    return total_queries / elapsed, statistics.median(latencies) * 1000
+
+
+async def _main(args):
+    print(f"fake_latency={args.latency * 1000:.0f}ms server_concurrency={args.max_concurrency} "
+          f"queries={args.queries} window={args.window_ms}ms max_batch={args.max_batch_size}")
+    print(f"{'mode':>9} {'concurrency':>11} {'qps':>8} {'p50 ms':>8} {'requests':>9}")
+    for batched in (False, True):
+        for concurrency in args.concurrency:
+            server = FakeOpenAIServer(
+                latency_seconds=args.latency, dimensions=DIMENSIONS, max_concurrency=args.max_concurrency
+            ).start()
+            try:
+                service = _embedding_service(server.base_url, batched, args.window_ms, args.max_batch_size)
+                qps, p50_ms = await _run(service, concurrency, args.queries)
+                mode = "batched" if batched else "unbatched"
+                print(f"{mode:>9} {concurrency:>11} {qps:>8.1f} {p50_ms:>8.1f} {server.request_counts['embeddings']:>9}")
+            finally:
+                server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake embedding latency per request (seconds)")
+    parser.add_argument("--max-concurrency", type=int, default=4, help="embedding requests the fake server serves at once")
+    parser.add_argument("--queries", type=int, default=512, help="query embeddings per run")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Load test for POST /query against a local fake OpenAI server.
+
+Runs the FastAPI app in-process and fires /query requests at increasing
+concurrency levels, reporting throughput and the latency of /health probes
+sent while the queries are in flight. With --mode sync the endpoint is forced
+back onto the blocking RAGService.query to compare against the async path.
+
+Run from the repository root:
+    python -m utils.bench_query_load --latency 0.1 --requests 64
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from utils.fake_openai_server import FakeOpenAIServer
+
+DIMENSIONS = 64
+
+
+def _setup_app(base_url: str, persist_directory: str):
+    """Import the app against the fake server and seed a throwaway vector store"""
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+    os.environ.setdefault("LANGFUSE_TRACING_ENABLED", "false")
+
+    from langchain.schema import Document
+    from app.main import app
+    from app.api import endpoints
+    from app.services.vector_store import VectorStore
+
+    rag_service = endpoints.rag_services.get()
+    # The fake server does not speak tiktoken-sized batches
+    rag_service.embedding_service.embeddings.check_embedding_ctx_length = False
+    rag_service.vector_store = VectorStore(persist_directory=persist_directory)
+
+    rng = random.Random(0)
+    documents = [
+        Document(page_content=f"Sample chunk {i}", metadata={"source": "bench", "chunk_id": i})
+        for i in range(200)
+    ]
+    embeddings = [[rng.uniform(-1, 1) for _ in range(DIMENSIONS)] for _ in documents]
+    rag_service.vector_store.add_documents(documents, embeddings)
+    return app, rag_service
+
+
+async def _run_level(client, concurrency: int, total_requests: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    health_latencies = []
+    done = asyncio.Event()
+
+    async def one_query(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/query", json={"question": f"What is a variable? #{i}"})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    async def health_probe():
+        while not done.is_set():
+            start = time.perf_counter()
+            await client.get("/health")
+            health_latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(0.01)
+
+    probe = asyncio.create_task(health_probe())
+    start = time.perf_counter()
+    await asyncio.gather(*(one_query(i) for i in range(total_requests)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await probe
+
+    return {
+        "concurrency": concurrency,
+        "qps": total_requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "health_max_ms": max(health_latencies) * 1000 if health_latencies else 0.0,
+    }
+
+
+async def _main(args):
+    import httpx
+
+    server = FakeOpenAIServer(latency_seconds=args.latency, dimensions=DIMENSIONS).start()
+    try:
+        with tempfile.TemporaryDirectory() as persist_directory:
+            app, rag_service = _setup_app(server.base_url, persist_directory)
+
+            if args.mode == "sync":
+                # Reproduce the old behaviour: blocking calls on the event loop
+                async def blocking_aquery(question: str, k: int = 5, source_filter=None, max_distance=None,
+                                          retrieval_mode=None):
+                    return rag_service.query(question, k=k, source_filter=source_filter,
+                                             max_distance=max_distance, retrieval_mode=retrieval_mode)
+                rag_service.aquery = blocking_aquery
+
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+                print(f"mode={args.mode} fake_latency={args.latency * 1000:.0f}ms requests/level={args.requests}")
+                print(f"{'concurrency':>11} {'qps':>8} {'p50 ms':>8} {'/health max ms':>15}")
+                for concurrency in args.concurrency:
+                    row = await _run_level(client, concurrency, args.requests)
+                    print(f"{row['concurrency']:>11} {row['qps']:>8.1f} {row['p50_ms']:>8.1f} {row['health_max_ms']:>15.1f}")
+    finally:
+        server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["async", "sync"], default="async")
+    parser.add_argument("--latency", type=float, default=0.1, help="fake OpenAI latency per call (seconds)")
+    parser.add_argument("--requests", type=int, default=64, help="queries per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32])
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Perceived latency of POST /query vs. POST /query/stream against a local fake OpenAI server.
+
+Serves the FastAPI app with uvicorn on a local port (so responses are really
+streamed) and reports, per endpoint, the time until the answer starts to appear
+(first token for the stream, full body for /query) and the total time.
+
+Run from the repository root:
+    python -m utils.bench_query_stream --latency 1.0 --requests 10
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+
+from utils.bench_query_load import _setup_app
+from utils.fake_openai_server import FakeOpenAIServer
+
+
+async def _query(client, question: str):
+    start = time.perf_counter()
+    response = await client.post("/query", json={"question": question})
+    response.raise_for_status()
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed
+
+
+async def _query_stream(client, question: str):
+    start = time.perf_counter()
+    first_token = None
+    async with client.stream("POST", "/query/stream", json={"question": question}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if first_token is None and line.startswith("event: token"):
+                first_token = time.perf_counter() - start
+    return first_token, time.perf_counter() - start
+
+
+async def _main(args):
+    import httpx
+    import uvicorn
+
+    server = FakeOpenAIServer(latency_seconds=args.latency).start()
+    try:
+        with tempfile.TemporaryDirectory() as persist_directory:
+            app, rag_service = _setup_app(server.base_url, persist_directory)
+            # Every question below is distinct, but keep the answer cache out of the measurement
+            rag_service.answer_cache = None
+
+            config = uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning")
+            api = uvicorn.Server(config)
+            serving = asyncio.create_task(api.serve())
+            while not api.started:
+                await asyncio.sleep(0.05)
+
+            try:
+                async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=120) as client:
+                    print(f"fake_latency={args.latency * 1000:.0f}ms requests={args.requests}")
+                    print(f"{'endpoint':>14} {'first token p50 ms':>19} {'total p50 ms':>13}")
+                    for name, fn in (("/query", _query), ("/query/stream", _query_stream)):
+                        firsts, totals = [], []
+                        for i in range(args.requests):
+                            first, total = await fn(client, f"What is a variable? {name} #{i}")
+                            firsts.append(first)
+                            totals.append(total)
+                        print(f"{name:>14} {statistics.median(firsts) * 1000:>19.1f} {statistics.median(totals) * 1000:>13.1f}")
+            finally:
+                api.should_exit = True
+                await serving
+    finally:
+        server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=1.0, help="fake OpenAI latency per call (seconds)")
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
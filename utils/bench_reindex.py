@@ -0,0 +1,117 @@
+"""
+Query latency and completeness while the index is being rebuilt.
+
+Fills a vector store with --chunks random chunks, then rebuilds every chunk
+(delete and re-add in batches, sleeping --embed-ms per batch to stand in for
+the embedding calls) while a query thread keeps searching with the stored
+embeddings. Each query expects its own chunk as the top result; a miss means
+the query saw a half-built index. Three phases:
+
+  idle    no rebuild running
+  live    the rebuild writes into the serving version (ingestion before versioning)
+  shadow  the rebuild writes into a new version that is activated when complete
+
+Run from the repository root:
+    python -m utils.bench_reindex --chunks 5000 --backend numpy
+"""
+
+import argparse
+import gc
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+DIMENSIONS = 1536
+BATCH_SIZE = 100
+
+
+def _percentile(values, q):
+    return float(np.percentile(values, q)) * 1000 if values else float("nan")
+
+
+def _query_while(vector_store, embeddings, done: threading.Event, min_queries: int):
+    """Search until done is set (and at least min_queries ran); returns (latencies, misses)"""
+    latencies, misses = [], 0
+    rng = np.random.default_rng(1)
+    while not done.is_set() or len(latencies) < min_queries:
+        target = int(rng.integers(len(embeddings)))
+        start = time.perf_counter()
+        results = vector_store.similarity_search(embeddings[target], k=5)
+        latencies.append(time.perf_counter() - start)
+        if not results or results[0]["text"] != f"chunk {target}":
+            misses += 1
+    return latencies, misses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--backend", choices=["numpy", "chroma"], default="numpy")
+    parser.add_argument("--embed-ms", type=float, default=20.0, help="simulated embedding time per batch")
+    args = parser.parse_args()
+
+    os.environ.setdefault("LANGFUSE_TRACING_ENABLED", "false")
+    from langchain.schema import Document
+    from app.services.vector_store import VectorStore, document_ids
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.chunks, DIMENSIONS)).astype(np.float32)
+    embeddings = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).tolist()
+    documents = [
+        Document(page_content=f"chunk {i}", metadata={"source": "bench", "chunk_id": i, "total_chunks": args.chunks})
+        for i in range(args.chunks)
+    ]
+    ids = document_ids(documents)
+    # The benchmark's own millions of floats would otherwise make every full GC pass a latency spike
+    gc.freeze()
+
+    def rebuild(target):
+        target.delete_documents(ids)
+        for start in range(0, len(documents), BATCH_SIZE):
+            time.sleep(args.embed_ms / 1000)
+            target.add_documents(documents[start:start + BATCH_SIZE], embeddings[start:start + BATCH_SIZE],
+                                 ids=ids[start:start + BATCH_SIZE])
+
+    with tempfile.TemporaryDirectory() as directory:
+        vector_store = VectorStore(persist_directory=directory, backend=args.backend)
+        for start in range(0, len(documents), 1000):
+            vector_store.add_documents(documents[start:start + 1000], embeddings[start:start + 1000],
+                                       ids=ids[start:start + 1000])
+
+        def live():
+            rebuild(vector_store)
+
+        def shadow():
+            index = vector_store.create_version()
+            rebuild(index)
+            vector_store.activate(index)
+
+        print(f"chunks={args.chunks} backend={args.backend} embed_ms/batch={args.embed_ms}")
+        print(f"{'phase':>7} {'queries':>8} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'incomplete':>10} {'rebuild s':>9}")
+        for label, writer in [("idle", None), ("live", live), ("shadow", shadow)]:
+            done = threading.Event()
+            elapsed = 0.0
+            if writer is not None:
+                def run(writer=writer):
+                    nonlocal elapsed
+                    start = time.perf_counter()
+                    writer()
+                    elapsed = time.perf_counter() - start
+                    done.set()
+                thread = threading.Thread(target=run)
+                thread.start()
+                latencies, misses = _query_while(vector_store, embeddings, done, min_queries=200)
+                thread.join()
+            else:
+                done.set()
+                latencies, misses = _query_while(vector_store, embeddings, done, min_queries=500)
+            print(f"{label:>7} {len(latencies):>8} {_percentile(latencies, 50):>7.2f} "
+                  f"{_percentile(latencies, 95):>7.2f} {_percentile(latencies, 99):>7.2f} "
+                  f"{misses / len(latencies):>10.1%} {elapsed:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
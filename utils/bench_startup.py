@@ -0,0 +1,132 @@
+"""
+Startup time: how long `import app.main` takes, and how long a fresh server
+process takes to answer 200 on /health (port bound) and on /ready (services
+built and able to serve queries).
+
+The import of app.main no longer builds the RAG service; that cost moved to the
+app's lifespan. The RAG service import time is reported next to it for scale.
+Each server run starts in a throwaway working directory, so the vector store
+and caches under ../data are empty and local.
+
+Run from the repository root:
+    python -m utils.bench_startup --runs 5
+
+With --json the results are also written to a file, and the --max-* budgets make
+the exit status non-zero when a median exceeds them (as the CI job does).
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _environment():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [REPO_ROOT, env.get("PYTHONPATH")]))
+    env.setdefault("OPENAI_API_KEY", "sk-fake")
+    env.setdefault("LANGFUSE_TRACING_ENABLED", "false")
+    return env
+
+
+def _import_seconds(module: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {module}"], cwd=REPO_ROOT, env=_environment(), check=True)
+    return time.perf_counter() - start
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _status(url: str) -> int:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return 0
+
+
+def _time_to_first_200(timeout: float):
+    """Start a server and return the seconds until /health and until /ready answered 200"""
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as directory:
+        working_directory = os.path.join(directory, "run")
+        os.makedirs(working_directory)
+        start = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=working_directory, env=_environment(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            times = {}
+            while len(times) < 2:
+                if time.perf_counter() - start > timeout:
+                    raise TimeoutError(f"server not ready after {timeout}s")
+                if server.poll() is not None:
+                    raise RuntimeError(f"server exited with status {server.returncode}")
+                for path in ("/health", "/ready"):
+                    if path not in times and _status(f"http://127.0.0.1:{port}{path}") == 200:
+                        times[path] = time.perf_counter() - start
+                time.sleep(0.005)
+            return times["/health"], times["/ready"]
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for /ready per run")
+    parser.add_argument("--json", help="write the medians to this file")
+    parser.add_argument("--max-import-seconds", type=float)
+    parser.add_argument("--max-health-seconds", type=float)
+    parser.add_argument("--max-ready-seconds", type=float)
+    args = parser.parse_args()
+
+    # One untimed run of each so bytecode compilation is not measured
+    _import_seconds("app.services.rag_service")
+    imports = [_import_seconds("app.main") for _ in range(args.runs)]
+    service_imports = [_import_seconds("app.services.rag_service") for _ in range(args.runs)]
+    health, ready = zip(*(_time_to_first_200(args.timeout) for _ in range(args.runs)))
+
+    results = {
+        "import_app_main_seconds": statistics.median(imports),
+        "import_rag_service_seconds": statistics.median(service_imports),
+        "first_health_200_seconds": statistics.median(health),
+        "first_ready_200_seconds": statistics.median(ready),
+    }
+    print(f"runs={args.runs} (medians)")
+    for name, value in results.items():
+        print(f"{name:>28} {value * 1000:>8.0f} ms")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    budgets = {
+        "import_app_main_seconds": args.max_import_seconds,
+        "first_health_200_seconds": args.max_health_seconds,
+        "first_ready_200_seconds": args.max_ready_seconds,
+    }
+    exceeded = [name for name, budget in budgets.items() if budget is not None and results[name] > budget]
+    for name in exceeded:
+        print(f"over budget: {name} = {results[name]:.2f}s > {budgets[name]:.2f}s")
+    sys.exit(1 if exceeded else 0)
+
+
+if __name__ == "__main__":
+    main()
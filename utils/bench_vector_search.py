@@ -0,0 +1,86 @@
+"""
+Search latency of the vector store backends (Chroma vs. NumPy brute force).
+
+Fills each backend with random normalized 1536-dimensional embeddings at
+several collection sizes and reports p50/p99 latency of
+VectorStore.similarity_search, plus how long loading the collection took.
+One chunk in ten belongs to "PEP 8" (like the real corpus: ~60 of ~600), and
+the filtered column searches only that source.
+
+Run from the repository root:
+    python -m utils.bench_vector_search --sizes 1000 10000 100000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+DIMENSIONS = 1536
+BATCH_SIZE = 1000
+
+
+def _percentile(values, q):
+    return float(np.percentile(values, q)) * 1000
+
+
+def _bench(backend: str, size: int, queries: int, root: str):
+    from langchain.schema import Document
+    from app.services.vector_store import VectorStore
+
+    rng = np.random.default_rng(0)
+    vector_store = VectorStore(persist_directory=os.path.join(root, f"{backend}-{size}"), backend=backend)
+
+    start = time.perf_counter()
+    for offset in range(0, size, BATCH_SIZE):
+        count = min(BATCH_SIZE, size - offset)
+        embeddings = rng.standard_normal((count, DIMENSIONS), dtype=np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        documents = [
+            Document(
+                page_content=f"chunk {offset + i}",
+                metadata={"source": "PEP 8" if (offset + i) % 10 == 0 else "Think Python", "chunk_id": offset + i}
+            )
+            for i in range(count)
+        ]
+        vector_store.add_documents(documents, embeddings.tolist(), ids=[str(offset + i) for i in range(count)])
+    load_seconds = time.perf_counter() - start
+
+    query_embeddings = rng.standard_normal((queries, DIMENSIONS), dtype=np.float32).tolist()
+    vector_store.similarity_search(query_embeddings[0], k=5)  # warm-up
+    latencies = []
+    filtered_latencies = []
+    for query_embedding in query_embeddings:
+        start = time.perf_counter()
+        vector_store.similarity_search(query_embedding, k=5)
+        latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        vector_store.similarity_search(query_embedding, k=5, sources=["PEP 8"])
+        filtered_latencies.append(time.perf_counter() - start)
+
+    return (load_seconds, _percentile(latencies, 50), _percentile(latencies, 99),
+            _percentile(filtered_latencies, 50))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--backends", nargs="+", default=["chroma", "numpy"])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ.setdefault("LANGFUSE_TRACING_ENABLED", "false")
+    print(f"dimensions={DIMENSIONS} k=5 queries={args.queries}")
+    print(f"{'backend':>7} {'chunks':>8} {'load s':>8} {'p50 ms':>8} {'p99 ms':>8} {'filtered p50 ms':>16}")
+    with tempfile.TemporaryDirectory() as root:
+        for size in args.sizes:
+            for backend in args.backends:
+                load_seconds, p50, p99, filtered_p50 = _bench(backend, size, args.queries, root)
+                print(f"{backend:>7} {size:>8} {load_seconds:>8.1f} {p50:>8.2f} {p99:>8.2f} {filtered_p50:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
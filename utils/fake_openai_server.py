@@ -0,0 +1,177 @@
+"""
+Local fake OpenAI server for load tests and benchmarks.
+
+Serves /v1/embeddings and /v1/chat/completions (plain and streamed) with a fixed artificial latency
+so the RAG pipeline can be exercised without network access or API costs.
+Point the OpenAI clients at it with OPENAI_BASE_URL=<server.base_url>.
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+
+from aiohttp import web
+
+FAKE_ANSWER = "This is a fake answer."
+
+
+def _fake_embedding(text: str, dimensions: int) -> list:
+    """Deterministic pseudo-embedding derived from the text hash"""
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return [(digest[i % len(digest)] - 128) / 128.0 for i in range(dimensions)]
+
+
+class BackgroundAiohttpServer:
+    """aiohttp server running on a background thread with its own event loop"""
+
+    def __init__(self, port: int = 0):
+        self.port = port
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        self._started = threading.Event()
+
+    def build_app(self) -> web.Application:
+        raise NotImplementedError
+
+    async def _start(self):
+        self._runner = web.AppRunner(self.build_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._start())
+        self._started.set()
+        self._loop.run_forever()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        self._started.wait(timeout=10)
+        return self
+
+    def stop(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(timeout=10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=10)
+
+
+class FakeOpenAIServer(BackgroundAiohttpServer):
+    """Fake /v1/embeddings and /v1/chat/completions with a fixed latency.
+
+    max_concurrency, if set, caps the embedding requests served at once to mimic
+    a rate-limited provider; excess requests queue up behind it.
+
+    fail_after, if set, injects a fault: once that many embedding requests have been
+    served, every further one fails with a 500 until fail_after is cleared.
+    """
+
+    def __init__(self, latency_seconds: float = 0.05, dimensions: int = 64, port: int = 0,
+                 max_concurrency: int = None, fail_after: int = None):
+        super().__init__(port=port)
+        self.latency_seconds = latency_seconds
+        self.dimensions = dimensions
+        self.max_concurrency = max_concurrency
+        self.fail_after = fail_after
+        self._embedding_slots = None
+        self.request_counts = {"embeddings": 0, "chat": 0}
+        self.embedded_texts = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    def build_app(self) -> web.Application:
+        if self.max_concurrency:
+            self._embedding_slots = asyncio.Semaphore(self.max_concurrency)
+        app = web.Application()
+        app.router.add_post("/v1/embeddings", self._embeddings)
+        app.router.add_post("/v1/chat/completions", self._chat)
+        return app
+
+    async def _embeddings(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        if self.fail_after is not None and self.request_counts["embeddings"] >= self.fail_after:
+            self.request_counts["failed"] = self.request_counts.get("failed", 0) + 1
+            return web.json_response(
+                {"error": {"message": "Injected fault", "type": "server_error", "code": None}}, status=500
+            )
+        self.request_counts["embeddings"] += 1
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        self.embedded_texts += len(inputs)
+        if self._embedding_slots is not None:
+            async with self._embedding_slots:
+                await asyncio.sleep(self.latency_seconds)
+        else:
+            await asyncio.sleep(self.latency_seconds)
+        return web.json_response({
+            "object": "list",
+            "data": [
+                {"object": "embedding", "index": i, "embedding": _fake_embedding(str(text), self.dimensions)}
+                for i, text in enumerate(inputs)
+            ],
+            "model": body.get("model", "text-embedding-3-small"),
+            "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)}
+        })
+
+    async def _chat(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        self.request_counts["chat"] += 1
+        if body.get("stream"):
+            return await self._chat_stream(request, body)
+        await asyncio.sleep(self.latency_seconds)
+        return web.json_response({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-3.5-turbo"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": FAKE_ANSWER},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+        })
+
+    async def _chat_stream(self, request: web.Request, body: dict) -> web.StreamResponse:
+        """Stream the fake answer word by word, spreading the latency across the tokens"""
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+
+        tokens = [word + " " for word in FAKE_ANSWER.split(" ")]
+        tokens[-1] = tokens[-1].rstrip()
+        for i, token in enumerate(tokens):
+            await asyncio.sleep(self.latency_seconds / len(tokens))
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "gpt-3.5-turbo"),
+                "choices": [{
+                    "index": 0,
+                    "delta": {"role": "assistant", "content": token} if i == 0 else {"content": token},
+                    "finish_reason": "stop" if i == len(tokens) - 1 else None
+                }]
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        if body.get("stream_options", {}).get("include_usage"):
+            usage = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "gpt-3.5-turbo"),
+                "choices": [],
+                "usage": {"prompt_tokens": 10, "completion_tokens": len(tokens), "total_tokens": 10 + len(tokens)}
+            }
+            await response.write(f"data: {json.dumps(usage)}\n\n".encode("utf-8"))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
@@ -0,0 +1,67 @@
+"""
+Local stand-in for the Think Python and PEP 8 websites.
+
+Serves /ThinkPython/chapNN.html and /pep-0008/ with an artificial per-request
+latency so the document loaders can be benchmarked without network access.
+Responses carry an ETag and honour If-None-Match with 304 Not Modified.
+"""
+
+import asyncio
+import hashlib
+
+from aiohttp import web
+
+from utils.fake_openai_server import BackgroundAiohttpServer
+
+_PARAGRAPH = "A variable is a name that refers to a value. " * 40
+
+
+def _chapter_html(chapter: str) -> str:
+    paragraphs = "".join(f"<p>{chapter} section {i}. {_PARAGRAPH}</p>" for i in range(20))
+    return f"<html><body><nav>menu</nav><main><h1>{chapter}</h1>{paragraphs}</main></body></html>"
+
+
+def _pep8_html() -> str:
+    paragraphs = "".join(f"<p>Style rule {i}. Limit all lines to 79 characters. {_PARAGRAPH}</p>" for i in range(40))
+    return f"<html><body><section id='pep-content'><h1>PEP 8</h1>{paragraphs}</section></body></html>"
+
+
+class FakeSourceServer(BackgroundAiohttpServer):
+    """Serves fixture pages for every document source the loaders fetch"""
+
+    def __init__(self, latency_seconds: float = 0.2, port: int = 0):
+        super().__init__(port=port)
+        self.latency_seconds = latency_seconds
+        self.request_count = 0
+        self.not_modified_count = 0
+
+    @property
+    def think_python_base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/ThinkPython/"
+
+    @property
+    def pep8_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/pep-0008/"
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/ThinkPython/{chapter}", self._chapter)
+        app.router.add_get("/pep-0008/", self._pep8)
+        return app
+
+    def _respond(self, request: web.Request, html: str) -> web.Response:
+        etag = '"' + hashlib.sha256(html.encode("utf-8")).hexdigest()[:16] + '"'
+        if request.headers.get("If-None-Match") == etag:
+            self.not_modified_count += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(text=html, content_type="text/html", headers={"ETag": etag})
+
+    async def _chapter(self, request: web.Request) -> web.Response:
+        self.request_count += 1
+        await asyncio.sleep(self.latency_seconds)
+        return self._respond(request, _chapter_html(request.match_info["chapter"]))
+
+    async def _pep8(self, request: web.Request) -> web.Response:
+        self.request_count += 1
+        await asyncio.sleep(self.latency_seconds)
+        return self._respond(request, _pep8_html())